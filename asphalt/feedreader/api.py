@@ -1,5 +1,6 @@
+import time
 from abc import ABCMeta, abstractmethod
-from typing import Awaitable, Dict, Any, Optional
+from typing import Awaitable, Dict, Any, Optional, Union
 
 from asphalt.core import Context, Signal
 
@@ -56,7 +57,7 @@ class FeedReader(metaclass=ABCMeta):
         """Read the feed from the source and dispatch any events necessary."""
 
     @classmethod
-    def can_parse(cls, document: str, content_type: str) -> Optional[str]:
+    def can_parse(cls, document: Union[str, bytes], content_type: str) -> Optional[str]:
         """
         Determine if this reader class is suitable for parsing the given document as a feed.
 
@@ -64,7 +65,7 @@ class FeedReader(metaclass=ABCMeta):
         :func:`~asphalt.feedreader.component.create_feed` (ie. when the feed parser has not
         been specified). Autodetection is skipped when the feed parser has been explicitly given.
 
-        :param document: document loaded from the feed URL
+        :param document: document loaded from the feed URL (as raw bytes when loaded over HTTP)
         :param content_type: MIME type of the loaded document
         :return: the reason why this class cannot parse the given document, or ``None`` if it can
             parse it
@@ -91,3 +92,48 @@ class FeedStateStore(metaclass=ABCMeta):
     @abstractmethod
     def store_state(self, state_id: str, state: Dict[str, Any]) -> Awaitable[None]:
         """Add or update the indicated state in the store."""
+
+    async def delete_state(self, state_id: str) -> None:
+        """
+        Remove the named state from the store.
+
+        Removing a nonexistent state is not an error.
+
+        """
+        raise NotImplementedError('{} does not support deleting states'.
+                                  format(self.__class__.__name__))
+
+    async def list_states(self) -> Dict[str, Optional[float]]:
+        """
+        List the states in the store.
+
+        :return: a dictionary of state ID ⭢ time (as a UNIX timestamp) the state was last stored,
+            or ``None`` if not known
+
+        """
+        raise NotImplementedError('{} does not support listing states'.
+                                  format(self.__class__.__name__))
+
+    async def acquire_lease(self, name: str, owner: str, duration: float) -> bool:
+        """
+        Acquire or renew a named lease.
+
+        The lease is granted if nobody else holds it, or the previous holder's lease has expired.
+
+        The default implementation is built on :meth:`load_state` and :meth:`store_state` and is
+        therefore **not** atomic. Stores should override this with an atomic implementation.
+
+        :param name: name of the lease
+        :param owner: identifier of the party acquiring the lease
+        :param duration: number of seconds the lease should be valid for
+        :return: ``True`` if the lease was acquired or renewed, ``False`` if someone else holds it
+
+        """
+        state_id = 'lease:' + name
+        now = time.time()
+        lease = await self.load_state(state_id)
+        if lease is not None and lease['owner'] != owner and lease['expires'] > now:
+            return False
+
+        await self.store_state(state_id, {'owner': owner, 'expires': now + duration})
+        return True
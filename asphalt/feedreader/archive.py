@@ -0,0 +1,288 @@
+"""
+An append-only archive of discovered entries, stored in local files.
+
+The archive is a directory of segment files. Each segment consists of blocks, and each block
+holds a batch of records (archival time, feed ID, entry) pickled and compressed together. Every
+block starts with a header containing the compressed length, the number of records and the
+archival times of its first and last record::
+
+    <compressed length: uint32> <record count: uint32> <first time: double> <last time: double>
+
+Blocks are appended in the order of archival. The headers double as a sparse time index, which is
+loaded into memory when the archive is started, so time range scans only read and decompress the
+blocks that overlap with the requested range.
+"""
+
+import asyncio
+import logging
+import os
+import pickle
+import time
+import zlib
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+from struct import Struct
+from typing import List, Tuple, Optional, Union, Iterator, Any  # noqa
+
+from asphalt.core import Context, Signal
+from typeguard import check_argument_types
+
+from asphalt.feedreader.api import FeedReader
+from asphalt.feedreader.events import EntryEvent, ArchivedEntryEvent
+from asphalt.feedreader.metadata import FeedEntry
+
+logger = logging.getLogger(__name__)
+
+block_header = Struct('<IIdd')
+segment_suffix = '.seg'
+
+# (archival time, feed ID, entry)
+ArchiveRecord = Tuple[float, str, FeedEntry]
+
+
+class _Segment:
+    __slots__ = ('path', 'offsets', 'last_times', 'size')
+
+    def __init__(self, path: str):
+        self.path = path
+        self.offsets = []  # type: List[int]
+        self.last_times = []  # type: List[float]
+        self.size = 0
+
+    def load(self) -> None:
+        """Read the block headers, truncating any partially written block at the end."""
+        with open(self.path, 'rb+') as f:
+            file_size = os.fstat(f.fileno()).st_size
+            while self.size + block_header.size <= file_size:
+                header = f.read(block_header.size)
+                length, count, first_time, last_time = block_header.unpack(header)
+                if self.size + block_header.size + length > file_size:
+                    break
+
+                self.add_block(last_time, block_header.size + length)
+                f.seek(self.size)
+
+            if self.size < file_size:
+                logger.warning('Truncating partially written block in archive segment %s',
+                               self.path)
+                f.truncate(self.size)
+
+    def add_block(self, last_time: float, size: int) -> None:
+        self.offsets.append(self.size)
+        self.last_times.append(last_time)
+        self.size += size
+
+    def read_blocks(self, start: float = None) -> Iterator[List[ArchiveRecord]]:
+        # Skip the blocks that end before the start of the range
+        index = bisect_left(self.last_times, start) if start is not None else 0
+        if index >= len(self.offsets):
+            return
+
+        with open(self.path, 'rb') as f:
+            f.seek(self.offsets[index])
+            for _ in range(index, len(self.offsets)):
+                length = block_header.unpack(f.read(block_header.size))[0]
+                yield pickle.loads(zlib.decompress(f.read(length)))
+
+
+class EntryArchive:
+    """
+    Appends every discovered entry to compressed segment files on the local disk.
+
+    Entries are buffered in memory and written in blocks of ``block_entries`` entries, or after
+    ``flush_interval`` seconds, whichever comes first. A new segment file is started when the
+    current one has grown past ``segment_size`` bytes. Whole segments are deleted once all their
+    entries are older than ``retention``.
+
+    Feed readers are connected to the archive with :meth:`attach`. Archived entries can be read
+    back with :meth:`scan`, or replayed through the :attr:`entry_replayed` signal with
+    :meth:`replay`.
+
+    :var entry_replayed: a signal dispatched for each entry replayed by :meth:`replay`
+    :vartype entry_replayed: Signal[ArchivedEntryEvent]
+
+    :param path: path of the directory to store the segment files in (created if necessary)
+    :param segment_size: size (in bytes) after which a new segment file is started
+    :param block_entries: maximum number of entries written (and compressed) together
+    :param flush_interval: maximum number of seconds to buffer entries in memory before writing
+        them to disk
+    :param retention: number of seconds (or a timedelta) to keep the entries for (``None`` = keep
+        them forever)
+    :param compression_level: zlib compression level (1-9)
+    """
+
+    entry_replayed = Signal(ArchivedEntryEvent)
+
+    def __init__(self, path: str, segment_size: int = 64 * 1024 * 1024, block_entries: int = 100,
+                 flush_interval: float = 1, retention: Union[float, timedelta] = None,
+                 compression_level: int = 6):
+        assert check_argument_types()
+        self.path = path
+        self.segment_size = segment_size
+        self.block_entries = block_entries
+        self.flush_interval = flush_interval
+        self.retention = retention.total_seconds() if isinstance(retention, timedelta) \
+            else retention
+        self.compression_level = compression_level
+        self._segments = []  # type: List[_Segment]
+        self._buffer = []  # type: List[ArchiveRecord]
+        self._last_time = 0.0
+        self._file = None
+        self._flush_handle = None  # type: Optional[asyncio.Handle]
+
+    async def start(self, ctx: Context) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        for filename in sorted(os.listdir(self.path)):
+            if filename.endswith(segment_suffix):
+                segment = _Segment(os.path.join(self.path, filename))
+                segment.load()
+                if segment.offsets:
+                    self._segments.append(segment)
+                    self._last_time = segment.last_times[-1]
+                else:
+                    os.remove(segment.path)
+
+        self.purge()
+        ctx.add_teardown_callback(self.close)
+
+    def add(self, feed_id: str, entry: FeedEntry) -> None:
+        """
+        Add an entry to the archive.
+
+        :param feed_id: identifier of the feed the entry was discovered in
+        :param entry: the entry
+
+        """
+        # Keep the archival times monotonic even if the system clock is turned back
+        self._last_time = max(time.time(), self._last_time)
+        self._buffer.append((self._last_time, feed_id, entry))
+        if len(self._buffer) >= self.block_entries:
+            self.flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_event_loop().call_later(self.flush_interval,
+                                                                     self.flush)
+
+    def flush(self) -> None:
+        """Write any buffered entries to disk."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        if not self._buffer:
+            return
+
+        records, self._buffer = self._buffer, []
+        if self._file is None or self._segments[-1].size >= self.segment_size:
+            self._open_segment(records[0][0])
+
+        data = zlib.compress(pickle.dumps(records, protocol=4), self.compression_level)
+        header = block_header.pack(len(data), len(records), records[0][0], records[-1][0])
+        self._file.write(header + data)
+        self._file.flush()
+        self._segments[-1].add_block(records[-1][0], len(header) + len(data))
+
+    def _open_segment(self, first_time: float) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self.purge()
+
+        # Continue the last segment left over from a previous run if it still has room
+        if not self._segments or self._segments[-1].size >= self.segment_size:
+            # Segment files are named after the archival time of their first entry
+            filename = '{:020d}{}'.format(int(first_time * 1000000), segment_suffix)
+            self._segments.append(_Segment(os.path.join(self.path, filename)))
+
+        self._file = open(self._segments[-1].path, 'ab')
+
+    def scan(self, start: datetime = None, end: datetime = None,
+             feed_id: str = None) -> Iterator[ArchiveRecord]:
+        """
+        Iterate through the archived entries in the order they were archived.
+
+        :param start: only return entries archived at or after this time
+        :param end: only return entries archived before this time
+        :param feed_id: only return entries from this feed
+        :return: an iterator of (archival time as a UNIX timestamp, feed ID, entry) tuples
+
+        """
+        self.flush()
+        start_time = start.timestamp() if start is not None else None
+        end_time = end.timestamp() if end is not None else None
+        for segment in list(self._segments):
+            if start_time is not None and segment.last_times[-1] < start_time:
+                continue
+
+            for records in segment.read_blocks(start_time):
+                for record in records:
+                    if end_time is not None and record[0] >= end_time:
+                        return
+
+                    if (start_time is None or record[0] >= start_time) and \
+                            (feed_id is None or record[1] == feed_id):
+                        yield record
+
+    async def replay(self, start: datetime = None, end: datetime = None,
+                     feed_id: str = None) -> int:
+        """
+        Dispatch the archived entries through the :attr:`entry_replayed` signal.
+
+        :param start: only replay entries archived at or after this time
+        :param end: only replay entries archived before this time
+        :param feed_id: only replay entries from this feed
+        :return: the number of entries replayed
+
+        """
+        count = 0
+        for archived, feed_id_, entry in self.scan(start, end, feed_id):
+            self.entry_replayed.dispatch(
+                entry=entry, feed_id=feed_id_,
+                archived=datetime.fromtimestamp(archived, timezone.utc))
+            count += 1
+            if count % self.block_entries == 0:
+                # Let the listeners process the events before decoding more of them
+                await asyncio.sleep(0)
+
+        return count
+
+    def purge(self, now: float = None) -> int:
+        """
+        Delete the segments whose entries are all older than the retention period.
+
+        This is done automatically at startup and whenever a new segment is started.
+
+        :param now: the current time as a UNIX timestamp (defaults to the current time)
+        :return: the number of segments deleted
+
+        """
+        if self.retention is None:
+            return 0
+
+        cutoff = (now if now is not None else time.time()) - self.retention
+        deleted = 0
+        # The segment currently being written to is never deleted
+        while len(self._segments) > 1 and self._segments[0].last_times[-1] < cutoff:
+            segment = self._segments.pop(0)
+            os.remove(segment.path)
+            deleted += 1
+            logger.info('Deleted expired archive segment %s', segment.path)
+
+        return deleted
+
+    def close(self) -> None:
+        """Write any buffered entries to disk and close the current segment file."""
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _entry_discovered(self, event: EntryEvent) -> None:
+        self.add(getattr(event.source, 'state_id', event.source.url), event.entry)
+
+    def attach(self, reader: FeedReader) -> None:
+        """Archive the entries discovered by the given feed reader."""
+        reader.entry_discovered.connect(self._entry_discovered)
+
+    def detach(self, reader: FeedReader) -> None:
+        """Stop archiving the entries discovered by the given feed reader."""
+        reader.entry_discovered.disconnect(self._entry_discovered)
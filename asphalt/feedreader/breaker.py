@@ -0,0 +1,121 @@
+import logging
+import time
+from typing import Dict, Any, Optional  # noqa
+
+from typeguard import check_argument_types
+
+logger = logging.getLogger(__name__)
+
+
+class _Circuit:
+    __slots__ = ('failures', 'open_until', 'timeout', 'probe_until')
+
+    def __init__(self):
+        self.failures = 0
+        self.open_until = None  # type: Optional[float]
+        self.timeout = 0.0
+        self.probe_until = 0.0
+
+
+class CircuitBreaker:
+    """
+    Pauses all feeds on a host that keeps failing.
+
+    After ``failure_threshold`` consecutive failures (connection errors, timeouts or 5xx
+    responses) from a host, the circuit for that host opens and feeds on it are not fetched for
+    ``reset_timeout`` seconds. After that, a single feed is let through as a probe. If the probe
+    succeeds, the circuit closes and all the feeds on the host resume. If it fails, the circuit
+    opens again, for twice the previous time (up to ``max_reset_timeout``).
+
+    :param failure_threshold: number of consecutive failures after which the circuit opens
+    :param reset_timeout: number of seconds to keep the circuit open before the first probe
+    :param max_reset_timeout: maximum number of seconds to keep the circuit open
+    :param probe_timeout: number of seconds after which a probe that has not reported back is
+        considered lost (and another one is let through)
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60,
+                 max_reset_timeout: float = 3600, probe_timeout: float = 300):
+        assert check_argument_types()
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.probe_timeout = probe_timeout
+        self._circuits = {}  # type: Dict[str, _Circuit]
+
+    def is_open(self, host: str) -> bool:
+        """Return ``True`` if the circuit for the given host is open (or probing)."""
+        circuit = self._circuits.get(host)
+        return circuit is not None and circuit.open_until is not None
+
+    def allow(self, host: str) -> bool:
+        """
+        Check if a request may be sent to the given host.
+
+        :param host: the host name
+        :return: ``True`` if the circuit is closed or this request is let through as a probe
+
+        """
+        circuit = self._circuits.get(host)
+        if circuit is None or circuit.open_until is None:
+            return True
+
+        now = time.time()
+        if now < circuit.open_until or now < circuit.probe_until:
+            return False
+
+        circuit.probe_until = now + self.probe_timeout
+        logger.info('Probing host %s', host)
+        return True
+
+    def record_success(self, host: str) -> None:
+        """Record a successful request to the given host, closing its circuit."""
+        circuit = self._circuits.pop(host, None)
+        if circuit is not None and circuit.open_until is not None:
+            logger.info('Host %s has recovered', host)
+
+    def record_failure(self, host: str) -> bool:
+        """
+        Record a failed request to the given host.
+
+        :param host: the host name
+        :return: ``True`` if this caused the circuit to open
+
+        """
+        circuit = self._circuits.setdefault(host, _Circuit())
+        circuit.failures += 1
+        circuit.probe_until = 0.0
+        if circuit.open_until is not None:
+            circuit.timeout = min(circuit.timeout * 2, self.max_reset_timeout)
+        elif circuit.failures >= self.failure_threshold:
+            circuit.timeout = self.reset_timeout
+        else:
+            return False
+
+        circuit.open_until = time.time() + circuit.timeout
+        logger.warning('Pausing feeds on host %s for %d seconds after %d failures', host,
+                       circuit.timeout, circuit.failures)
+        return True
+
+    def get_state(self, host: str) -> Optional[Dict[str, Any]]:
+        """Return the persistable state of the circuit for the given host (if any)."""
+        circuit = self._circuits.get(host)
+        if circuit is None or circuit.open_until is None:
+            return None
+
+        return {'failures': circuit.failures, 'open_until': circuit.open_until,
+                'timeout': circuit.timeout}
+
+    def restore(self, host: str, state: Dict[str, Any]) -> None:
+        """
+        Restore the state of the circuit for the given host, unless it is already known.
+
+        :param host: the host name
+        :param state: a state previously returned by :meth:`get_state`
+
+        """
+        if host not in self._circuits:
+            circuit = self._circuits[host] = _Circuit()
+            circuit.failures = state['failures']
+            circuit.open_until = state['open_until']
+            circuit.timeout = state['timeout']
@@ -0,0 +1,132 @@
+import sys
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from datetime import datetime
+from itertools import count
+from typing import Dict, List, Tuple, Optional  # noqa
+
+from typeguard import check_argument_types
+
+from asphalt.feedreader.metadata import FeedEntry
+
+SortKey = Tuple[float, int, str, str]
+CacheRecord = Tuple[SortKey, FeedEntry, int]
+
+
+def estimate_entry_size(entry: FeedEntry) -> int:
+    """
+    Estimate the amount of memory used by the given entry.
+
+    This counts the entry object itself and the strings (and tuples of strings) referenced by its
+    attributes. Shared objects like datetimes are not counted.
+
+    :param entry: a feed entry
+    :return: the estimated size in bytes
+
+    """
+    size = sys.getsizeof(entry)
+    for cls in type(entry).__mro__:
+        for name in getattr(cls, '__slots__', ()):
+            value = getattr(entry, name, None)
+            if isinstance(value, str):
+                size += sys.getsizeof(value)
+            elif isinstance(value, tuple):
+                size += sys.getsizeof(value) + sum(sys.getsizeof(item) for item in value
+                                                   if isinstance(item, str))
+
+    return size
+
+
+class EntryCache:
+    """
+    Keeps the most recently discovered entries in memory for fast queries.
+
+    Entries are indexed by feed and by publication time (or the time they were added, if they
+    have no publication date). When either limit is exceeded, the entries that were added the
+    earliest are evicted first.
+
+    :param max_entries: maximum number of entries to keep
+    :param max_memory: maximum estimated memory use (in bytes) of the cached entries (``None`` =
+        unlimited)
+    """
+
+    def __init__(self, max_entries: int = 10000, max_memory: int = None):
+        assert check_argument_types()
+        self.max_entries = max_entries
+        self.max_memory = max_memory
+        self.memory_usage = 0
+        self._entries = OrderedDict()  # type: Dict[Tuple[str, str], CacheRecord]
+        self._time_index = []  # type: List[SortKey]
+        self._feed_indexes = {}  # type: Dict[str, List[SortKey]]
+        self._counter = count()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, feed_id: str, entry: FeedEntry) -> None:
+        """
+        Add an entry to the cache, replacing any earlier entry with the same ID from the same feed.
+
+        :param feed_id: identifier of the feed the entry was discovered in
+        :param entry: the entry
+
+        """
+        key = (feed_id, entry.id)
+        if key in self._entries:
+            self._remove(key)
+
+        timestamp = entry.published.timestamp() if entry.published else time.time()
+        sort_key = (timestamp, next(self._counter), feed_id, entry.id)
+        size = estimate_entry_size(entry)
+        self._entries[key] = (sort_key, entry, size)
+        insort(self._time_index, sort_key)
+        insort(self._feed_indexes.setdefault(feed_id, []), sort_key)
+        self.memory_usage += size
+
+        while self._entries and (len(self._entries) > self.max_entries or (
+                self.max_memory is not None and self.memory_usage > self.max_memory)):
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: Tuple[str, str]) -> None:
+        sort_key, entry, size = self._entries.pop(key)
+        self.memory_usage -= size
+        del self._time_index[bisect_left(self._time_index, sort_key)]
+        feed_index = self._feed_indexes[key[0]]
+        del feed_index[bisect_left(feed_index, sort_key)]
+        if not feed_index:
+            del self._feed_indexes[key[0]]
+
+    def discard_feed(self, feed_id: str) -> None:
+        """Remove all the entries of the given feed from the cache."""
+        for sort_key in list(self._feed_indexes.get(feed_id, ())):
+            self._remove((feed_id, sort_key[3]))
+
+    def get(self, feed_id: str, entry_id: str) -> Optional[FeedEntry]:
+        """Return the given entry, or ``None`` if it is not in the cache."""
+        record = self._entries.get((feed_id, entry_id))
+        return record[1] if record else None
+
+    def latest(self, feed_id: str = None, since: datetime = None,
+               limit: int = None) -> List[FeedEntry]:
+        """
+        Return the latest entries, newest first.
+
+        :param feed_id: only return entries from this feed
+        :param since: only return entries published (or discovered) at or after this time
+        :param limit: maximum number of entries to return
+        :return: a list of entries
+
+        """
+        index = self._feed_indexes.get(feed_id, []) if feed_id is not None else self._time_index
+        start = bisect_left(index, (since.timestamp(),)) if since is not None else 0
+        stop = max(start, len(index) - limit) if limit is not None else start
+        return [self._entries[(sort_key[2], sort_key[3])][1]
+                for sort_key in reversed(index[stop:])]
+
+    def clear(self) -> None:
+        """Remove all entries from the cache."""
+        self._entries.clear()
+        self._time_index.clear()
+        self._feed_indexes.clear()
+        self.memory_usage = 0
@@ -0,0 +1,295 @@
+"""
+Command line tools for managing large lists of feeds (``asphalt-feedreader``).
+
+Automatic detection of the feed type in :func:`~asphalt.feedreader.component.create_feed` fetches
+each feed before the feed reader can be started, one feed at a time. These tools do that work in
+advance, concurrently, and record the detected reader in the configuration:
+
+* ``validate``: fetches the given feeds (or those listed in an OPML file) and reports the detected
+  reader type, document size, latency and the validators (``ETag`` and ``Last-Modified``) the
+  server sent
+* ``import``: validates the feeds listed in an OPML file and writes the working ones as component
+  configuration (``feeds`` for :class:`~asphalt.feedreader.component.FeedReaderComponent`) or as
+  a feed catalog for :class:`~asphalt.feedreader.registry.FeedRegistry` (see its ``catalog_file``
+  option)
+* ``export``: writes the feeds in component configuration or a feed catalog as an OPML file
+"""
+
+import asyncio
+import json
+import re
+import sys
+from typing import Iterable, List, Dict, Any, Optional, Sequence  # noqa
+from urllib.parse import urlsplit
+
+import click
+from aiohttp import ClientSession, ClientError, TCPConnector
+from ruamel import yaml
+from ruamel.yaml import SafeLoader
+from typeguard import check_argument_types
+
+from asphalt.feedreader.component import detect_reader
+from asphalt.feedreader.opml import Subscription, parse_opml, generate_opml
+from asphalt.feedreader.resolver import CachingResolver
+
+non_identifier_re = re.compile(r'[^a-z0-9]+')
+
+
+class FeedProbe:
+    """
+    The result of fetching a feed and detecting its type.
+
+    :ivar str url: URL of the feed
+    :ivar str reader: entry point name of the detected feed reader class (``None`` if the feed
+        could not be fetched or its type could not be detected)
+    :ivar int status: HTTP status code of the response
+    :ivar str content_type: MIME type of the document
+    :ivar int size: size of the (decompressed) document, in bytes
+    :ivar float latency: number of seconds from sending the request until the document had been
+        downloaded
+    :ivar str etag: the ``ETag`` header of the response
+    :ivar str last_modified: the ``Last-Modified`` header of the response
+    :ivar str error: description of the problem, if the feed could not be used
+    """
+
+    __slots__ = ('url', 'reader', 'status', 'content_type', 'size', 'latency', 'etag',
+                 'last_modified', 'error')
+
+    def __init__(self, url: str):
+        self.url = url
+        self.reader = self.status = self.content_type = self.size = None
+        self.latency = self.etag = self.last_modified = self.error = None
+
+    @property
+    def ok(self) -> bool:
+        return self.reader is not None
+
+
+async def probe_feed(session: ClientSession, url: str, timeout: float = 30) -> FeedProbe:
+    """
+    Fetch the given feed and detect its type.
+
+    :param session: the client session to use
+    :param url: URL of the feed
+    :param timeout: maximum number of seconds to wait for the document
+    :return: the results
+
+    """
+    async def fetch():
+        async with session.get(url) as response:
+            probe.status = response.status
+            probe.content_type = response.content_type
+            probe.etag = response.headers.get('ETag')
+            probe.last_modified = response.headers.get('Last-Modified')
+            if response.status >= 400:
+                probe.error = 'HTTP {} {}'.format(response.status, response.reason)
+                return None
+
+            return await response.read()
+
+    probe = FeedProbe(url)
+    loop = asyncio.get_event_loop()
+    start = loop.time()
+    try:
+        document = await asyncio.wait_for(fetch(), timeout)
+    except asyncio.TimeoutError:
+        probe.error = 'timed out after {} seconds'.format(timeout)
+    except (ClientError, OSError) as exc:
+        probe.error = str(exc) or exc.__class__.__name__
+    else:
+        probe.latency = loop.time() - start
+        if document is not None:
+            probe.size = len(document)
+            probe.reader = detect_reader(document, probe.content_type, url)
+            if probe.reader is None:
+                probe.error = 'unable to detect the feed type'
+
+    return probe
+
+
+async def probe_feeds(urls: Iterable[str], concurrency: int = 20, timeout: float = 30,
+                      session: ClientSession = None) -> List[FeedProbe]:
+    """
+    Fetch the given feeds and detect their types, at most ``concurrency`` feeds at a time.
+
+    :param urls: URLs of the feeds
+    :param concurrency: maximum number of feeds to fetch concurrently
+    :param timeout: maximum number of seconds to wait for each document
+    :param session: the client session to use (if omitted, a session using a caching resolver is
+        created for the duration of the call)
+    :return: the results, in the same order as ``urls``
+
+    """
+    assert check_argument_types()
+
+    async def probe(url: str) -> FeedProbe:
+        async with semaphore:
+            return await probe_feed(session, url, timeout)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    if session is not None:
+        return await asyncio.gather(*[probe(url) for url in urls])
+
+    resolver = CachingResolver(warm_up_lead=None)
+    connector = TCPConnector(limit=concurrency, resolver=resolver, use_dns_cache=False)
+    session = ClientSession(connector=connector)
+    try:
+        return await asyncio.gather(*[probe(url) for url in urls])
+    finally:
+        session.close()
+        await resolver.close()
+
+
+def make_feed_id(subscription: Subscription, taken: Iterable[str] = ()) -> str:
+    """
+    Generate an identifier for the given feed from its title (or host name).
+
+    :param subscription: the feed subscription
+    :param taken: identifiers that must not be used
+    :return: a lower case identifier that is not in ``taken``
+
+    """
+    base = non_identifier_re.sub('_', (subscription.title or '').lower()).strip('_')
+    if not base:
+        host = urlsplit(subscription.url).hostname or 'feed'
+        base = non_identifier_re.sub('_', host.lower()).strip('_')
+
+    feed_id = base
+    counter = 1
+    while feed_id in taken:
+        counter += 1
+        feed_id = '{}_{}'.format(base, counter)
+
+    return feed_id
+
+
+def build_feed_configs(subscriptions: Sequence[Subscription],
+                       probes: Sequence[FeedProbe]) -> Dict[str, Dict[str, Any]]:
+    """
+    Create :func:`~asphalt.feedreader.component.create_feed` arguments for the working feeds.
+
+    The detected reader is included in each configuration, so no autodetection is necessary when
+    the feeds are started.
+
+    :param subscriptions: the subscriptions
+    :param probes: the results of :func:`probe_feeds` for the subscriptions, in the same order
+    :return: a dictionary of feed identifier ⭢ feed configuration
+
+    """
+    configs = {}  # type: Dict[str, Dict[str, Any]]
+    for subscription, probe in zip(subscriptions, probes):
+        if probe.ok:
+            feed_id = make_feed_id(subscription, configs)
+            configs[feed_id] = {'url': subscription.url, 'reader': probe.reader}
+
+    return configs
+
+
+def find_feed_configs(config: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    Find the feed configurations in an Asphalt configuration or a feed catalog.
+
+    :param config: a feed catalog, a dictionary with a ``feeds`` key or a full application
+        configuration containing the configuration of a ``feedreader`` component
+    :return: a dictionary of feed identifier ⭢ feed configuration
+    :raises LookupError: if no feed configurations were found
+
+    """
+    if 'feeds' not in config:
+        config = config.get('component', {}).get('components', {}).get('feedreader', {})
+
+    if not isinstance(config.get('feeds'), dict):
+        raise LookupError('no feed configurations found')
+
+    return config['feeds']
+
+
+def format_probe(probe: FeedProbe) -> str:
+    """Return a single line description of the given result."""
+    if probe.ok:
+        validators = ', '.join(name for name, value in (('etag', probe.etag),
+                                                        ('last-modified', probe.last_modified))
+                               if value) or 'no validators'
+        return 'OK    {} ({}, {} bytes, {:.0f} ms, {})'.format(
+            probe.url, probe.reader, probe.size, probe.latency * 1000, validators)
+    else:
+        return 'FAIL  {} ({})'.format(probe.url, probe.error)
+
+
+def _report(probes: Sequence[FeedProbe], file) -> None:
+    for probe in probes:
+        click.echo(format_probe(probe), file=file)
+
+    working = sum(1 for probe in probes if probe.ok)
+    click.echo('{} of {} feeds working'.format(working, len(probes)), file=file)
+
+
+@click.group()
+def main():
+    pass  # pragma: no cover
+
+
+@main.command(help='Fetch feeds and report their types, sizes, latencies and validators.')
+@click.argument('url', nargs=-1)
+@click.option('--opml', type=click.File('rb'), help='read the feed URLs from an OPML file')
+@click.option('-c', '--concurrency', type=click.IntRange(1), default=20, show_default=True,
+              help='maximum number of feeds to fetch at once')
+@click.option('-t', '--timeout', type=float, default=30, show_default=True,
+              help='maximum number of seconds to wait for a feed')
+def validate(url, opml, concurrency: int, timeout: float):
+    urls = list(url)
+    if opml is not None:
+        urls.extend(subscription.url for subscription in parse_opml(opml.read()))
+    if not urls:
+        raise click.UsageError('no feeds given')
+
+    probes = asyncio.get_event_loop().run_until_complete(probe_feeds(urls, concurrency, timeout))
+    _report(probes, sys.stdout)
+    if not all(probe.ok for probe in probes):
+        sys.exit(1)
+
+
+@main.command('import', help='Convert an OPML file into component configuration or a feed '
+                             'catalog, detecting the type of each feed.')
+@click.argument('opmlfile', type=click.File('rb'))
+@click.option('-o', '--output', type=click.File('w'), default='-',
+              help='file to write the configuration to (default: standard output)')
+@click.option('-f', '--format', 'output_format', type=click.Choice(['config', 'catalog']),
+              default='config', show_default=True,
+              help='write component configuration (YAML) or a feed catalog (JSON)')
+@click.option('-c', '--concurrency', type=click.IntRange(1), default=20, show_default=True,
+              help='maximum number of feeds to fetch at once')
+@click.option('-t', '--timeout', type=float, default=30, show_default=True,
+              help='maximum number of seconds to wait for a feed')
+def import_(opmlfile, output, output_format: str, concurrency: int, timeout: float):
+    try:
+        subscriptions = parse_opml(opmlfile.read())
+    except ValueError as exc:
+        raise click.BadParameter(str(exc), param_hint='OPMLFILE') from None
+
+    urls = [subscription.url for subscription in subscriptions]
+    probes = asyncio.get_event_loop().run_until_complete(probe_feeds(urls, concurrency, timeout))
+    _report(probes, sys.stderr)
+    configs = build_feed_configs(subscriptions, probes)
+    if output_format == 'catalog':
+        json.dump({'version': 1, 'feeds': configs}, output, indent=2, sort_keys=True)
+        output.write('\n')
+    else:
+        yaml.dump({'feeds': configs}, output, Dumper=yaml.SafeDumper, default_flow_style=False)
+
+
+@main.command(help='Write the feeds in component configuration or a feed catalog as OPML.')
+@click.argument('configfile', type=click.File())
+@click.option('-o', '--output', type=click.File('wb'), default='-',
+              help='file to write the OPML document to (default: standard output)')
+@click.option('--title', default='Feeds', show_default=True, help='title of the OPML document')
+def export(configfile, output, title: str):
+    config = yaml.load(configfile, Loader=SafeLoader)
+    try:
+        configs = find_feed_configs(config if isinstance(config, dict) else {})
+    except LookupError as exc:
+        raise click.BadParameter(str(exc), param_hint='CONFIGFILE') from None
+
+    subscriptions = [Subscription(feed_config['url'], feed_id)
+                     for feed_id, feed_config in configs.items() if 'url' in feed_config]
+    output.write(generate_opml(subscriptions, title))
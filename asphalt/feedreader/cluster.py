@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+from contextlib import suppress
+from hashlib import md5
+from typing import Union, List  # noqa
+
+from asphalt.core import Context
+from typeguard import check_argument_types
+
+from asphalt.feedreader.api import FeedStateStore, FeedReader
+
+logger = logging.getLogger(__name__)
+
+
+class FeedCluster:
+    """
+    Spreads the polling of feeds across several processes or hosts sharing a feed state store.
+
+    Every node periodically records a heartbeat in the shared state store. The set of live nodes
+    is then used to assign each feed to exactly one node using rendezvous hashing, so that adding
+    or removing a node only moves the feeds of that node. Before each update, the assigned node
+    also acquires a lease on the feed from the store, which guarantees that a feed is never
+    polled by two nodes at once while the nodes' views of the cluster membership differ.
+
+    The lease lasts for the feed's polling interval plus ``node_timeout``, so the feeds of a
+    crashed node are taken over by other nodes once their leases have expired.
+
+    :param store: a feed state store or the resource name of one (for the membership information
+        and the leases)
+    :param node_id: unique identifier of this node (defaults to ``<host name>-<process id>``)
+    :param state_id: identifier of the membership information in the state store
+    :param heartbeat_interval: interval (in seconds) in which to record heartbeats
+    :param node_timeout: number of seconds after the last heartbeat after which a node is
+        considered dead
+    """
+
+    def __init__(self, store: Union[str, FeedStateStore] = 'default', node_id: str = None,
+                 state_id: str = 'feed_cluster', heartbeat_interval: float = 10,
+                 node_timeout: float = 30):
+        assert check_argument_types()
+        self.store = store
+        self.node_id = node_id or '{}-{}'.format(socket.gethostname(), os.getpid())
+        self.state_id = state_id
+        self.heartbeat_interval = heartbeat_interval
+        self.node_timeout = node_timeout
+        self._nodes = []  # type: List[str]
+
+    @property
+    def nodes(self) -> List[str]:
+        """The identifiers of the live nodes, as of the last heartbeat."""
+        return self._nodes
+
+    async def start(self, ctx: Context) -> None:
+        if isinstance(self.store, str):
+            self.store = await ctx.request_resource(FeedStateStore, self.store)
+
+        await self.heartbeat()
+        heartbeat_task = ctx.loop.create_task(self.loop_heartbeat())
+
+        async def shutdown():
+            heartbeat_task.cancel()
+            try:
+                await self.leave()
+            except Exception:
+                logger.exception('Error leaving the feed cluster')
+
+        ctx.add_teardown_callback(shutdown)
+        logger.info('Joined the feed cluster as %s (%d nodes)', self.node_id, len(self._nodes))
+
+    async def loop_heartbeat(self) -> None:
+        with suppress(asyncio.CancelledError):
+            while True:
+                await asyncio.sleep(self.heartbeat_interval)
+                try:
+                    await self.heartbeat()
+                except asyncio.CancelledError:
+                    return
+                except Exception:
+                    logger.exception('Error recording the feed cluster heartbeat')
+
+    async def _update_nodes(self, alive: bool) -> None:
+        now = time.time()
+        state = await self.store.load_state(self.state_id) or {'version': 1, 'nodes': {}}
+        nodes = {node_id: expires for node_id, expires in state['nodes'].items()
+                 if expires > now and node_id != self.node_id}
+        if alive:
+            nodes[self.node_id] = now + self.node_timeout
+
+        await self.store.store_state(self.state_id, {'version': 1, 'nodes': nodes})
+        self._nodes = sorted(nodes)
+
+    async def heartbeat(self) -> None:
+        """Record this node as alive and refresh the list of live nodes."""
+        old_nodes = self._nodes
+        await self._update_nodes(True)
+        if self._nodes != old_nodes:
+            logger.info('Feed cluster membership changed: %s', ', '.join(self._nodes))
+
+    async def leave(self) -> None:
+        """Remove this node from the cluster so its feeds are reassigned without delay."""
+        await self._update_nodes(False)
+
+    def owns(self, state_id: str) -> bool:
+        """
+        Check if the given feed is assigned to this node.
+
+        :param state_id: the state identifier of the feed
+        :return: ``True`` if this node should poll the feed
+
+        """
+        if not self._nodes:
+            return True
+
+        def score(node_id: str) -> bytes:
+            return md5('{}\n{}'.format(node_id, state_id).encode('utf-8')).digest()
+
+        return max(self._nodes, key=score) == self.node_id
+
+    async def acquire(self, reader: FeedReader) -> bool:
+        """
+        Check if the feed is assigned to this node and acquire or renew the lease on it.
+
+        :param reader: the feed reader
+        :return: ``True`` if this node may update the feed now
+
+        """
+        if not self.owns(reader.state_id):
+            return False
+
+        duration = (reader.interval or 0) + self.node_timeout
+        return await self.store.acquire_lease('feed:' + reader.state_id, self.node_id, duration)
@@ -0,0 +1,97 @@
+import asyncio
+import logging
+from typing import Dict, Tuple, Any, Callable, Awaitable, Union, List, Hashable  # noqa
+
+from typeguard import check_argument_types
+
+from asphalt.feedreader.metadata import FeedEntry
+
+logger = logging.getLogger(__name__)
+
+
+class RequestCoalescer:
+    """
+    Lets several feed readers share the downloads and parse results of the same feed.
+
+    When a feed reader asks for a document that is already being downloaded by another reader
+    (with the same URL and request headers), it waits for that download to finish instead of
+    starting a new one. Completed downloads are reused for ``ttl`` seconds, so readers updating
+    at nearly the same time also share the document. Likewise, if ``share_parsed`` is enabled,
+    identical documents are only parsed once per parser (usually the reader class) within the same
+    time window.
+
+    Each feed reader still keeps its own state, so new entries are determined separately for
+    each reader.
+
+    :param ttl: number of seconds to reuse completed downloads and parse results for
+    :param share_parsed: ``True`` to share parse results between readers using the same parser
+    """
+
+    def __init__(self, ttl: float = 5, share_parsed: bool = True):
+        assert check_argument_types()
+        self.ttl = ttl
+        self.share_parsed = share_parsed
+        self._downloads = {}  # type: Dict[Hashable, asyncio.Future]
+        self._parsed = {}  # type: Dict[Hashable, Tuple[Dict[str, Any], List[FeedEntry]]]
+
+    def _expire(self, cache: Dict[Hashable, Any], key: Hashable, value) -> None:
+        if cache.get(key) is value:
+            del cache[key]
+
+    async def fetch(self, url: str, headers: Dict[str, str],
+                    fetcher: Callable[[], Awaitable[Union[str, bytes]]]) -> Union[str, bytes]:
+        """
+        Download a document, or wait for an identical download already in progress.
+
+        :param url: the URL of the document
+        :param headers: the HTTP request headers
+        :param fetcher: a callable that performs the actual download
+        :return: the document
+
+        """
+        key = (url, tuple(sorted((key.lower(), value) for key, value in headers.items())))
+        future = self._downloads.get(key)
+        if future is None:
+            future = asyncio.ensure_future(fetcher())
+            self._downloads[key] = future
+            future.add_done_callback(self._download_finished(key))
+        else:
+            logger.debug('Coalescing download of %s', url)
+
+        # Shield the shared download from being cancelled along with any single waiter
+        return await asyncio.shield(future)
+
+    def _download_finished(self, key: Hashable):
+        def callback(future: asyncio.Future) -> None:
+            if future.cancelled() or future.exception() is not None or not self.ttl:
+                self._expire(self._downloads, key, future)
+            else:
+                asyncio.get_event_loop().call_later(self.ttl, self._expire, self._downloads, key,
+                                                    future)
+
+        return callback
+
+    def parse(self, parser_key: Hashable, content_hash: str, document: Union[str, bytes],
+              parser: Callable[[Union[str, bytes]], Tuple[Dict[str, Any], List[FeedEntry]]]
+              ) -> Tuple[Dict[str, Any], List[FeedEntry]]:
+        """
+        Parse a document, or return the result of parsing an identical document.
+
+        :param parser_key: identifies the parser (see
+            :attr:`~asphalt.feedreader.readers.base.BaseFeedReader.parser_key`)
+        :param content_hash: digest of the document
+        :param document: the document
+        :param parser: a callable that parses the document
+        :return: a tuple of (metadata, entries), as returned by the parser
+
+        """
+        if not self.share_parsed:
+            return parser(document)
+
+        key = (parser_key, content_hash)
+        result = self._parsed.get(key)
+        if result is None:
+            result = self._parsed[key] = parser(document)
+            asyncio.get_event_loop().call_later(self.ttl, self._expire, self._parsed, key, result)
+
+        return result
@@ -1,17 +1,55 @@
 import logging
-from typing import Dict, Union, Any
+from typing import Dict, Union, Any, Optional
 
 import aiohttp
 from asphalt.core import Component, Context, PluginContainer, merge_config, qualified_name
 from typeguard import check_argument_types
 
 from asphalt.feedreader.api import FeedReader
+from asphalt.feedreader.archive import EntryArchive
+from asphalt.feedreader.breaker import CircuitBreaker
+from asphalt.feedreader.cache import EntryCache
+from asphalt.feedreader.cluster import FeedCluster
+from asphalt.feedreader.coalesce import RequestCoalescer
+from asphalt.feedreader.dedup import DuplicateIndex
+from asphalt.feedreader.gc import StateCollector
+from asphalt.feedreader.hibernation import WorkingSet
+from asphalt.feedreader.pipeline import EntryPipeline
+from asphalt.feedreader.registry import FeedRegistry
+from asphalt.feedreader.resolver import CachingResolver
+from asphalt.feedreader.router import EntryRouter
+from asphalt.feedreader.websub import WebSubSubscriber
+from asphalt.feedreader.workers import WorkerPool
 
 feed_readers = PluginContainer('asphalt.feedreader.readers')
 feed_stores = PluginContainer('asphalt.feedreader.stores')
 logger = logging.getLogger(__name__)
 
 
+def detect_reader(document: Union[str, bytes], content_type: str, url: str) -> Optional[str]:
+    """
+    Determine which of the installed feed reader classes can parse the given document.
+
+    :param document: the document loaded from the feed URL
+    :param content_type: MIME type of the document
+    :param url: URL the document was loaded from (only used for logging)
+    :return: the entry point name of the first suitable feed reader class, or ``None`` if none of
+        them can parse the document
+
+    """
+    for name in feed_readers.names:
+        cls = feed_readers.resolve(name)
+        logger.info('Attempting autodetection of feed reader class for %s', url)
+        reason = cls.can_parse(document, content_type)
+        if reason:
+            logger.info('%s: %s', qualified_name(cls), reason)
+        else:
+            logger.info('Selected reader class %s for %s', qualified_name(cls), url)
+            return name
+
+    return None
+
+
 async def create_feed(ctx: Context, reader: Union[str, type] = None, **reader_args) -> FeedReader:
     """
     Create and start a syndication feed.
@@ -42,22 +80,15 @@ async def create_feed(ctx: Context, reader: Union[str, type] = None, **reader_ar
             raise LookupError('no "url" option was specified – it is required for feed reader '
                               'autodetection') from None
 
-        feed_class = None
         async with aiohttp.request('GET', url) as response:
             response.raise_for_status()
-            text = await response.text()
-            for cls in feed_readers.all():
-                logger.info('Attempting autodetection of feed reader class for %s', url)
-                reason = cls.can_parse(text, response.content_type)
-                if reason:
-                    logger.info('%s: %s', qualified_name(cls), reason)
-                else:
-                    logger.info('Selected reader class %s for %s', qualified_name(cls), url)
-                    feed_class = cls
-                    break
-            else:
+            document = await response.read()
+            reader_name = detect_reader(document, response.content_type, url)
+            if reader_name is None:
                 raise RuntimeError('unable to detect the feed type for url: ' + url)
 
+            feed_class = feed_readers.resolve(reader_name)
+
     feed = feed_class(**reader_args)
     await feed.start(ctx)
     return feed
@@ -68,19 +99,61 @@ class FeedReaderComponent(Component):
     Creates :class:`~asphalt.feedreader.api.FeedReader` resources.
 
     :param feeds: a dictionary of resource name ⭢ keyword arguments to :func:`~.create_feed`
+        (if omitted, a feed named ``default`` is created from ``feed_defaults``, unless a registry
+        is configured and no ``url`` was given)
     :param stores: a dictionary of resource name ⭢ feed state store configuration
+    :param dedup_indexes: a dictionary of resource name ⭢ keyword arguments to
+        :class:`~asphalt.feedreader.dedup.DuplicateIndex`
+    :param websub: keyword arguments to :class:`~asphalt.feedreader.websub.WebSubSubscriber`
+        (if given, the subscriber is added as a resource named ``default``)
+    :param coalescer: keyword arguments to :class:`~asphalt.feedreader.coalesce.RequestCoalescer`
+        (if given, the coalescer is added as a resource named ``default``)
+    :param cluster: keyword arguments to :class:`~asphalt.feedreader.cluster.FeedCluster`
+        (if given, the cluster is added as a resource named ``default``)
+    :param working_set: keyword arguments to
+        :class:`~asphalt.feedreader.hibernation.WorkingSet` (if given, the working set is added as
+        a resource named ``default``)
+    :param entry_cache: keyword arguments to :class:`~asphalt.feedreader.cache.EntryCache`
+        (if given, the cache is added as a resource named ``default``)
+    :param circuit_breaker: keyword arguments to
+        :class:`~asphalt.feedreader.breaker.CircuitBreaker` (if given, the circuit breaker is
+        added as a resource named ``default``)
+    :param archive: keyword arguments to :class:`~asphalt.feedreader.archive.EntryArchive`
+        (if given, the archive is added as a resource named ``default`` and all the feeds are
+        attached to it)
+    :param pipeline: keyword arguments to :class:`~asphalt.feedreader.pipeline.EntryPipeline`
+        (if given, the pipeline is added as a resource named ``default``)
+    :param resolver: keyword arguments to :class:`~asphalt.feedreader.resolver.CachingResolver`
+        (if given, the resolver is added as a resource named ``default``)
+    :param router: ``True`` to add an :class:`~asphalt.feedreader.router.EntryRouter` resource
+        (named ``default``) and attach all the feeds to it
+    :param registry: keyword arguments to :class:`~asphalt.feedreader.registry.FeedRegistry`
+        (if given, the registry is added as a resource named ``default``)
+    :param state_collector: keyword arguments to :class:`~asphalt.feedreader.gc.StateCollector`
+        (if given, the collector is added as a resource named ``default``, and the states of all
+        the feeds, duplicate indexes, the cluster and the registry are protected from it)
+    :param workers: number of worker processes to fetch and parse the feeds in (see
+        :class:`~asphalt.feedreader.workers.WorkerPool`; 0 = handle all feeds in this process)
     :param feed_defaults: defaults for keyword arguments passed to the  :func:`~.create_feed`
     """
 
     def __init__(self, feeds: Dict[str, Dict[str, Any]] = None,
-                 stores: Dict[str, Dict[str, Any]] = None, **feed_defaults):
+                 stores: Dict[str, Dict[str, Any]] = None,
+                 dedup_indexes: Dict[str, Dict[str, Any]] = None,
+                 websub: Dict[str, Any] = None, coalescer: Dict[str, Any] = None,
+                 cluster: Dict[str, Any] = None, working_set: Dict[str, Any] = None,
+                 entry_cache: Dict[str, Any] = None, circuit_breaker: Dict[str, Any] = None,
+                 archive: Dict[str, Any] = None, pipeline: Dict[str, Any] = None,
+                 resolver: Dict[str, Any] = None, router: bool = False,
+                 registry: Dict[str, Any] = None, state_collector: Dict[str, Any] = None,
+                 workers: int = 0, **feed_defaults):
         assert check_argument_types()
-        if not feeds:
+        if not feeds and (registry is None or 'url' in feed_defaults):
             feed_defaults.setdefault('context_attr', 'feed')
             feeds = {'default': feed_defaults}
 
         self.feeds = []
-        for resource_name, config in feeds.items():
+        for resource_name, config in (feeds or {}).items():
             config = merge_config(feed_defaults, config)
             context_attr = config.pop('context_attr', resource_name)
             self.feeds.append((resource_name, context_attr, config))
@@ -91,6 +164,28 @@ class FeedReaderComponent(Component):
                 store = feed_stores.create_object(**config)
                 self.stores.append((resource_name, store))
 
+        self.dedup_indexes = []
+        if dedup_indexes:
+            for resource_name, config in dedup_indexes.items():
+                index = DuplicateIndex(**config)
+                self.dedup_indexes.append((resource_name, index))
+
+        self.websub = WebSubSubscriber(**websub) if websub is not None else None
+        self.coalescer = RequestCoalescer(**coalescer) if coalescer is not None else None
+        self.cluster = FeedCluster(**cluster) if cluster is not None else None
+        self.working_set = WorkingSet(**working_set) if working_set is not None else None
+        self.entry_cache = EntryCache(**entry_cache) if entry_cache is not None else None
+        self.circuit_breaker = (CircuitBreaker(**circuit_breaker)
+                                if circuit_breaker is not None else None)
+        self.archive = EntryArchive(**archive) if archive is not None else None
+        self.pipeline = EntryPipeline(**pipeline) if pipeline is not None else None
+        self.resolver = CachingResolver(**resolver) if resolver is not None else None
+        self.router = EntryRouter() if router else None
+        self.registry = FeedRegistry(**registry) if registry is not None else None
+        self.state_collector = (StateCollector(**state_collector)
+                                if state_collector is not None else None)
+        self.workers = workers
+
     async def start(self, ctx: Context):
         for resource_name, store in self.stores:
             await store.start(ctx)
@@ -98,8 +193,108 @@ class FeedReaderComponent(Component):
             logger.info('Configured feed state store (%s; class=%s)', resource_name,
                         qualified_name(store))
 
+        if self.cluster is not None:
+            await self.cluster.start(ctx)
+            ctx.add_resource(self.cluster)
+            logger.info('Configured feed cluster (node id: %s)', self.cluster.node_id)
+
+        for resource_name, index in self.dedup_indexes:
+            await index.start(ctx)
+            ctx.add_resource(index, resource_name)
+            logger.info('Configured duplicate index (%s)', resource_name)
+
+        if self.websub is not None:
+            await self.websub.start(ctx)
+            ctx.add_resource(self.websub)
+            logger.info('Configured WebSub subscriber (callback URL: %s)',
+                        self.websub.callback_url)
+
+        if self.coalescer is not None:
+            ctx.add_resource(self.coalescer)
+            logger.info('Configured request coalescer (ttl=%s)', self.coalescer.ttl)
+
+        if self.working_set is not None:
+            ctx.add_resource(self.working_set)
+            logger.info('Configured working set (max_size=%d)', self.working_set.max_size)
+
+        if self.entry_cache is not None:
+            ctx.add_resource(self.entry_cache)
+            logger.info('Configured entry cache (max_entries=%d)', self.entry_cache.max_entries)
+
+        if self.circuit_breaker is not None:
+            ctx.add_resource(self.circuit_breaker)
+            logger.info('Configured circuit breaker (failure_threshold=%d)',
+                        self.circuit_breaker.failure_threshold)
+
+        if self.archive is not None:
+            await self.archive.start(ctx)
+            ctx.add_resource(self.archive)
+            logger.info('Configured entry archive (path=%s)', self.archive.path)
+
+        if self.pipeline is not None:
+            await self.pipeline.start(ctx)
+            ctx.add_resource(self.pipeline)
+            logger.info('Configured entry pipeline (%d processors)',
+                        len(self.pipeline.processors))
+
+        if self.resolver is not None:
+            ctx.add_resource(self.resolver)
+            ctx.add_teardown_callback(self.resolver.close)
+            logger.info('Configured caching DNS resolver (ttl=%s)', self.resolver.ttl)
+
+        if self.router is not None:
+            ctx.add_resource(self.router)
+            logger.info('Configured entry router')
+
+        # In worker mode, the feeds are polled by the worker processes instead
+        pool = WorkerPool(self.workers) if self.workers else None
         for resource_name, context_attr, config in self.feeds:
-            feed = await create_feed(ctx, **config)
+            if pool is not None:
+                feed = await create_feed(ctx, **dict(config, interval=None))
+                pool.add_feed(feed, config)
+            else:
+                feed = await create_feed(ctx, **config)
+
             ctx.add_resource(feed, resource_name, context_attr, types=[type(feed), FeedReader])
+            if self.state_collector is not None:
+                self.state_collector.protect(getattr(feed, 'state_id', resource_name))
+
+            if self.archive is not None:
+                self.archive.attach(feed)
+
+            if self.router is not None:
+                self.router.attach(feed)
+
             logger.info('Configured feed (%s / ctx.%s; url=%s)', resource_name, context_attr,
                         feed.url)
+
+        if pool is not None:
+            await pool.start(ctx)
+
+        if self.registry is not None:
+            for sink in (self.archive, self.router):
+                if sink is not None:
+                    self.registry.feed_added.connect(
+                        lambda event, sink=sink: sink.attach(event.reader))
+                    self.registry.feed_removed.connect(
+                        lambda event, sink=sink: sink.detach(event.reader))
+
+            if self.state_collector is not None:
+                self.state_collector.protect(self.registry.catalog_id)
+                self.registry.feed_added.connect(lambda event: self.state_collector.protect(
+                    getattr(event.reader, 'state_id', event.feed_id)))
+                self.registry.feed_removed.connect(lambda event: self.state_collector.unprotect(
+                    getattr(event.reader, 'state_id', event.feed_id)))
+
+            await self.registry.start(ctx)
+            ctx.add_resource(self.registry)
+            logger.info('Configured feed registry (%d feeds)', len(self.registry))
+
+        if self.state_collector is not None:
+            self.state_collector.protect(*[index.state_id for _, index in self.dedup_indexes])
+            if self.cluster is not None:
+                self.state_collector.protect(self.cluster.state_id)
+
+            await self.state_collector.start(ctx)
+            ctx.add_resource(self.state_collector)
+            logger.info('Configured state collector (max_age=%s)', self.state_collector.max_age)
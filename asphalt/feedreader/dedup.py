@@ -0,0 +1,267 @@
+import asyncio
+import logging
+import math
+import re
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+from hashlib import md5
+from typing import Union, Dict, Any, Optional  # noqa
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from asphalt.core import Context
+from typeguard import check_argument_types
+
+from asphalt.feedreader.api import FeedStateStore
+from asphalt.feedreader.metadata import FeedEntry
+
+logger = logging.getLogger(__name__)
+
+tracking_param_re = re.compile(r'^(utm_\w+|fbclid|gclid|mc_cid|mc_eid)$')
+whitespace_re = re.compile(r'\s+')
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Normalize a URL so that trivially different links to the same resource compare equal.
+
+    The scheme and host name are lower cased, the fragment is dropped, well known tracking
+    parameters (``utm_*``, ``fbclid`` etc.) are removed, the remaining query parameters are sorted
+    and any trailing slash is removed from the path.
+
+    :param url: the URL to canonicalize
+    :return: the canonicalized URL
+
+    """
+    parts = urlsplit(url.strip())
+    query = sorted((key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+                   if not tracking_param_re.match(key))
+    netloc = parts.netloc.lower()
+    if netloc.startswith('www.'):
+        netloc = netloc[4:]
+
+    return urlunsplit((parts.scheme.lower(), netloc, parts.path.rstrip('/'), urlencode(query),
+                       ''))
+
+
+def entry_fingerprint(entry: FeedEntry) -> Optional[bytes]:
+    """
+    Compute a fingerprint that identifies the story behind the given entry.
+
+    The canonicalized link is used if the entry has one. Otherwise the fingerprint is computed
+    from the whitespace normalized, case folded title and summary.
+
+    :param entry: a feed entry
+    :return: a 16 byte digest, or ``None`` if the entry has neither a link nor a title or summary
+
+    """
+    if entry.link:
+        key = 'link:' + canonicalize_url(entry.link)
+    elif entry.title or entry.summary:
+        key = 'text:{}\n{}'.format(*[whitespace_re.sub(' ', text or '').strip().casefold()
+                                     for text in (entry.title, entry.summary)])
+    else:
+        return None
+
+    return md5(key.encode('utf-8')).digest()
+
+
+class BloomFilter:
+    """
+    A fixed size probabilistic set of byte strings.
+
+    :param capacity: the expected number of distinct items
+    :param error_rate: the acceptable false positive rate when ``capacity`` items have been added
+    """
+
+    __slots__ = ('num_bits', 'num_hashes', 'bits')
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, item: bytes):
+        digest = md5(item).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, item: bytes) -> None:
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: bytes) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7))
+                   for position in self._positions(item))
+
+
+class DuplicateIndex:
+    """
+    Detects the same story being published in several feeds under different entry IDs.
+
+    Every entry is reduced to a fingerprint (see :func:`entry_fingerprint`). Fingerprints are
+    added to Bloom filters which act as a fast, memory bounded check for entries that have never
+    been seen. To keep the false positive rate from growing without bound as fingerprints keep
+    coming, the filters are rotated: once ``capacity`` fingerprints have been added to the current
+    filter, it becomes the previous one and a new, empty filter is started. A fingerprint is thus
+    remembered for at least ``capacity`` additions. The most recently seen fingerprints are also
+    kept in an LRU cache so that recent duplicates are detected exactly.
+
+    If a state store has been given, the index is loaded from it on startup and saved when
+    :meth:`save` is called after new fingerprints have been added, at most once every
+    ``save_interval`` seconds (the last changes are saved when the context is closed).
+
+    :param capacity: number of distinct entries added to a Bloom filter before it is rotated
+    :param error_rate: acceptable false positive rate of each Bloom filter
+    :param lru_size: maximum number of recent fingerprints to keep for exact matching
+    :param store: a feed state store or the resource name of one
+    :param state_id: identifier of the index's state in the state store
+    :param save_interval: minimum number of seconds between saves to the state store
+    """
+
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.001, lru_size: int = 10000,
+                 store: Union[str, FeedStateStore] = None, state_id: str = 'duplicate_index',
+                 save_interval: float = 60):
+        assert check_argument_types()
+        self.store = store
+        self.state_id = state_id
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.lru_size = lru_size
+        self.save_interval = save_interval
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._previous_bloom = None  # type: Optional[BloomFilter]
+        self._bloom_count = 0
+        self._recent = OrderedDict()  # type: Dict[bytes, None]
+        self._dirty = False
+        self._last_save = None  # type: Optional[float]
+        self._save_handle = None  # type: Optional[asyncio.Handle]
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = {
+            'version': 2,
+            'num_bits': self._bloom.num_bits,
+            'bloom': b64encode(bytes(self._bloom.bits)).decode('ascii'),
+            'bloom_count': self._bloom_count,
+            'recent': [fingerprint.hex() for fingerprint in self._recent]
+        }
+        if self._previous_bloom is not None:
+            state['previous_bloom'] = b64encode(bytes(self._previous_bloom.bits)).decode('ascii')
+
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        version = state.get('version')
+        if version not in (1, 2):
+            raise ValueError('cannot handle {} state version {}'.
+                             format(self.__class__.__name__, version))
+
+        if state['num_bits'] != self._bloom.num_bits:
+            logger.warning('Bloom filter size has changed – discarding the persisted filter')
+        elif version == 1:
+            # The number of fingerprints in the old filter is unknown, so let it age out
+            self._previous_bloom = BloomFilter(self.capacity, self.error_rate)
+            self._previous_bloom.bits = bytearray(b64decode(state['bloom']))
+        else:
+            self._bloom.bits = bytearray(b64decode(state['bloom']))
+            self._bloom_count = state['bloom_count']
+            if 'previous_bloom' in state:
+                self._previous_bloom = BloomFilter(self.capacity, self.error_rate)
+                self._previous_bloom.bits = bytearray(b64decode(state['previous_bloom']))
+
+        self._recent = OrderedDict()
+        for fingerprint in state['recent'][-self.lru_size:]:
+            fingerprint = bytes.fromhex(fingerprint)
+            self._recent[fingerprint] = None
+            if not self._bloom_contains(fingerprint):
+                self._bloom_add(fingerprint)
+
+    async def start(self, ctx: Context) -> None:
+        if isinstance(self.store, str):
+            self.store = await ctx.request_resource(FeedStateStore, self.store)
+
+        if self.store is not None:
+            state = await self.store.load_state(self.state_id)
+            if state is not None:
+                self.__setstate__(state)
+
+            ctx.add_teardown_callback(self._shutdown)
+
+    async def _shutdown(self) -> None:
+        await self.save(force=True)
+
+    def _scheduled_save(self) -> None:
+        self._save_handle = None
+        asyncio.ensure_future(self.save(force=True))
+
+    def _bloom_contains(self, fingerprint: bytes) -> bool:
+        return fingerprint in self._bloom or (self._previous_bloom is not None and
+                                              fingerprint in self._previous_bloom)
+
+    def _bloom_add(self, fingerprint: bytes) -> None:
+        if self._bloom_count >= self.capacity:
+            self._previous_bloom = self._bloom
+            self._bloom = BloomFilter(self.capacity, self.error_rate)
+            self._bloom_count = 0
+            logger.debug('Rotated the Bloom filter of duplicate index %s', self.state_id)
+
+        self._bloom.add(fingerprint)
+        self._bloom_count += 1
+
+    def check(self, entry: FeedEntry) -> bool:
+        """
+        Check if the given entry duplicates one that was seen before, and remember it if not.
+
+        :param entry: the entry to check
+        :return: ``True`` if the entry is (most likely) a duplicate, ``False`` otherwise
+
+        """
+        fingerprint = entry_fingerprint(entry)
+        if fingerprint is None:
+            return False
+
+        if fingerprint in self._recent:
+            self._recent.move_to_end(fingerprint)
+            return True
+
+        duplicate = self._bloom_contains(fingerprint)
+        if not duplicate:
+            self._bloom_add(fingerprint)
+
+        self._recent[fingerprint] = None
+        if len(self._recent) > self.lru_size:
+            self._recent.popitem(last=False)
+
+        self._dirty = True
+        return duplicate
+
+    async def save(self, force: bool = False) -> None:
+        """
+        Persist the index in the state store if it has changed since the last save.
+
+        Unless ``force`` is ``True``, the index is saved at most once every ``save_interval``
+        seconds. Changes made within that time are saved when the interval has elapsed.
+
+        :param force: ``True`` to save the changes immediately
+
+        """
+        if not self._dirty or self.store is None:
+            return
+
+        loop = asyncio.get_event_loop()
+        if not force and self._last_save is not None:
+            delay = self._last_save + self.save_interval - loop.time()
+            if delay > 0:
+                if self._save_handle is None:
+                    self._save_handle = loop.call_later(delay, self._scheduled_save)
+
+                return
+
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+            self._save_handle = None
+
+        self._dirty = False
+        self._last_save = loop.time()
+        await self.store.store_state(self.state_id, self.__getstate__())
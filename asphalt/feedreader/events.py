@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import Dict, Any
 
 from asphalt.core import Event
@@ -35,3 +36,36 @@ class MetadataEvent(Event):
         assert check_argument_types()
         super().__init__(source, topic)
         self.changes = changes
+
+
+class FeedMovedEvent(Event):
+    """
+    Signals that a feed has moved permanently to a new URL.
+
+    :ivar str old_url: the previous URL of the feed
+    :ivar str new_url: the new URL of the feed
+    """
+
+    __slots__ = ('old_url', 'new_url')
+
+    def __init__(self, source, topic: str, old_url: str, new_url: str):
+        assert check_argument_types()
+        super().__init__(source, topic)
+        self.old_url = old_url
+        self.new_url = new_url
+
+
+class ArchivedEntryEvent(EntryEvent):
+    """
+    Signals that an entry has been replayed from an entry archive.
+
+    :ivar str feed_id: state ID of the feed the entry was discovered in
+    :ivar datetime archived: the date/time when the entry was archived
+    """
+
+    __slots__ = ('feed_id', 'archived')
+
+    def __init__(self, source, topic: str, entry: FeedEntry, feed_id: str, archived: datetime):
+        super().__init__(source, topic, entry)
+        self.feed_id = feed_id
+        self.archived = archived
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import time
+from contextlib import suppress
+from typing import Union, Set, Tuple, Optional, Dict  # noqa
+
+from asphalt.core import Context
+from typeguard import check_argument_types
+
+from asphalt.feedreader.api import FeedStateStore
+
+logger = logging.getLogger(__name__)
+
+
+class StateCollector:
+    """
+    Periodically removes orphaned states from a feed state store.
+
+    Feeds removed from the configuration (or from a feed registry) leave their states behind in the
+    store. The collector deletes every state that has not been stored in ``max_age`` seconds,
+    unless it has been protected with :meth:`protect`. States whose last storage time is unknown
+    (stored before the store started recording it) are timed from the first collection run that
+    saw them, so they are only deleted if they are still there ``max_age`` seconds later.
+
+    The component protects the states of all the feeds and other objects it knows about. Note that
+    feed readers only store their states when their documents change, so unless all the states
+    in the store are protected, ``max_age`` should be well beyond the time a feed can go without
+    changing.
+
+    The store must support :meth:`~asphalt.feedreader.api.FeedStateStore.list_states` and
+    :meth:`~asphalt.feedreader.api.FeedStateStore.delete_state`.
+
+    :param store: a feed state store or the resource name of one
+    :param max_age: number of seconds after the last storage after which unprotected states are
+        deleted
+    :param interval: number of seconds between collection runs (0 or ``None`` = only collect when
+        :meth:`collect` is called)
+    :param protected_prefixes: state ID prefixes that are never deleted (the default covers the
+        leases stored by :meth:`~asphalt.feedreader.api.FeedStateStore.acquire_lease`)
+    """
+
+    def __init__(self, store: Union[str, FeedStateStore] = 'default', max_age: float = 604800,
+                 interval: Optional[float] = 3600,
+                 protected_prefixes: Tuple[str, ...] = ('lease:',)):
+        assert check_argument_types()
+        self.store = store
+        self.max_age = max_age
+        self.interval = interval
+        self.protected_prefixes = tuple(protected_prefixes)
+        self._protected = set()  # type: Set[str]
+        self._first_seen = {}  # type: Dict[str, float]
+
+    async def start(self, ctx: Context) -> None:
+        if isinstance(self.store, str):
+            self.store = await ctx.request_resource(FeedStateStore, self.store)
+
+        store_class = type(self.store)
+        for method in ('list_states', 'delete_state'):
+            if getattr(store_class, method) is getattr(FeedStateStore, method):
+                raise TypeError('{} does not implement {}(), which the state collector requires'.
+                                format(store_class.__name__, method))
+
+        if self.interval:
+            task = ctx.loop.create_task(self._run())
+            ctx.add_teardown_callback(task.cancel)
+
+    def protect(self, *state_ids: str) -> None:
+        """Prevent the given states from being deleted."""
+        self._protected.update(state_ids)
+
+    def unprotect(self, *state_ids: str) -> None:
+        """Allow the given states to be deleted once they are old enough."""
+        self._protected.difference_update(state_ids)
+
+    def is_protected(self, state_id: str) -> bool:
+        return state_id in self._protected or state_id.startswith(self.protected_prefixes)
+
+    async def collect(self, now: float = None) -> int:
+        """
+        Delete the unprotected states that have not been stored within ``max_age`` seconds.
+
+        :param now: the current time as a UNIX timestamp (defaults to the current time)
+        :return: the number of states deleted
+
+        """
+        now = now if now is not None else time.time()
+        cutoff = now - self.max_age
+        deleted = 0
+        states = await self.store.list_states()
+        first_seen = {}  # type: Dict[str, float]
+        for state_id, touched in states.items():
+            if touched is None:
+                touched = first_seen[state_id] = self._first_seen.get(state_id, now)
+
+            if not self.is_protected(state_id) and touched < cutoff:
+                await self.store.delete_state(state_id)
+                deleted += 1
+                logger.debug('Deleted orphaned state %s', state_id)
+                first_seen.pop(state_id, None)
+
+        self._first_seen = first_seen
+        if deleted:
+            logger.info('Deleted %d orphaned state(s) from the state store', deleted)
+
+        return deleted
+
+    async def _run(self) -> None:
+        with suppress(asyncio.CancelledError):
+            while True:
+                await asyncio.sleep(self.interval)
+                try:
+                    await self.collect()
+                except asyncio.CancelledError:
+                    return
+                except Exception:
+                    logger.exception('Error collecting orphaned states')
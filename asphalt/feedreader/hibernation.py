@@ -0,0 +1,63 @@
+import logging
+from collections import OrderedDict
+from typing import Dict  # noqa
+
+from typeguard import check_argument_types
+
+from asphalt.feedreader.api import FeedReader
+
+logger = logging.getLogger(__name__)
+
+
+class WorkingSet:
+    """
+    Bounds the number of feed readers that keep their state in memory.
+
+    Feed readers using a working set drop their in-memory state (seen entry IDs and the content
+    digest) between updates and reload it from their state store just before the next update.
+    Readers whose polling interval is at least ``hibernate_interval`` hibernate right after each
+    update. Other readers stay resident, but only up to ``max_size`` readers in total: when that
+    limit is exceeded, the least recently updated reader is hibernated.
+
+    Readers without a state store never hibernate, as their state could not be restored.
+
+    :param max_size: maximum number of resident feed readers
+    :param hibernate_interval: minimum polling interval (in seconds) of feed readers that are
+        hibernated immediately after updating
+    """
+
+    def __init__(self, max_size: int = 1000, hibernate_interval: float = 300):
+        assert check_argument_types()
+        self.max_size = max_size
+        self.hibernate_interval = hibernate_interval
+        self._resident = OrderedDict()  # type: Dict[FeedReader, None]
+
+    def __len__(self) -> int:
+        return len(self._resident)
+
+    def __contains__(self, reader: FeedReader) -> bool:
+        return reader in self._resident
+
+    def touch(self, reader: FeedReader) -> None:
+        """
+        Mark the given feed reader as resident and most recently used.
+
+        If the working set grows past its maximum size, the least recently used readers are
+        hibernated.
+
+        :param reader: a feed reader that has just woken up or been updated
+
+        """
+        self._resident[reader] = None
+        self._resident.move_to_end(reader)
+        for candidate in list(self._resident):
+            if len(self._resident) <= self.max_size:
+                break
+
+            # Readers in the middle of an update cannot be hibernated
+            if candidate is not reader and candidate.hibernate():
+                logger.debug('Evicted feed reader from the working set (url=%s)', candidate.url)
+
+    def discard(self, reader: FeedReader) -> None:
+        """Remove the given feed reader from the working set (when it has been hibernated)."""
+        self._resident.pop(reader, None)
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Dict, Any, Tuple, Iterable  # noqa
+from typing import Dict, Any, Tuple, Iterable, Callable, Optional  # noqa
 
 from dateutil.parser import parse
 from typeguard import check_argument_types
@@ -20,15 +20,21 @@ class FeedEntry:
     :param enclosure_url: URL to a related media object
     :param enclosure_length: size (in bytes) of the related media object
     :param enclosure_type: MIME type of the related media object
+    :param extensions: a dictionary of values from feed format extensions, keyed by
+        ``prefix:name`` (see :mod:`~asphalt.feedreader.readers.extensions`)
     """
 
     __slots__ = ('id', 'title', 'summary', 'categories', 'link', 'published', 'enclosure_url',
-                 'enclosure_length', 'enclosure_type')
+                 'enclosure_length', 'enclosure_type', 'extensions', '_loader')
+
+    #: converters for the collection valued attributes of lazily created entries (applied to
+    #: the values returned by the loader, or an empty tuple if the loader returned none)
+    lazy_converters = {'categories': tuple, 'extensions': dict}
 
     def __init__(self, id: str, *, title: str = None, summary: str = None,
                  categories: Iterable[str] = (), link: str = None, published: datetime = None,
                  enclosure_url: str = None, enclosure_length: int = None,
-                 enclosure_type: str = None):
+                 enclosure_type: str = None, extensions: Dict[str, Any] = None):
         assert check_argument_types()
         self.id = id
         self.title = title
@@ -39,6 +45,79 @@ class FeedEntry:
         self.enclosure_url = enclosure_url
         self.enclosure_length = enclosure_length
         self.enclosure_type = enclosure_type
+        self.extensions = extensions or {}
+        self._loader = None  # type: Optional[Callable[[], Dict[str, Any]]]
+
+    @classmethod
+    def lazy(cls, id: str, loader: Callable[[], Dict[str, Any]]) -> 'FeedEntry':
+        """
+        Create an entry whose attributes (other than ``id``) are decoded on first access.
+
+        This skips the constructor (and its argument type checks) entirely, which saves the work
+        of decoding entries that turn out to have been seen already. See :meth:`load` for how the
+        attributes are set.
+
+        :param id: globally unique identifier of the entry
+        :param loader: a callable that returns the keyword arguments (other than ``id``) for the
+            constructor
+        :return: an entry of this class
+
+        """
+        entry = cls.__new__(cls)
+        entry.id = id
+        entry._loader = loader
+        return entry
+
+    def __getattr__(self, name: str):
+        # This is only called for attributes that have not been set yet
+        try:
+            loader = object.__getattribute__(self, '_loader')
+        except AttributeError:
+            loader = None
+
+        if loader is None:
+            raise AttributeError('{!r} object has no attribute {!r}'.
+                                 format(self.__class__.__name__, name))
+
+        self.load()
+        return object.__getattribute__(self, name)
+
+    def load(self) -> None:
+        """
+        Decode the attributes of a lazily created entry (no-op for other entries).
+
+        The values returned by the loader are assigned to the attributes as is, without type
+        checks. Attributes the loader returned no value for are set to ``None`` (or empty
+        collections, as per :attr:`lazy_converters`).
+
+        :raises Exception: any exception raised by the loader (the entry is left unloaded)
+
+        """
+        loader = getattr(self, '_loader', None)
+        if loader is None:
+            return
+
+        values = loader()
+        converters = self.lazy_converters
+        for cls in type(self).__mro__:
+            for name in getattr(cls, '__slots__', ()):
+                if name in converters:
+                    setattr(self, name, converters[name](values.get(name) or ()))
+                elif name not in ('id', '_loader'):
+                    setattr(self, name, values.get(name))
+
+        self._loader = None
+
+    def __getstate__(self):
+        slots = [name for cls in type(self).__mro__ for name in getattr(cls, '__slots__', ())
+                 if name != '_loader']
+        return None, {name: getattr(self, name) for name in slots}
+
+    def __setstate__(self, state) -> None:
+        for name, value in state[1].items():
+            setattr(self, name, value)
+
+        self._loader = None
 
 
 class FeedMetadata:
@@ -57,6 +136,17 @@ class FeedMetadata:
     :vartype copyright: Optional[str]
     :ivar updated: the last time this feed was updated
     :vartype updated: Optional[datetime]
+    :ivar hub: URL of the WebSub hub advertised by this feed
+    :vartype hub: Optional[str]
+    :ivar self_link: the canonical URL of this feed, as advertised by the feed itself
+    :vartype self_link: Optional[str]
+    :ivar next_link: URL of the next page of a paged feed (:rfc:`5005`)
+    :vartype next_link: Optional[str]
+    :ivar prev_archive_link: URL of the previous archive document of an archived feed
+        (:rfc:`5005`)
+    :vartype prev_archive_link: Optional[str]
+    :ivar extensions: values from feed format extensions, keyed by ``prefix:name``
+    :vartype extensions: Optional[Dict[str, Any]]
     """
 
     categories = None  # type: Tuple[str, ...]
@@ -66,11 +156,36 @@ class FeedMetadata:
     generator = None  # type: str
     copyright = None  # type: str
     updated = None  # type: datetime
+    hub = None  # type: str
+    self_link = None  # type: str
+    next_link = None  # type: str
+    prev_archive_link = None  # type: str
+    extensions = None  # type: Dict[str, Any]
+
+    #: number of seconds in each of the update periods of the syndication extension
+    update_periods = {'hourly': 3600, 'daily': 86400, 'weekly': 604800, 'monthly': 2592000,
+                      'yearly': 31536000}
+
+    @property
+    def update_interval(self) -> Optional[float]:
+        """
+        The interval (in seconds) in which the publisher updates the feed, if advertised with the
+        syndication (``sy``) extension.
+
+        """
+        extensions = self.extensions or {}
+        period = self.update_periods.get(extensions.get('sy:updatePeriod'))
+        if period is None:
+            return None
+
+        frequency = extensions.get('sy:updateFrequency', '1')
+        return period / int(frequency) if frequency.isdigit() and int(frequency) else period
 
     def __getstate__(self) -> Dict[str, Any]:
         state = {
             key: getattr(self, key) for key in
-            ('categories', 'icon', 'title', 'link', 'generator', 'copyright')
+            ('categories', 'icon', 'title', 'link', 'generator', 'copyright', 'hub', 'self_link',
+             'next_link', 'prev_archive_link', 'extensions')
             if getattr(self, key) is not None
         }
         state['version'] = 1
@@ -91,5 +206,6 @@ class FeedMetadata:
                 self.updated = parse(value)
             elif attr == 'categories':
                 self.categories = tuple(value)
-            elif attr in ('icon', 'title', 'link', 'generator', 'copyright'):
+            elif attr in ('icon', 'title', 'link', 'generator', 'copyright', 'hub', 'self_link',
+                          'next_link', 'prev_archive_link', 'extensions'):
                 setattr(self, attr, value)
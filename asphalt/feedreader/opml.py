@@ -0,0 +1,116 @@
+"""
+Reading and writing of OPML subscription lists.
+
+OPML is the customary format for moving lists of feed subscriptions between feed readers. Each
+subscription is an ``outline`` element with an ``xmlUrl`` attribute. Outlines without one are
+treated as categories, and the subscriptions nested in them get the titles of the enclosing
+categories in their ``categories`` attribute.
+"""
+
+from typing import Union, List, Iterable, Tuple, Set  # noqa
+from xml.etree.ElementTree import Element, SubElement, tostring
+
+from defusedxml import ElementTree
+
+
+class Subscription:
+    """
+    A feed subscription read from (or written to) an OPML document.
+
+    :ivar str url: URL of the feed
+    :ivar str title: title of the feed
+    :ivar str html_url: URL of the web site the feed belongs to
+    :ivar tuple categories: titles of the enclosing category outlines, outermost first
+    """
+
+    __slots__ = ('url', 'title', 'html_url', 'categories')
+
+    def __init__(self, url: str, title: str = None, html_url: str = None,
+                 categories: Iterable[str] = ()):
+        self.url = url
+        self.title = title
+        self.html_url = html_url
+        self.categories = tuple(categories)
+
+    def __eq__(self, other):
+        if isinstance(other, Subscription):
+            return all(getattr(self, attr) == getattr(other, attr) for attr in self.__slots__)
+
+        return NotImplemented
+
+    def __repr__(self):
+        return '{}(url={!r}, title={!r})'.format(self.__class__.__name__, self.url, self.title)
+
+
+def _collect_subscriptions(parent: Element, categories: Tuple[str, ...],
+                           subscriptions: List[Subscription], seen_urls: Set[str]) -> None:
+    for outline in parent.findall('outline'):
+        title = outline.get('title') or outline.get('text') or None
+        url = (outline.get('xmlUrl') or '').strip()
+        if not url:
+            _collect_subscriptions(outline, categories + (title,) if title else categories,
+                                   subscriptions, seen_urls)
+        elif url not in seen_urls:
+            seen_urls.add(url)
+            subscriptions.append(Subscription(url, title, outline.get('htmlUrl'), categories))
+
+
+def parse_opml(document: Union[str, bytes]) -> List[Subscription]:
+    """
+    Read the feed subscriptions from an OPML document.
+
+    Subscriptions to the same URL after the first one are ignored.
+
+    :param document: the OPML document
+    :return: the subscriptions, in document order
+    :raises ValueError: if the document is not a valid OPML document
+
+    """
+    try:
+        root = ElementTree.fromstring(document)
+    except ElementTree.ParseError as e:
+        raise ValueError('invalid OPML document: {}'.format(e)) from None
+
+    body = root.find('body')
+    if root.tag != 'opml' or body is None:
+        raise ValueError('invalid OPML document: no opml/body element found')
+
+    subscriptions = []  # type: List[Subscription]
+    _collect_subscriptions(body, (), subscriptions, set())
+    return subscriptions
+
+
+def generate_opml(subscriptions: Iterable[Subscription], title: str = 'Feeds') -> bytes:
+    """
+    Write the given feed subscriptions as an OPML document.
+
+    Subscriptions are nested in outlines according to their categories.
+
+    :param subscriptions: the subscriptions to write
+    :param title: title of the document
+    :return: the UTF-8 encoded document
+
+    """
+    root = Element('opml', version='2.0')
+    SubElement(SubElement(root, 'head'), 'title').text = title
+    body = SubElement(root, 'body')
+    category_outlines = {(): body}
+    for subscription in subscriptions:
+        parent = body
+        for i, category in enumerate(subscription.categories, 1):
+            path = subscription.categories[:i]
+            if path not in category_outlines:
+                category_outlines[path] = SubElement(parent, 'outline', text=category,
+                                                     title=category)
+
+            parent = category_outlines[path]
+
+        outline = SubElement(parent, 'outline', type='rss', text=subscription.title or '',
+                             xmlUrl=subscription.url)
+        if subscription.title:
+            outline.set('title', subscription.title)
+        if subscription.html_url:
+            outline.set('htmlUrl', subscription.html_url)
+
+    document = tostring(root, encoding='unicode')
+    return '<?xml version="1.0" encoding="UTF-8"?>\n{}\n'.format(document).encode('utf-8')
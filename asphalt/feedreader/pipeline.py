@@ -0,0 +1,263 @@
+"""
+Post-processing of newly discovered entries before they are dispatched.
+
+A processor is a callable that takes an entry and the URL of the feed it came from, and modifies
+the entry in place. The processors of an :class:`EntryPipeline` are run in an executor, in
+batches of entries, so that expensive text processing does not block the event loop.
+
+The following built-in processors can be referred to by name:
+
+* ``resolve_urls``: resolves relative ``link`` and ``enclosure_url`` values against the feed URL
+* ``normalize_whitespace``: collapses runs of whitespace in the title, strips the summary and
+  removes empty and duplicate categories
+* ``sanitize_html``: removes scripts, embedded objects, event handler attributes and URLs with
+  schemes other than ``http``, ``https`` and ``mailto`` from HTML in the summary and content, and
+  resolves relative URLs in it
+* ``strip_html``: converts HTML in the summary and content to plain text
+"""
+
+import asyncio
+import logging
+import re
+from concurrent.futures import Executor, ThreadPoolExecutor
+from copy import copy
+from html import escape
+from html.parser import HTMLParser
+from typing import Callable, Iterable, Union, List, Optional, Sequence, Tuple  # noqa
+from urllib.parse import urljoin, urlsplit
+
+from asphalt.core import Context, resolve_reference
+from typeguard import check_argument_types
+
+from asphalt.feedreader.metadata import FeedEntry
+
+logger = logging.getLogger(__name__)
+
+EntryProcessor = Callable[[FeedEntry, str], None]
+
+markup_re = re.compile(r'<[a-zA-Z/!]|&(?:[a-zA-Z]+|#\d+|#x[0-9a-fA-F]+);')
+whitespace_re = re.compile(r'\s+')
+control_re = re.compile(r'[\x00-\x1f\x7f]')
+
+#: elements that are removed from sanitized HTML along with their content
+unsafe_elements = frozenset(['script', 'style', 'iframe', 'frame', 'frameset', 'object', 'embed',
+                             'applet', 'form', 'base', 'link', 'meta'])
+
+#: attributes whose values are URLs (besides namespaced ``href`` attributes like ``xlink:href``)
+url_attributes = frozenset(['href', 'src', 'cite', 'poster', 'action', 'background'])
+
+#: URL schemes allowed in sanitized HTML (relative URLs are resolved before checking)
+safe_schemes = frozenset(['http', 'https', 'mailto'])
+
+
+class _HTMLFilter(HTMLParser):
+    """Copies HTML while dropping unsafe content, or extracts the text from it."""
+
+    def __init__(self, base_url: str, text_only: bool):
+        super().__init__(convert_charrefs=text_only)
+        self.base_url = base_url
+        self.text_only = text_only
+        self.output = []  # type: List[str]
+        self._skip_depth = 0
+
+    def _format_tag(self, tag: str, attrs: List[Tuple[str, Optional[str]]], close: str) -> str:
+        parts = [tag]
+        for name, value in attrs:
+            if name.startswith('on') or name == 'style':
+                continue
+
+            if value is not None and (name in url_attributes or name.endswith(':href')):
+                # Browsers ignore control characters (like tabs) in URLs, so "java\tscript:" works
+                value = urljoin(self.base_url, control_re.sub('', value).strip())
+                try:
+                    scheme = urlsplit(value).scheme
+                except ValueError:
+                    continue
+
+                if scheme.lower() not in safe_schemes:
+                    continue
+
+            parts.append(name if value is None else '{}="{}"'.format(name, escape(value)))
+
+        return '<{}{}>'.format(' '.join(parts), close)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in unsafe_elements:
+            self._skip_depth += 1
+        elif not self._skip_depth and not self.text_only:
+            self.output.append(self._format_tag(tag, attrs, ''))
+        elif not self._skip_depth and tag in ('br', 'p', 'div', 'li'):
+            self.output.append(' ')
+
+    def handle_startendtag(self, tag, attrs):
+        if not self._skip_depth and tag not in unsafe_elements and not self.text_only:
+            self.output.append(self._format_tag(tag, attrs, '/'))
+
+    def handle_endtag(self, tag):
+        if tag in unsafe_elements:
+            self._skip_depth = max(self._skip_depth - 1, 0)
+        elif not self._skip_depth and not self.text_only:
+            self.output.append('</{}>'.format(tag))
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.output.append(data if self.text_only else escape(data, quote=False))
+
+    def handle_entityref(self, name):
+        if not self._skip_depth:
+            self.output.append('&{};'.format(name))
+
+    def handle_charref(self, name):
+        if not self._skip_depth:
+            self.output.append('&#{};'.format(name))
+
+    def filter(self, document: str) -> str:
+        self.feed(document)
+        self.close()
+        return ''.join(self.output)
+
+
+def _html_fields(entry: FeedEntry) -> List[str]:
+    fields = []
+    if entry.summary and markup_re.search(entry.summary):
+        fields.append('summary')
+
+    content = getattr(entry, 'content', None)
+    if content and getattr(entry, 'content_type', None) in ('html', 'xhtml', 'text/html'):
+        fields.append('content')
+
+    return fields
+
+
+def resolve_urls(entry: FeedEntry, base_url: str) -> None:
+    """Resolve relative ``link`` and ``enclosure_url`` values against the URL of the feed."""
+    if entry.link:
+        entry.link = urljoin(base_url, entry.link.strip())
+    if entry.enclosure_url:
+        entry.enclosure_url = urljoin(base_url, entry.enclosure_url.strip())
+
+
+def normalize_whitespace(entry: FeedEntry, base_url: str) -> None:
+    """Collapse whitespace in the title and remove empty and duplicate categories."""
+    if entry.title:
+        entry.title = whitespace_re.sub(' ', entry.title).strip()
+    if entry.summary:
+        entry.summary = entry.summary.strip()
+
+    categories = (whitespace_re.sub(' ', category).strip() for category in entry.categories
+                  if category)
+    entry.categories = tuple(category for category in dict.fromkeys(categories) if category)
+
+
+def sanitize_html(entry: FeedEntry, base_url: str) -> None:
+    """Remove unsafe elements and attributes from HTML in the summary and content."""
+    for field in _html_fields(entry):
+        setattr(entry, field, _HTMLFilter(base_url, False).filter(getattr(entry, field)))
+
+
+def strip_html(entry: FeedEntry, base_url: str) -> None:
+    """Convert HTML in the summary and content to plain text."""
+    for field in _html_fields(entry):
+        text = _HTMLFilter(base_url, True).filter(getattr(entry, field))
+        setattr(entry, field, whitespace_re.sub(' ', text).strip())
+        if field == 'content':
+            entry.content_type = 'text'
+
+
+#: built-in processors by name
+builtin_processors = {
+    'resolve_urls': resolve_urls,
+    'normalize_whitespace': normalize_whitespace,
+    'sanitize_html': sanitize_html,
+    'strip_html': strip_html
+}
+
+
+def process_entries(processors: Sequence[EntryProcessor], entries: List[FeedEntry],
+                    base_url: str) -> List[FeedEntry]:
+    """
+    Run a batch of entries through the given processors.
+
+    The entries are copied before processing, as the originals may be shared with other readers
+    of the same feed (through a request coalescer).
+
+    :param processors: the processors to run, in order
+    :param entries: the entries to process
+    :param base_url: URL of the feed the entries came from
+    :return: the processed copies of the entries
+
+    """
+    processed = []
+    for entry in entries:
+        entry = copy(entry)
+        for processor in processors:
+            try:
+                processor(entry, base_url)
+            except Exception:
+                logger.exception('Error running entry processor %r on entry %s (url=%s)',
+                                 processor, entry.id, base_url)
+
+        processed.append(entry)
+
+    return processed
+
+
+class EntryPipeline:
+    """
+    Runs newly discovered entries through a series of processors before they are dispatched.
+
+    Feed readers configured with a pipeline pass their new entries to :meth:`process` in batches
+    of up to ``batch_size`` entries. Each batch is processed in the executor. A process pool
+    executor can be used for CPU heavy processors, provided that the processors can be pickled
+    (module level functions can).
+
+    :param processors: the processors to run, in order, as callables, ``module:varname``
+        references or names of built-in processors
+    :param batch_size: maximum number of entries to process in a single executor call
+    :param executor: an executor or the resource name of one (if omitted, a thread pool with
+        ``max_workers`` threads is created)
+    :param max_workers: maximum number of threads in the thread pool created by the pipeline
+    """
+
+    def __init__(self, processors: Iterable[Union[str, EntryProcessor]] = (
+                     'resolve_urls', 'normalize_whitespace', 'sanitize_html'),
+                 batch_size: int = 100, executor: Union[str, Executor] = None,
+                 max_workers: int = None):
+        assert check_argument_types()
+        self.processors = []  # type: List[EntryProcessor]
+        for processor in processors:
+            if isinstance(processor, str):
+                processor = builtin_processors.get(processor) or resolve_reference(processor)
+
+            self.processors.append(processor)
+
+        self.batch_size = batch_size
+        self.executor = executor
+        self.max_workers = max_workers
+
+    async def start(self, ctx: Context) -> None:
+        if isinstance(self.executor, str):
+            self.executor = await ctx.request_resource(Executor, self.executor)
+        elif self.executor is None:
+            self.executor = ThreadPoolExecutor(self.max_workers)
+            ctx.add_teardown_callback(self.executor.shutdown)
+
+    async def process(self, entries: Sequence[FeedEntry], base_url: str) -> List[FeedEntry]:
+        """
+        Run the given entries through the processors.
+
+        :param entries: the entries to process
+        :param base_url: URL of the feed the entries came from
+        :return: the processed entries, in the original order
+
+        """
+        if not entries or not self.processors:
+            return list(entries)
+
+        loop = asyncio.get_event_loop()
+        batches = [entries[i:i + self.batch_size]
+                   for i in range(0, len(entries), self.batch_size)]
+        results = await asyncio.gather(*[
+            loop.run_in_executor(self.executor, process_entries, self.processors, list(batch),
+                                 base_url) for batch in batches])
+        return [entry for batch in results for entry in batch]
@@ -1,14 +1,21 @@
 import logging
+from functools import partial
 from string import whitespace
-from typing import List, Dict, Any, Tuple, Optional
+from typing import List, Dict, Any, Tuple, Optional, Union
 
-from dateutil.parser import parse
 from defusedxml import ElementTree
 
+from asphalt.feedreader.readers import extensions
 from asphalt.feedreader.readers.base import BaseFeedReader, FeedEntry
+from asphalt.feedreader.readers.extensions import (
+    ElementHandler, element_text, text_handler, date_handler, list_handler)
+from asphalt.feedreader.readers.xml import get_xml_parser
 
 logger = logging.getLogger(__name__)
 
+ATOM_NAMESPACE = '{http://www.w3.org/2005/Atom}'
+PERSON_TAGS = {ATOM_NAMESPACE + name: name for name in ('name', 'email', 'uri')}
+
 
 class Person:
     """
@@ -52,6 +59,8 @@ class AtomEntry(FeedEntry):
 
     __slots__ = ('content', 'content_type', 'authors', 'contributors', 'updated')
 
+    lazy_converters = dict(FeedEntry.lazy_converters, authors=tuple, contributors=tuple)
+
     def __init__(self, *, content: str = None, content_type: str = None, updated: str = None,
                  authors: List[Person] = (), contributors: List[Person] = (), **kwargs):
         super().__init__(**kwargs)
@@ -62,17 +71,99 @@ class AtomEntry(FeedEntry):
         self.updated = updated
 
 
+def _handle_feed_link(element, metadata: Dict[str, Any]) -> None:
+    rel = element.attrib.get('rel')
+    if rel == 'alternate':
+        metadata['link'] = element.attrib['href']
+    elif rel == 'hub':
+        metadata['hub'] = element.attrib['href']
+    elif rel == 'self':
+        metadata['self_link'] = element.attrib['href']
+    elif rel == 'next':
+        metadata['next_link'] = element.attrib['href']
+    elif rel == 'prev-archive':
+        metadata['prev_archive_link'] = element.attrib['href']
+
+
+def _handle_entry_link(element, kwargs: Dict[str, Any]) -> None:
+    rel = element.attrib.get('rel')
+    if rel == 'alternate':
+        kwargs['link'] = element.attrib['href']
+    elif rel == 'enclosure':
+        kwargs['enclosure_url'] = element.attrib['href']
+        if 'length' in element.attrib:
+            kwargs['enclosure_length'] = int(element.attrib['length'])
+        if 'type' in element.attrib:
+            kwargs['enclosure_type'] = element.attrib['type']
+
+
+def _handle_content(element, kwargs: Dict[str, Any]) -> None:
+    kwargs['content'] = element_text(element)
+    kwargs['content_type'] = element.attrib.get('type', 'text')
+
+
+def _person_handler(key: str) -> ElementHandler:
+    def handler(element, kwargs: Dict[str, Any]) -> None:
+        attrs = {PERSON_TAGS[subtag.tag]: subtag.text.strip(whitespace)
+                 for subtag in element if subtag.text and subtag.tag in PERSON_TAGS}
+        kwargs.setdefault(key, []).append(Person(**attrs))
+
+    return handler
+
+
 class AtomFeedReader(BaseFeedReader):
-    """Represents an Atom (:rfc:`4287`) feed."""
+    """
+    Represents an Atom (:rfc:`4287`) feed.
 
-    NAMESPACE = '{http://www.w3.org/2005/Atom}'
+    :param xml_parser: name of the XML parser engine to use (see
+        :mod:`~asphalt.feedreader.readers.xml`)
+    """
 
-    def __init__(self, *args, **kwargs):
+    NAMESPACE = ATOM_NAMESPACE
+
+    entry_region_markers = (b'<entry', b'</entry>')
+
+    #: element handlers for the children of ``<feed>``, which collect the feed metadata (see
+    #: :mod:`~asphalt.feedreader.readers.extensions`)
+    feed_handlers = {
+        ATOM_NAMESPACE + 'id': text_handler('id'),
+        ATOM_NAMESPACE + 'title': text_handler('title'),
+        ATOM_NAMESPACE + 'icon': text_handler('icon'),
+        ATOM_NAMESPACE + 'generator': text_handler('generator'),
+        ATOM_NAMESPACE + 'updated': date_handler('updated'),
+        ATOM_NAMESPACE + 'subtitle': text_handler('description'),
+        ATOM_NAMESPACE + 'rights': text_handler('copyright'),
+        ATOM_NAMESPACE + 'link': _handle_feed_link
+    }  # type: Dict[str, ElementHandler]
+    feed_handlers.update(extensions.feed_handlers)
+
+    #: element handlers for the children of ``<entry>``, which collect the keyword arguments for
+    #: :class:`AtomEntry`
+    entry_handlers = {
+        ATOM_NAMESPACE + 'title': text_handler('title'),
+        ATOM_NAMESPACE + 'summary': text_handler('summary'),
+        ATOM_NAMESPACE + 'published': date_handler('published'),
+        ATOM_NAMESPACE + 'updated': date_handler('updated'),
+        ATOM_NAMESPACE + 'content': _handle_content,
+        ATOM_NAMESPACE + 'category': list_handler('categories'),
+        ATOM_NAMESPACE + 'link': _handle_entry_link,
+        ATOM_NAMESPACE + 'author': _person_handler('authors'),
+        ATOM_NAMESPACE + 'contributor': _person_handler('contributors')
+    }  # type: Dict[str, ElementHandler]
+    entry_handlers.update(extensions.entry_handlers)
+
+    def __init__(self, *args, xml_parser: str = 'etree', **kwargs):
         super().__init__(*args, **kwargs)
         self.http_headers.setdefault('accept', 'application/rss+atom; text/xml')
+        get_xml_parser(xml_parser)  # fail early if the engine is not available
+        self.xml_parser = xml_parser
+
+    def _parse_document(
+            self, document: Union[str, bytes]) -> Tuple[Dict[str, Any], List[FeedEntry]]:
+        return self.parse_document(document, xml_parser=self.xml_parser)
 
     @classmethod
-    def can_parse(cls, document: str, content_type: str) -> Optional[str]:
+    def can_parse(cls, document: Union[str, bytes], content_type: str) -> Optional[str]:
         if content_type not in ('application/atom+xml', 'text/xml'):
             return ("Incompatible content type (got %r, needs to be either 'application/atom+xml' "
                     "or 'text/xml')" % content_type)
@@ -89,60 +180,43 @@ class AtomFeedReader(BaseFeedReader):
         return None
 
     @classmethod
-    def parse_document(cls, document: str) -> Tuple[Dict[str, Any], List[FeedEntry]]:
-        root = ElementTree.fromstring(document)
-        metadata_changes = {}
+    def parse_document(cls, document: Union[str, bytes], *,
+                       xml_parser: str = 'etree') -> Tuple[Dict[str, Any], List[FeedEntry]]:
+        root = get_xml_parser(xml_parser)(document)
+        metadata_changes = {}  # type: Dict[str, Any]
+        handlers = cls.feed_handlers
         for tag in root:
-            tag_name = tag.tag.replace(cls.NAMESPACE, '')
-            tag_text = tag.text.strip(whitespace) if tag.text else None
-            if tag_name in ('id', 'title', 'icon', 'generator'):
-                metadata_changes[tag_name] = tag_text
-            elif tag_name == 'updated':
-                metadata_changes[tag_name] = parse(tag_text)
-            elif tag_name == 'subtitle':
-                metadata_changes['description'] = tag_text
-            elif tag_name == 'rights':
-                metadata_changes['copyright'] = tag_text
-            elif tag_name == 'link':
-                if tag.attrib.get('rel') == 'alternate':
-                    metadata_changes['link'] = tag.attrib['href']
+            handler = handlers.get(tag.tag)
+            if handler is not None:
+                handler(tag, metadata_changes)
 
+        # Only the IDs are extracted here; the rest is decoded when the entries are accessed
         events = []  # type: List[AtomEntry]
+        id_tag = cls.NAMESPACE + 'id'
         for entry in root.iter(cls.NAMESPACE + 'entry'):
-            kwargs = {}
-            for tag in entry:
-                tag_name = tag.tag.replace(cls.NAMESPACE, '')
-                tag_text = tag.text.strip(whitespace) if tag.text else None
-                if tag_name in ('title', 'id', 'summary'):
-                    kwargs[tag_name] = tag_text
-                elif tag_name in ('published', 'updated'):
-                    kwargs[tag_name] = parse(tag_text)
-                elif tag_name == 'content':
-                    kwargs[tag_name] = tag_text
-                    kwargs['content_type'] = tag.attrib.get('type', 'text')
-                elif tag_name == 'category':
-                    kwargs.setdefault('categories', []).append(tag_text)
-                elif tag_name == 'link':
-                    if tag.attrib.get('rel') == 'alternate':
-                        kwargs['link'] = tag.attrib['href']
-                    elif tag.attrib.get('rel') == 'enclosure':
-                        kwargs['enclosure_url'] = tag.attrib['href']
-                        if 'length' in tag.attrib:
-                            kwargs['enclosure_length'] = int(tag.attrib['length'])
-                        if 'type' in tag.attrib:
-                            kwargs['enclosure_type'] = tag.attrib['type']
-                elif tag_name == 'author':
-                    attrs = {subtag.tag.replace(cls.NAMESPACE, ''): subtag.text.strip(whitespace)
-                             for subtag in tag if subtag.text}
-                    kwargs.setdefault('authors', []).append(Person(**attrs))
-                elif tag_name == 'contributor':
-                    attrs = {subtag.tag.replace(cls.NAMESPACE, ''): subtag.text.strip(whitespace)
-                             for subtag in tag if subtag.text}
-                    kwargs.setdefault('contributors', []).append(Person(**attrs))
-
-            if 'id' in kwargs:
-                events.insert(0, AtomEntry(**kwargs))
+            id_element = entry.find(id_tag)
+            if id_element is not None:
+                entry_id = id_element.text.strip(whitespace) if id_element.text else None
+                events.insert(0, AtomEntry.lazy(entry_id, partial(cls.parse_entry, entry)))
             else:
                 logger.warning('Encountered entry without an "id" element')
 
         return metadata_changes, events
+
+    @classmethod
+    def parse_entry(cls, entry) -> Dict[str, Any]:
+        """
+        Decode the fields of an ``<entry>`` element.
+
+        :param entry: the XML element
+        :return: keyword arguments for :class:`AtomEntry` (except ``id``)
+
+        """
+        kwargs = {}  # type: Dict[str, Any]
+        handlers = cls.entry_handlers
+        for tag in entry:
+            handler = handlers.get(tag.tag)
+            if handler is not None:
+                handler(tag, kwargs)
+
+        return kwargs
@@ -1,58 +1,224 @@
 import asyncio
 import logging
+import random
+import zlib
 from abc import abstractmethod
 from contextlib import suppress
-from datetime import timedelta  # noqa
-from typing import Union, List, Set, Dict, Any, Tuple  # noqa
+from datetime import datetime, timedelta, timezone  # noqa
+from typing import Union, List, Set, Dict, Any, Tuple, Optional, Hashable  # noqa
+from urllib.parse import urlsplit, urljoin
 
-from aiohttp import ClientSession
-from asphalt.core import Context
+from aiohttp import (
+    ClientSession, ClientConnectionError, ClientResponseError, ServerTimeoutError, TCPConnector)
+from asphalt.core import Context, Signal
 from multidict import CIMultiDict
 from typeguard import check_argument_types
 
 from asphalt.feedreader.api import FeedStateStore, FeedReader
+from asphalt.feedreader.breaker import CircuitBreaker
+from asphalt.feedreader.cache import EntryCache
+from asphalt.feedreader.cluster import FeedCluster
+from asphalt.feedreader.coalesce import RequestCoalescer
+from asphalt.feedreader.dedup import DuplicateIndex
+from asphalt.feedreader.events import FeedMovedEvent
+from asphalt.feedreader.hibernation import WorkingSet
 from asphalt.feedreader.metadata import FeedMetadata, FeedEntry
+from asphalt.feedreader.pipeline import EntryPipeline
+from asphalt.feedreader.resolver import CachingResolver
+from asphalt.feedreader.websub import WebSubSubscriber
+from asphalt.feedreader.transfer import (
+    TransferStatistics, FeedGoneError, FetchTimeoutError, read_document, accepted_encodings)
 
 logger = logging.getLogger(__name__)
 
 
+def is_transient_error(exc: BaseException) -> bool:
+    """
+    Check if the given exception from a feed download is likely to go away by itself.
+
+    This is the case for timeouts, connection errors and ``5xx`` or ``429`` responses.
+
+    """
+    if isinstance(exc, ClientResponseError):
+        return exc.code >= 500 or exc.code == 429
+
+    return isinstance(exc, (asyncio.TimeoutError, ClientConnectionError, OSError))
+
+
+def _as_aware(value: datetime) -> datetime:
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
 class BaseFeedReader(FeedReader):
     """
     Base class for news syndication feeds.
 
     :ivar FeedMetadata metadata: latest metadata extracted from the feed
+    :ivar TransferStatistics statistics: amounts of data transferred while downloading the feed
+    :ivar str url: current URL of the feed (updated when the server permanently redirects the
+        reader elsewhere)
+    :var moved: a signal dispatched when :attr:`url` has been changed due to a permanent redirect
+    :vartype moved: Signal[FeedMovedEvent]
 
     :param url: source URL for the feed
     :param store: a feed state store or the resource name of one
     :param state_id: unique identifier to use for the state of this feed in the state store
         (defaults to the value of ``url``)
-    :param client_session: an aiohttp client session or the resource name of one
+    :param client_session: an aiohttp client session or the resource name of one (if omitted, a
+        new session is created which lets the reader decompress documents itself and thus record
+        the number of bytes received over the wire)
     :param http_headers: dictionary of HTTP request headers to use when loading the feed
     :param interval: interval (in seconds) in which to call :meth:`update` (0 or ``None``) to
         disable automatic checking
+    :param dedup_index: a duplicate index or the resource name of one, for suppressing entries
+        that have already been discovered in other feeds (possibly under different IDs)
+    :param max_document_size: maximum size (in bytes) of the decompressed feed document
+        (``None`` = unlimited)
+    :param hash_entries_only: when checking if the document has changed since the last update,
+        only consider the part of the document containing the entries (so that changes in feed
+        level elements like timestamps alone don't trigger parsing; requires
+        :attr:`entry_region_markers` to be set on the reader class)
+    :param websub: a WebSub subscriber or the resource name of one, for receiving new content
+        pushed from the hub advertised by the feed (if any) instead of frequent polling
+    :param coalescer: a request coalescer or the resource name of one, for sharing downloads (and
+        parse results) with other readers of the same feed
+    :param cluster: a feed cluster or the resource name of one, for sharing the polling of feeds
+        with other nodes (only the node the feed is assigned to updates it automatically)
+    :param working_set: a working set or the resource name of one, for dropping the in-memory
+        state of the reader between updates (requires a state store)
+    :param entry_cache: an entry cache or the resource name of one, for keeping the discovered
+        entries in memory (keyed by ``state_id``)
+    :param circuit_breaker: a circuit breaker or the resource name of one, for pausing the polling
+        of feeds on hosts that keep failing
+    :param connect_timeout: maximum number of seconds to wait for a connection to the server (only
+        applies to the client session created by the reader itself)
+    :param first_byte_timeout: maximum number of seconds to wait for the response headers after
+        sending a request
+    :param total_timeout: maximum number of seconds for downloading the document on each update,
+        including any retries
+    :param min_transfer_rate: minimum average transfer rate (in bytes per second) of the response
+        body, enforced after the first few seconds of the transfer
+    :param retries: maximum number of times to retry a download that fails due to a timeout,
+        connection error or server error
+    :param retry_backoff: base delay (in seconds) between retries, doubled on every retry (the
+        actual delay is picked at random between zero and that value)
+    :param hedge_after: number of seconds after which a second, identical request is sent if the
+        first one has not completed yet (whichever completes first is used)
+    :param pipeline: an entry pipeline or the resource name of one, for post-processing new
+        entries before they are dispatched
+    :param resolver: a caching DNS resolver or the resource name of one, for the client session
+        created by the reader (also used to warm up before scheduled updates)
+    :param catch_up_pages: maximum number of older pages (:rfc:`5005` paged or archived feeds) to
+        fetch when none of the entries in the feed document have been seen before (0 = disable)
+    :param catch_up_concurrency: maximum number of older pages to fetch at once
+    :param onboarding: which of the entries to dispatch on the first update of a feed that has no
+        saved state: ``all``, ``none`` (only mark them as seen), ``newest`` (the newest
+        ``onboarding_limit`` entries) or ``since`` (entries published at or after
+        ``onboarding_since``)
+    :param onboarding_limit: number of entries to dispatch with the ``newest`` policy
+    :param onboarding_since: earliest publication date of the entries to dispatch with the
+        ``since`` policy (naive datetimes are assumed to be in UTC)
     """
 
+    moved = Signal(FeedMovedEvent)
+
+    #: valid values for the ``onboarding`` option
+    onboarding_policies = ('all', 'none', 'newest', 'since')
+
     metadata_cls = FeedMetadata
 
+    #: a tuple of (start marker, end marker) delimiting the part of the raw document that contains
+    #: the entries (used by :meth:`hash_document` if ``hash_entries_only`` is enabled)
+    entry_region_markers = None  # type: Optional[Tuple[bytes, bytes]]
+
     def __init__(self, url: str, store: Union[str, FeedStateStore] = None, state_id: str = None,
                  client_session: Union[str, ClientSession] = None,
-                 http_headers: Dict[str, Any] = None, interval: Union[int, timedelta, None] = 300):
+                 http_headers: Dict[str, Any] = None, interval: Union[int, timedelta, None] = 300,
+                 dedup_index: Union[str, DuplicateIndex] = None, max_document_size: int = None,
+                 hash_entries_only: bool = False, websub: Union[str, WebSubSubscriber] = None,
+                 coalescer: Union[str, RequestCoalescer] = None,
+                 cluster: Union[str, FeedCluster] = None,
+                 working_set: Union[str, WorkingSet] = None,
+                 entry_cache: Union[str, EntryCache] = None,
+                 circuit_breaker: Union[str, CircuitBreaker] = None,
+                 connect_timeout: Optional[float] = 10, first_byte_timeout: Optional[float] = 30,
+                 total_timeout: Optional[float] = 120, min_transfer_rate: float = None,
+                 retries: int = 0, retry_backoff: float = 1, hedge_after: float = None,
+                 pipeline: Union[str, EntryPipeline] = None,
+                 resolver: Union[str, CachingResolver] = None, catch_up_pages: int = 10,
+                 catch_up_concurrency: int = 4, onboarding: str = 'all',
+                 onboarding_limit: int = 10, onboarding_since: datetime = None):
         assert check_argument_types()
-        self.url = url
+        self.url = self._configured_url = url
         self.store = store
         self.state_id = state_id or url
         self.session = client_session
         self.http_headers = CIMultiDict(http_headers or {})
         self.interval = interval.total_seconds() if isinstance(interval, timedelta) else interval
+        self.dedup_index = dedup_index
+        self.max_document_size = max_document_size
+        self.hash_entries_only = hash_entries_only
+        self.websub = websub
+        self.coalescer = coalescer
+        self.cluster = cluster
+        self.working_set = working_set
+        self.entry_cache = entry_cache
+        self.circuit_breaker = circuit_breaker
+        self.connect_timeout = connect_timeout
+        self.first_byte_timeout = first_byte_timeout
+        self.total_timeout = total_timeout
+        self.min_transfer_rate = min_transfer_rate
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.hedge_after = hedge_after
+        self.pipeline = pipeline
+        self.resolver = resolver
+        self.catch_up_pages = catch_up_pages
+        self.catch_up_concurrency = catch_up_concurrency
+        if onboarding not in self.onboarding_policies:
+            raise ValueError('onboarding must be one of: ' + ', '.join(self.onboarding_policies))
+        if onboarding == 'since' and onboarding_since is None:
+            raise ValueError('the "since" onboarding policy requires onboarding_since to be set')
+        if onboarding_since is not None and onboarding_since.tzinfo is None:
+            onboarding_since = onboarding_since.replace(tzinfo=timezone.utc)
+
+        self.onboarding = onboarding
+        self.onboarding_limit = onboarding_limit
+        self.onboarding_since = onboarding_since
+        self.statistics = TransferStatistics()
+        self._decode_content = False
         self._metadata = self.metadata_cls()
         self._seen_entry_ids = set()  # type: Set[str]
+        self._content_hash = None  # type: Optional[str]
+        self._leased = False
+        self._hibernating = False
+        self._busy = 0
+        self._gone = False
+        self._circuit_state = None  # type: Optional[Dict[str, Any]]
+        self._onboarding = True
 
     def __getstate__(self) -> Dict[str, Any]:
-        return {
+        state = {
             'version': 1,
             'seen_entry_ids': list(self._seen_entry_ids),
             'metadata': self._metadata.__getstate__()
         }
+        if self._content_hash is not None:
+            state['content_hash'] = self._content_hash
+
+        if self.url != self._configured_url:
+            state['url'] = self.url
+            state['moved_from'] = self._configured_url
+
+        if self._gone:
+            state['gone'] = True
+
+        if self.circuit_breaker is not None:
+            circuit_state = self.circuit_breaker.get_state(self.host)
+            if circuit_state is not None:
+                state['circuit'] = circuit_state
+
+        return state
 
     def __setstate__(self, state: Dict[str, Any]) -> None:
         version = state.get('version')
@@ -61,49 +227,316 @@ class BaseFeedReader(FeedReader):
                              format(self.__class__.__name__, version))
 
         self._seen_entry_ids = set(state['seen_entry_ids'])
+        self._onboarding = False
         if 'metadata' in state:
             metadata = self.metadata_cls()
             metadata.__setstate__(state['metadata'])
             self._metadata = metadata
 
+        self._content_hash = state.get('content_hash')
+        self._gone = state.get('gone', False)
+        self._circuit_state = state.get('circuit')
+
+        # Only follow a stored redirect if the feed has not been reconfigured since then
+        if state.get('moved_from') == self._configured_url:
+            self._move(state['url'])
+
+    def _move(self, url: str) -> None:
+        if url != self.url:
+            old_url, self.url = self.url, url
+            self.moved.dispatch(old_url, url)
+
     @property
     def metadata(self):
         return self._metadata
 
+    @property
+    def parser_key(self) -> Hashable:
+        """
+        A key identifying how this reader parses documents.
+
+        Readers with equal keys must produce equal results from the same document. This is used
+        to share parse results via the request coalescer. The default is the reader class.
+
+        """
+        return type(self)
+
+    @property
+    def host(self) -> str:
+        """The host name in the current URL of the feed."""
+        return urlsplit(self.url).hostname or ''
+
+    @property
+    def gone(self) -> bool:
+        """``True`` if the server has reported the feed as permanently gone (``410 Gone``)."""
+        return self._gone
+
     async def start(self, ctx: Context) -> None:
         if isinstance(self.store, str):
             self.store = await ctx.request_resource(FeedStateStore, self.store)
 
+        if isinstance(self.dedup_index, str):
+            self.dedup_index = await ctx.request_resource(DuplicateIndex, self.dedup_index)
+
+        if isinstance(self.websub, str):
+            self.websub = await ctx.request_resource(WebSubSubscriber, self.websub)
+
+        if isinstance(self.coalescer, str):
+            self.coalescer = await ctx.request_resource(RequestCoalescer, self.coalescer)
+
+        if isinstance(self.cluster, str):
+            self.cluster = await ctx.request_resource(FeedCluster, self.cluster)
+
+        if isinstance(self.working_set, str):
+            self.working_set = await ctx.request_resource(WorkingSet, self.working_set)
+
+        if isinstance(self.entry_cache, str):
+            self.entry_cache = await ctx.request_resource(EntryCache, self.entry_cache)
+
+        if isinstance(self.circuit_breaker, str):
+            self.circuit_breaker = await ctx.request_resource(CircuitBreaker,
+                                                              self.circuit_breaker)
+
+        if isinstance(self.pipeline, str):
+            self.pipeline = await ctx.request_resource(EntryPipeline, self.pipeline)
+
+        if isinstance(self.resolver, str):
+            self.resolver = await ctx.request_resource(CachingResolver, self.resolver)
+
         if isinstance(self.session, str):
             self.session = await ctx.request_resource(ClientSession, self.session)
         elif self.session is None:
-            self.session = ClientSession()
+            connector = None
+            if self.resolver is not None:
+                # The resolver does the caching, so the connector's own DNS cache is not needed
+                connector = TCPConnector(resolver=self.resolver, use_dns_cache=False)
+
+            self.session = ClientSession(connector=connector, auto_decompress=False,
+                                         conn_timeout=self.connect_timeout)
             ctx.add_teardown_callback(self.session.close)
 
-        if self.store is not None:
-            state = await self.store.load_state(self.state_id)
-            self.__setstate__(state)
+        # Decompress the documents here unless the session does it on its own
+        self._decode_content = not getattr(self.session, '_auto_decompress', True)
+        encodings = accepted_encodings(self.max_document_size) if self._decode_content \
+            else ('gzip', 'deflate')
+        self.http_headers.setdefault('accept-encoding', ', '.join(encodings))
+
+        await self.load_state()
+        if self.circuit_breaker is not None and self._circuit_state is not None:
+            self.circuit_breaker.restore(self.host, self._circuit_state)
 
-        if self.interval:
+        if self._gone:
+            logger.warning('Not polling retired feed (url=%s)', self.url)
+        elif self.interval:
             loop_task = ctx.loop.create_task(self.loop_update())
             ctx.add_teardown_callback(loop_task.cancel)
 
+    async def load_state(self) -> None:
+        """Restore the state of the reader from the state store, if there is one."""
+        if self.store is not None:
+            state = await self.store.load_state(self.state_id)
+            if state is not None:
+                self.__setstate__(state)
+
+    async def acquire_lease(self) -> bool:
+        """
+        Check if this node should update the feed, when the polling is shared by a cluster.
+
+        When the lease on the feed is newly acquired, the state is reloaded from the store first
+        since another node may have updated the feed in the meantime.
+
+        :return: ``True`` if the feed should be updated by this node
+
+        """
+        if self.cluster is None:
+            return True
+
+        leased = await self.cluster.acquire(self)
+        if leased and not self._leased:
+            await self.load_state()
+
+        self._leased = leased
+        return leased
+
     async def loop_update(self):
         with suppress(asyncio.CancelledError):
             while True:
                 try:
-                    await self.update()
+                    if await self.acquire_lease():
+                        await self.update()
                 except asyncio.CancelledError:
                     return
+                except FeedGoneError:
+                    logger.warning('Feed is gone; stopped polling it (url=%s)', self.url)
+                    return
+                except asyncio.TimeoutError as exc:
+                    logger.warning('Timed out updating feed (%s; url=%s)', exc, self.url)
                 except Exception:
                     logger.exception('Error updating feed (url=%s)', self.url)
 
-                await asyncio.sleep(self.interval)
+                # Fall back to a long polling interval when the hub is pushing content to us
+                interval = self.interval
+                if self.websub is not None and self.websub.is_subscribed(self):
+                    interval = max(interval, self.websub.fallback_interval)
+
+                if self.working_set is not None and \
+                        interval >= self.working_set.hibernate_interval:
+                    self.hibernate()
+
+                lead = self.resolver.warm_up_lead if self.resolver is not None else None
+                if lead is not None and interval > lead:
+                    await asyncio.sleep(interval - lead)
+                    await self.warm_up()
+                    await asyncio.sleep(lead)
+                else:
+                    await asyncio.sleep(interval)
+
+    async def warm_up(self) -> None:
+        """
+        Prepare for an upcoming update by resolving the host name of the feed in advance.
+
+        If the resolver has ``preconnect`` enabled, a ``HEAD`` request is also sent to the feed
+        URL so that the update can reuse the kept-alive connection. Errors are ignored.
+
+        """
+        if self.resolver is None or not await self.resolver.prefetch(self.host):
+            return
+
+        if self.resolver.preconnect:
+            try:
+                async with self.session.head(self.url, headers=self.http_headers,
+                                             timeout=self.first_byte_timeout):
+                    pass
+            except (ClientConnectionError, ClientResponseError, OSError, asyncio.TimeoutError):
+                logger.debug('Failed to connect in advance (url=%s)', self.url)
+
+    @property
+    def hibernating(self) -> bool:
+        """``True`` if the reader has dropped its in-memory state (see :meth:`hibernate`)."""
+        return self._hibernating
+
+    def hibernate(self) -> bool:
+        """
+        Drop the in-memory state of the reader until it is needed again.
+
+        The state is reloaded from the store by :meth:`wake` before the next document is
+        processed.
+
+        :return: ``True`` if the reader was hibernated, ``False`` if it has no state store or it is
+            currently processing a document
+
+        """
+        if self.store is None or self._busy:
+            return False
+
+        self._seen_entry_ids = set()
+        self._content_hash = None
+        self._hibernating = True
+        if self.working_set is not None:
+            self.working_set.discard(self)
+
+        return True
+
+    async def wake(self) -> None:
+        """Reload the state of a hibernated reader from the store."""
+        if self._hibernating:
+            await self.load_state()
+            self._hibernating = False
+
+        if self.working_set is not None:
+            self.working_set.touch(self)
+
+    async def save_state(self) -> None:
+        """
+        Save the state of the reader to the state store, if there is one.
+
+        A hibernated reader is woken up first so that its seen entry IDs are not lost.
+
+        """
+        if self.store is not None:
+            await self.wake()
+            await self.store.store_state(self.state_id, self.__getstate__())
 
     async def update(self):
-        document = await self.fetch_document()
-        entry_ids = set()
-        metadata, entries = self.parse_document(document)
+        host = self.host
+        if self.circuit_breaker is not None and not self.circuit_breaker.allow(host):
+            logger.debug('Skipping update while host %s is failing (url=%s)', host, self.url)
+            return
+
+        # Reload the state of a hibernated reader before fetching, so that reloading it later
+        # (when saving) cannot overwrite a redirect or a 410 recorded during the fetch
+        self._busy += 1
+        try:
+            await self.wake()
+            await self._update(host)
+        finally:
+            self._busy -= 1
+
+    async def _update(self, host: str) -> None:
+        url = self.url
+        try:
+            if self.coalescer is not None:
+                document = await self.coalescer.fetch(self.url, self.http_headers, self.fetch)
+            else:
+                document = await self.fetch()
+        except FeedGoneError:
+            self._gone = True
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.record_success(host)
+
+            await self.save_state()
+            raise
+        except (ClientConnectionError, ClientResponseError, OSError,
+                asyncio.TimeoutError) as exc:
+            if self.circuit_breaker is not None:
+                if not is_transient_error(exc):
+                    self.circuit_breaker.record_success(host)
+                elif self.circuit_breaker.record_failure(host):
+                    await self.save_state()
+
+            raise
+
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record_success(host)
+
+        await self.process_document(document)
+        if self.url != url:
+            # Persist the new URL even if the document itself did not change
+            await self.save_state()
+
+    async def process_document(self, document: Union[str, bytes], partial: bool = False) -> None:
+        """
+        Parse the given document and dispatch events for any changes.
+
+        This is used by :meth:`update` for polled documents, and by
+        :class:`~asphalt.feedreader.websub.WebSubSubscriber` for documents pushed by hubs.
+
+        :param document: the feed document
+        :param partial: ``True`` if the document may only contain a subset of the feed's current
+            entries (as is the case with content pushed by WebSub hubs)
+
+        """
+        # Keep the reader from being hibernated while the document is being processed
+        self._busy += 1
+        try:
+            await self.wake()
+            await self._process_document(document, partial)
+        finally:
+            self._busy -= 1
+
+    async def _process_document(self, document: Union[str, bytes], partial: bool) -> None:
+        # Skip parsing altogether if the document has not changed since the last update
+        content_hash = None if partial else self.hash_document(document)
+        if content_hash is not None and content_hash == self._content_hash:
+            logger.debug('Feed document has not changed (url=%s)', self.url)
+            return
+
+        entry_ids = set()  # type: Set[str]
+        if self.coalescer is not None and content_hash is not None:
+            metadata, entries = self.coalescer.parse(self.parser_key, content_hash, document,
+                                                     self._parse_document)
+        else:
+            metadata, entries = self._parse_document(document)
 
         # Dispatch a metadata_changed event if metadata values have changed
         changes = {key: value for key, value in metadata.items()
@@ -114,27 +547,359 @@ class BaseFeedReader(FeedReader):
 
             self.metadata_changed.dispatch(changes)
 
-        for entry in entries:
-            if entry.id not in self._seen_entry_ids:
-                self.entry_discovered.dispatch(entry=entry)
-                entry_ids.add(entry.id)
+        if self.websub is not None and self.metadata.hub:
+            try:
+                await self.websub.subscribe(self, self.metadata.hub,
+                                            self.metadata.self_link or self.url)
+            except Exception:
+                logger.exception('Error subscribing to WebSub hub %s (url=%s)',
+                                 self.metadata.hub, self.url)
+
+        entry_ids.update(entry.id for entry in entries)
+        candidates = self.load_entries([entry for entry in entries
+                                        if entry.id not in self._seen_entry_ids])
+        if not partial and self.catch_up_pages and self._seen_entry_ids and entries and \
+                self._seen_entry_ids.isdisjoint(entry_ids):
+            # None of the entries have been seen before, so some may have been missed entirely
+            candidates = await self.catch_up(metadata, entry_ids) + candidates
+            if all(entry.published for entry in candidates):
+                candidates.sort(key=lambda entry: _as_aware(entry.published))
+
+        if self._onboarding:
+            # This feed has no saved state, so everything in it would otherwise be considered new
+            candidates = self.select_onboarding_entries(candidates)
+            self._onboarding = False
+
+        new_entries = []  # type: List[FeedEntry]
+        for entry in candidates:
+            if self.dedup_index is not None and self.dedup_index.check(entry):
+                logger.debug('Suppressing duplicate entry %s (url=%s)', entry.id, self.url)
+            else:
+                new_entries.append(entry)
+
+        if self.pipeline is not None:
+            new_entries = await self.pipeline.process(new_entries, self.url)
+
+        for entry in new_entries:
+            if self.entry_cache is not None:
+                self.entry_cache.add(self.state_id, entry)
+
+            self.entry_discovered.dispatch(entry=entry)
 
-        new_ids = self._seen_entry_ids - entry_ids
-        obsolete_ids = entry_ids - self._seen_entry_ids
-        if (new_ids or obsolete_ids) and self.store is not None:
+        # The document has changed, so the state needs to be saved to persist the new hash
+        if partial:
+            self._seen_entry_ids |= entry_ids
+        else:
+            self._seen_entry_ids = entry_ids
+            self._content_hash = content_hash
+
+        if self.store is not None:
             state = self.__getstate__()
             await self.store.store_state(self.state_id, state)
 
-    async def fetch_document(self) -> str:
-        async with self.session.get(self.url, headers=self.http_headers) as resp:
+        if self.dedup_index is not None:
+            await self.dedup_index.save()
+
+    def load_entries(self, entries: List[FeedEntry]) -> List[FeedEntry]:
+        """
+        Decode the attributes of the given (possibly lazily created) entries.
+
+        Entries that fail to decode are logged and left out.
+
+        :param entries: the unseen entries
+        :return: the entries that were decoded successfully
+
+        """
+        loaded = []  # type: List[FeedEntry]
+        for entry in entries:
+            try:
+                entry.load()
+            except Exception:
+                logger.exception('Error decoding entry %s; skipping it (url=%s)', entry.id,
+                                 self.url)
+            else:
+                loaded.append(entry)
+
+        return loaded
+
+    def select_onboarding_entries(self, entries: List[FeedEntry]) -> List[FeedEntry]:
+        """
+        Select the entries to dispatch on the first update of a feed, according to the onboarding
+        policy.
+
+        The entries not selected are silently marked as seen. Entries are ranked by their
+        publication dates if they all have one. Otherwise, feed documents are assumed to list the
+        newest entries first, as is customary.
+
+        :param entries: the entries found on the first update, in document order
+        :return: the entries to dispatch
+
+        """
+        if self.onboarding == 'all':
+            return entries
+        elif self.onboarding == 'none':
+            selected = []  # type: List[FeedEntry]
+        elif self.onboarding == 'since':
+            # Entries without a publication date cannot be placed, so they are skipped as well
+            selected = [entry for entry in entries
+                        if entry.published is not None and _as_aware(entry.published) >=
+                        self.onboarding_since]
+        else:
+            if all(entry.published is not None for entry in entries):
+                selected = sorted(entries, key=lambda entry: _as_aware(entry.published))
+            else:
+                # Put the entries in oldest first order, like the dated ones
+                selected = entries[::-1]
+
+            selected = selected[-self.onboarding_limit:] if self.onboarding_limit else []
+
+        logger.info('Onboarding feed: dispatching %d of %d entries (policy=%s; url=%s)',
+                    len(selected), len(entries), self.onboarding, self.url)
+        return selected
+
+    async def catch_up(self, metadata: Dict[str, Any], entry_ids: Set[str]) -> List[FeedEntry]:
+        """
+        Fetch the unseen entries from the older pages of a paged or archived feed (:rfc:`5005`).
+
+        Starting from the ``next`` and ``prev-archive`` links of the feed document, older pages
+        are fetched (up to ``catch_up_concurrency`` at a time) until a page containing an
+        already seen entry is found or ``catch_up_pages`` pages have been fetched. Pages that fail
+        to download or parse are skipped.
+
+        :param metadata: metadata parsed from the current feed document
+        :param entry_ids: IDs of the entries in the current feed document
+        :return: the unseen entries from the older pages, oldest page first
+
+        """
+        visited = {self.url}
+        frontier = []  # type: List[str]
+
+        def add_links(page_metadata: Dict[str, Any], base_url: str) -> None:
+            for key in ('next_link', 'prev_archive_link'):
+                if page_metadata.get(key):
+                    link = urljoin(base_url, page_metadata[key])
+                    if link not in visited and link not in frontier:
+                        frontier.append(link)
+
+        add_links(metadata, self.url)
+        pages = []  # type: List[List[FeedEntry]]
+        fetched = 0
+        while frontier and fetched < self.catch_up_pages:
+            batch_size = min(self.catch_up_concurrency, self.catch_up_pages - fetched)
+            batch, frontier = frontier[:batch_size], frontier[batch_size:]
+            visited.update(batch)
+            fetched += len(batch)
+            results = await asyncio.gather(*[self._fetch_page(url) for url in batch],
+                                           return_exceptions=True)
+            for url, result in zip(batch, results):
+                if isinstance(result, Exception):
+                    logger.warning('Error fetching older page %s (%s; url=%s)', url, result,
+                                   self.url)
+                    continue
+
+                page_metadata, page_entries = result
+                pages.append(page_entries)
+                if not any(entry.id in self._seen_entry_ids for entry in page_entries):
+                    add_links(page_metadata, url)
+
+        logger.info('Fetched %d older page(s) to catch up (url=%s)', fetched, self.url)
+        older = []  # type: List[FeedEntry]
+        seen_ids = self._seen_entry_ids | entry_ids
+        for page_entries in reversed(pages):
+            for entry in page_entries:
+                if entry.id not in seen_ids:
+                    seen_ids.add(entry.id)
+                    older.append(entry)
+
+        return self.load_entries(older)
+
+    async def _fetch_page(self, url: str) -> Tuple[Dict[str, Any], List[FeedEntry]]:
+        document = await self.fetch_page(url)
+        return self._parse_document(document)
+
+    def hash_document(self, document: Union[str, bytes]) -> str:
+        """
+        Compute a digest of the downloaded document for detecting unchanged documents.
+
+        The digest combines the CRC-32 and Adler-32 checksums of the document. These are not
+        cryptographically secure, but they are very fast to compute and more than adequate for
+        detecting changes.
+
+        :param document: the downloaded document content
+        :return: a hexadecimal digest
+
+        """
+        if isinstance(document, str):
+            document = document.encode('utf-8')
+
+        if self.hash_entries_only and self.entry_region_markers:
+            start_marker, end_marker = self.entry_region_markers
+            start = document.find(start_marker)
+            end = document.rfind(end_marker)
+            if start >= 0 and end > start:
+                document = document[start:end]
+
+        return '{:08x}{:08x}'.format(zlib.crc32(document), zlib.adler32(document))
+
+    async def fetch(self) -> Union[str, bytes]:
+        """
+        Download the feed document, retrying and hedging the request as configured.
+
+        Downloads failing due to transient errors (see :func:`is_transient_error`) are retried
+        with randomized exponential backoff, up to ``retries`` times. The whole operation is
+        bounded by ``total_timeout``.
+
+        :return: the document, as returned by :meth:`fetch_document`
+        :raises ~asphalt.feedreader.transfer.FetchTimeoutError: if the download does not complete
+            in time
+
+        """
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + self.total_timeout if self.total_timeout else None
+        attempt = 0
+        while True:
+            coro = self._fetch_hedged() if self.hedge_after is not None else self.fetch_document()
+            try:
+                if deadline is None:
+                    return await coro
+
+                try:
+                    return await asyncio.wait_for(coro, max(deadline - loop.time(), 0))
+                except FetchTimeoutError:
+                    raise
+                except asyncio.TimeoutError:
+                    self.statistics.timeouts += 1
+                    raise FetchTimeoutError('total') from None
+            except Exception as exc:
+                if attempt >= self.retries or not is_transient_error(exc):
+                    raise
+
+                # "Full jitter" backoff: spread the retries of many feeds evenly over time
+                delay = random.uniform(0, self.retry_backoff * 2 ** attempt)
+                if deadline is not None and loop.time() + delay >= deadline:
+                    raise
+
+                attempt += 1
+                logger.info('Retrying download in %.1f seconds (%s; url=%s)', delay, exc,
+                            self.url)
+
+            await asyncio.sleep(delay)
+
+    async def _fetch_hedged(self) -> Union[str, bytes]:
+        pending = {asyncio.ensure_future(self.fetch_document())}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=self.hedge_after)
+            if not done:
+                logger.debug('Sending a hedged request (url=%s)', self.url)
+                pending.add(asyncio.ensure_future(self.fetch_document()))
+
+            # Return the first successful result, or raise the last exception if both fail
+            while True:
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+
+                if not pending:
+                    return done.pop().result()
+
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def fetch_document(self) -> Union[str, bytes]:
+        """
+        Download the feed document (with a single request).
+
+        The document is returned as raw bytes, without decoding it first. This lets XML based
+        readers honor the encoding declared in the XML prolog instead of relying on the HTTP
+        headers or charset detection, and saves the cost of decoding and re-encoding the document.
+
+        Compressed responses are decompressed while streaming, and the download is aborted as soon
+        as the document exceeds ``max_document_size``.
+
+        The request is subject to the ``first_byte_timeout``, ``total_timeout`` and
+        ``min_transfer_rate`` limits. Use :meth:`fetch` to also apply retries and hedging.
+
+        If the server permanently redirects the request (``301`` or ``308``), the reader's
+        :attr:`url` is updated to point to the new location.
+
+        :return: the raw document content
+        :raises ~asphalt.feedreader.transfer.DocumentTooLargeError: if the document is too large
+        :raises ~asphalt.feedreader.transfer.FeedGoneError: if the server responds with
+            ``410 Gone``
+        :raises ~asphalt.feedreader.transfer.FetchTimeoutError: if a deadline is exceeded
+
+        """
+        try:
+            return await self._fetch_document()
+        except FetchTimeoutError:
+            self.statistics.timeouts += 1
+            raise
+
+    async def fetch_page(self, url: str) -> Union[str, bytes]:
+        """
+        Download another page of the feed (used for catching up with paged and archived feeds).
+
+        This is subject to the same limits as :meth:`fetch_document`, but redirects are not
+        tracked.
+
+        :param url: URL of the page
+        :return: the raw document content
+
+        """
+        try:
+            return await self._fetch_document(url)
+        except FetchTimeoutError:
+            self.statistics.timeouts += 1
+            raise
+
+    async def _fetch_document(self, page_url: str = None) -> Union[str, bytes]:
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + self.total_timeout if self.total_timeout else None
+        timeout, stage = self.first_byte_timeout, 'first_byte'
+        if self.total_timeout and (timeout is None or self.total_timeout < timeout):
+            timeout, stage = self.total_timeout, 'total'
+
+        try:
+            resp = await asyncio.wait_for(
+                self.session.get(page_url or self.url, headers=self.http_headers), timeout)
+        except ServerTimeoutError as exc:
+            raise FetchTimeoutError('connect') from exc
+        except asyncio.TimeoutError:
+            raise FetchTimeoutError(stage) from None
+
+        async with resp:
+            # Follow the chain of permanent redirects up to the first temporary one
+            for i, hop in enumerate(resp.history if page_url is None else ()):
+                if hop.status not in (301, 308):
+                    break
+
+                location = resp.history[i + 1].url if i + 1 < len(resp.history) else resp.url
+                logger.info('Feed has moved permanently to %s (url=%s)', location, self.url)
+                self._move(str(location))
+
+            if resp.status == 410 and page_url is None:
+                raise FeedGoneError(self.url)
+
             resp.raise_for_status()
-            return await resp.text()
+            return await read_document(resp, decode=self._decode_content,
+                                       max_size=self.max_document_size,
+                                       statistics=self.statistics, deadline=deadline,
+                                       min_rate=self.min_transfer_rate)
+
+    def _parse_document(
+            self, document: Union[str, bytes]) -> Tuple[Dict[str, Any], List[FeedEntry]]:
+        # Readers can override this to pass their own options to parse_document()
+        return self.parse_document(document)
 
     @abstractmethod
-    def parse_document(self, document: str) -> Tuple[Dict[str, Any], List[FeedEntry]]:
+    def parse_document(
+            self, document: Union[str, bytes]) -> Tuple[Dict[str, Any], List[FeedEntry]]:
         """
         Parse the downloaded document.
 
-        :param document: the downloaded document content
+        :param document: the downloaded document content (raw bytes as returned by
+            :meth:`fetch_document`, or an already decoded string)
         :return: a two-tuple of (feed metadata, list of entries found in the document)
         """
@@ -0,0 +1,171 @@
+"""
+Element handlers for the XML based feed readers.
+
+The RSS and Atom readers decode the feed level and entry level elements through dispatch tables
+that map qualified tag names (``{namespace}localname``) to handler functions. Each handler gets
+the element and the dictionary of values being collected (feed metadata or entry constructor
+keyword arguments), and adds whatever it extracts from the element to the dictionary. Elements
+without a handler are skipped.
+
+Besides the elements of the base formats, handlers are provided for the following common
+extensions (stored in the ``extensions`` dictionary of the entries or the metadata, keyed by
+``prefix:localname``, unless noted otherwise):
+
+* Dublin Core (``dc``): ``dc:creator``; ``dc:date`` is used as the publication date of the
+  entry if it has none
+* Content (``content``): ``content:encoded`` is stored as the ``content`` of the entry
+* Media RSS (``media``): ``media:content`` (a list of attribute dictionaries; the first one is also
+  used as the enclosure if the entry has none), ``media:thumbnail``, ``media:title`` and
+  ``media:description``, also within ``media:group``
+* iTunes podcasts (``itunes``): text elements like ``itunes:duration``, and ``itunes:image``
+* Syndication (``sy``): ``sy:updatePeriod`` and ``sy:updateFrequency`` (see
+  :attr:`~asphalt.feedreader.metadata.FeedMetadata.update_interval`)
+
+Handlers for other extensions can be added with :func:`register_handler`.
+"""
+
+from string import whitespace
+from typing import Callable, Dict, Any, Optional  # noqa
+
+from dateutil.parser import parse
+
+ElementHandler = Callable[[Any, Dict[str, Any]], None]
+
+#: maps the customary prefixes of the supported extensions to their namespace URIs
+namespaces = {
+    'content': 'http://purl.org/rss/1.0/modules/content/',
+    'dc': 'http://purl.org/dc/elements/1.1/',
+    'itunes': 'http://www.itunes.com/dtds/podcast-1.0.dtd',
+    'media': 'http://search.yahoo.com/mrss/',
+    'sy': 'http://purl.org/rss/1.0/modules/syndication/'
+}
+
+
+def qualify(prefix: str, name: str) -> str:
+    """Return the qualified tag name of the given element in the namespace of ``prefix``."""
+    return '{%s}%s' % (namespaces[prefix], name)
+
+
+def element_text(element) -> Optional[str]:
+    """Return the text of the element with the surrounding whitespace removed."""
+    return element.text.strip(whitespace) if element.text else None
+
+
+def text_handler(key: str, strip: bool = True) -> ElementHandler:
+    """Create a handler that stores the text of the element."""
+    def handler(element, values: Dict[str, Any]) -> None:
+        values[key] = element_text(element) if strip else element.text
+
+    return handler
+
+
+def date_handler(key: str) -> ElementHandler:
+    """Create a handler that parses the text of the element as a date/time."""
+    def handler(element, values: Dict[str, Any]) -> None:
+        values[key] = parse(element_text(element))
+
+    return handler
+
+
+def list_handler(key: str) -> ElementHandler:
+    """Create a handler that appends the text of the element to a list."""
+    def handler(element, values: Dict[str, Any]) -> None:
+        values.setdefault(key, []).append(element_text(element))
+
+    return handler
+
+
+def extension_handler(name: str, attribute: str = None) -> ElementHandler:
+    """
+    Create a handler that stores the text (or an attribute) of the element as an extension value.
+
+    :param name: key in the ``extensions`` dictionary
+    :param attribute: name of the attribute to store instead of the text
+
+    """
+    def handler(element, values: Dict[str, Any]) -> None:
+        value = element.attrib.get(attribute) if attribute else element_text(element)
+        if value is not None:
+            values.setdefault('extensions', {})[name] = value
+
+    return handler
+
+
+def register_handler(reader_class: type, table: str, tag: str, handler: ElementHandler) -> None:
+    """
+    Add an element handler to a dispatch table of a feed reader class.
+
+    The table is copied to the class first if it was inherited, so that the handler does not
+    affect the superclasses.
+
+    :param reader_class: the feed reader class
+    :param table: name of the dispatch table (e.g. ``item_handlers``)
+    :param tag: qualified tag name of the element
+    :param handler: a callable that takes the element and the dictionary of values
+
+    """
+    handlers = reader_class.__dict__.get(table)
+    if handlers is None:
+        handlers = dict(getattr(reader_class, table))
+        setattr(reader_class, table, handlers)
+
+    handlers[tag] = handler
+
+
+def _handle_dc_date(element, values: Dict[str, Any]) -> None:
+    if 'published' not in values:
+        values['published'] = parse(element_text(element))
+
+
+def _handle_content_encoded(element, values: Dict[str, Any]) -> None:
+    if 'content' not in values:
+        values['content'] = element.text
+        values['content_type'] = 'html'
+
+
+def _handle_media_content(element, values: Dict[str, Any]) -> None:
+    attrib = dict(element.attrib)
+    values.setdefault('extensions', {}).setdefault('media:content', []).append(attrib)
+    if 'enclosure_url' not in values and 'url' in attrib:
+        values['enclosure_url'] = attrib['url']
+        if 'type' in attrib:
+            values['enclosure_type'] = attrib['type']
+        if attrib.get('fileSize', '').isdigit():
+            values['enclosure_length'] = int(attrib['fileSize'])
+
+
+def _handle_media_group(element, values: Dict[str, Any]) -> None:
+    for child in element:
+        handler = media_handlers.get(child.tag)
+        if handler is not None:
+            handler(child, values)
+
+
+media_handlers = {
+    qualify('media', 'content'): _handle_media_content,
+    qualify('media', 'thumbnail'): extension_handler('media:thumbnail', 'url'),
+    qualify('media', 'title'): extension_handler('media:title'),
+    qualify('media', 'description'): extension_handler('media:description')
+}  # type: Dict[str, ElementHandler]
+
+#: handlers for extension elements within entries (RSS items and Atom entries)
+entry_handlers = {
+    qualify('dc', 'creator'): extension_handler('dc:creator'),
+    qualify('dc', 'date'): _handle_dc_date,
+    qualify('content', 'encoded'): _handle_content_encoded,
+    qualify('media', 'group'): _handle_media_group,
+    qualify('itunes', 'image'): extension_handler('itunes:image', 'href')
+}  # type: Dict[str, ElementHandler]
+entry_handlers.update(media_handlers)
+for _name in ('author', 'duration', 'episode', 'episodeType', 'explicit', 'season', 'subtitle',
+              'summary', 'title'):
+    entry_handlers[qualify('itunes', _name)] = extension_handler('itunes:' + _name)
+
+#: handlers for extension elements on the feed level (RSS channels and Atom feeds)
+feed_handlers = {
+    qualify('sy', 'updatePeriod'): extension_handler('sy:updatePeriod'),
+    qualify('sy', 'updateFrequency'): extension_handler('sy:updateFrequency'),
+    qualify('itunes', 'image'): extension_handler('itunes:image', 'href')
+}  # type: Dict[str, ElementHandler]
+for _name in ('author', 'explicit', 'subtitle', 'summary', 'type'):
+    feed_handlers[qualify('itunes', _name)] = extension_handler('itunes:' + _name)
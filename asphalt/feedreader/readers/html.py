@@ -0,0 +1,207 @@
+"""
+A feed reader for scraping entries from ordinary HTML pages using declarative selectors.
+
+Each selector is either a CSS selector or, if prefixed with ``xpath:``, an XPath expression.
+CSS selectors extract the text content of the matched elements by default. This can be changed by
+appending ``::text`` (the element's own text, excluding its children) or ``::attr(name)`` (the
+value of the named attribute). A CSS selector consisting of only the suffix applies to the
+element being examined itself. XPath expressions can return elements (their text content is
+extracted), attribute values or strings.
+
+Requires lxml and cssselect (``pip install asphalt-feedreader[html]``).
+"""
+
+import logging
+import re
+from datetime import timezone
+from typing import Union, Dict, Any, Tuple, List, Callable, Hashable  # noqa
+from urllib.parse import urljoin
+
+from dateutil.parser import parse
+
+from asphalt.feedreader.readers.base import BaseFeedReader
+from asphalt.feedreader.metadata import FeedEntry
+
+try:
+    from lxml import etree
+    from lxml.cssselect import CSSSelector
+    from lxml.html import HTMLParser, document_fromstring
+except ImportError:  # pragma: no cover
+    etree = None
+
+logger = logging.getLogger(__name__)
+
+css_pseudo_re = re.compile(r'::(?:(text)|attr\(([^)]+)\))$')
+
+Selector = Callable[[Any], List[str]]
+
+#: entry fields that are resolved against the URL of the feed
+url_fields = frozenset(['link', 'enclosure_url'])
+
+
+def _compile_element_selector(spec: str) -> Callable[[Any], List[Any]]:
+    try:
+        if spec.startswith('xpath:'):
+            return etree.XPath(spec[6:])
+        else:
+            return CSSSelector(spec)
+    except Exception as exc:
+        raise ValueError('invalid selector {!r}: {}'.format(spec, exc)) from None
+
+
+def _self(element) -> List[Any]:
+    return [element]
+
+
+def compile_selector(spec: str) -> Selector:
+    """
+    Compile a selector into a callable.
+
+    :param spec: a CSS selector or an XPath expression prefixed with ``xpath:``
+    :return: a callable that takes an element and returns a list of the (stripped, non-empty)
+        strings extracted from it
+    :raises ValueError: if the selector is invalid
+
+    """
+    if spec.startswith('xpath:'):
+        xpath = _compile_element_selector(spec)
+
+        def select_xpath(element) -> List[str]:
+            results = xpath(element)
+            if not isinstance(results, list):
+                results = [results]
+
+            values = (result.text_content() if hasattr(result, 'text_content') else str(result)
+                      for result in results)
+            return [value.strip() for value in values if value and value.strip()]
+
+        return select_xpath
+
+    match = css_pseudo_re.search(spec)
+    selector = spec[:match.start()].strip() if match else spec.strip()
+    find = _compile_element_selector(selector) if selector else _self
+
+    if match and match.group(1):
+        def extract(element) -> str:
+            return element.text or ''
+    elif match:
+        attribute = match.group(2).strip()
+
+        def extract(element) -> str:
+            return element.get(attribute, '')
+    else:
+        def extract(element) -> str:
+            return element.text_content()
+
+    def select(element) -> List[str]:
+        values = (extract(result) for result in find(element))
+        return [value.strip() for value in values if value.strip()]
+
+    return select
+
+
+class HTMLFeedReader(BaseFeedReader):
+    """
+    Reads entries from an HTML page by using CSS selectors or XPath expressions.
+
+    The selectors are compiled when the reader is created. The page is parsed with lxml's
+    libxml2 based HTML parser.
+
+    Example::
+
+        HTMLFeedReader(url='http://example.org/news', entries='div.news-item', fields={
+            'id': 'a::attr(href)',
+            'title': 'h2',
+            'link': 'a::attr(href)',
+            'published': 'time::attr(datetime)',
+            'categories': 'ul.tags li'
+        })
+
+    If no ``id`` selector is given, the link of the entry is used as its ID. Entries without an
+    ID are skipped. The ``categories`` field receives all the values extracted by its selector;
+    the other fields use the first one. Relative URLs in ``link`` and ``enclosure_url`` are
+    resolved against the URL of the feed, and ``published`` is parsed with dateutil (naive dates
+    are assumed to be in UTC).
+
+    :param entries: selector for the elements that represent entries
+    :param fields: a dictionary of entry field name ⭢ selector, evaluated relative to each
+        entry element
+    :param metadata: a dictionary of feed metadata field name ⭢ selector, evaluated relative to
+        the document root (defaults to taking the title from the ``<title>`` element)
+    """
+
+    def __init__(self, entries: str, fields: Dict[str, str],
+                 metadata: Dict[str, str] = None, **kwargs):
+        if etree is None:  # pragma: no cover
+            raise RuntimeError('the HTML feed reader requires lxml and cssselect to be installed')
+
+        super().__init__(**kwargs)
+        self.http_headers.setdefault('accept', 'text/html')
+        if metadata is None:
+            metadata = {'title': 'head > title'}
+
+        if 'id' not in fields and 'link' not in fields:
+            raise ValueError('either an "id" or a "link" selector is required')
+
+        invalid = [name for name in fields if name not in FeedEntry.__slots__ or
+                   name.startswith('_') or name == 'extensions']
+        if invalid:
+            raise ValueError('invalid entry field(s): ' + ', '.join(invalid))
+
+        self.entries_selector = entries
+        self.field_selectors = fields
+        self.metadata_selectors = metadata
+        self._entries = _compile_element_selector(entries)
+        self._fields = [(name, compile_selector(spec)) for name, spec in fields.items()]
+        self._metadata_fields = [(name, compile_selector(spec))
+                                 for name, spec in metadata.items()]
+        self._parser = HTMLParser(remove_comments=True, remove_pis=True, no_network=True)
+
+    @property
+    def parser_key(self) -> Hashable:
+        return (type(self), self.entries_selector,
+                tuple(sorted(self.field_selectors.items())),
+                tuple(sorted(self.metadata_selectors.items())))
+
+    def parse_document(
+            self, document: Union[str, bytes]) -> Tuple[Dict[str, Any], List[FeedEntry]]:
+        root = document_fromstring(document, parser=self._parser)
+        metadata = {}  # type: Dict[str, Any]
+        for name, select in self._metadata_fields:
+            values = select(root)
+            if values:
+                metadata[name] = values[0]
+
+        entries = []
+        for element in self._entries(root):
+            kwargs = {}  # type: Dict[str, Any]
+            for name, select in self._fields:
+                values = select(element)
+                if name == 'categories':
+                    kwargs[name] = values
+                elif values:
+                    kwargs[name] = values[0]
+
+            try:
+                for name in url_fields.intersection(kwargs):
+                    kwargs[name] = urljoin(self.url, kwargs[name])
+
+                if 'published' in kwargs:
+                    published = parse(kwargs['published'])
+                    if published.tzinfo is None:
+                        published = published.replace(tzinfo=timezone.utc)
+
+                    kwargs['published'] = published
+
+                if 'enclosure_length' in kwargs:
+                    kwargs['enclosure_length'] = int(kwargs['enclosure_length'])
+            except (ValueError, OverflowError) as exc:
+                logger.debug('Skipping entry with invalid field values (url=%s): %s', self.url,
+                             exc)
+                continue
+
+            kwargs.setdefault('id', kwargs.get('link'))
+            if kwargs['id']:
+                entries.append(FeedEntry(**kwargs))
+
+        return metadata, entries
@@ -1,14 +1,39 @@
 import logging
-from string import whitespace
-from typing import List, Dict, Any, Tuple, Optional
+from functools import partial
+from typing import List, Dict, Any, Tuple, Optional, Union
 
-from dateutil.parser import parse
 from defusedxml import ElementTree
 
+from asphalt.feedreader.readers import extensions
 from asphalt.feedreader.readers.base import BaseFeedReader, FeedEntry
+from asphalt.feedreader.readers.extensions import (
+    ElementHandler, text_handler, date_handler, list_handler)
+from asphalt.feedreader.readers.xml import get_xml_parser
 
 logger = logging.getLogger(__name__)
 
+ATOM_LINK = '{http://www.w3.org/2005/Atom}link'
+
+
+def _handle_atom_link(element, metadata: Dict[str, Any]) -> None:
+    rel = element.attrib.get('rel')
+    if rel == 'hub':
+        metadata['hub'] = element.attrib['href']
+    elif rel == 'self':
+        metadata['self_link'] = element.attrib['href']
+    elif rel == 'next':
+        metadata['next_link'] = element.attrib['href']
+    elif rel == 'prev-archive':
+        metadata['prev_archive_link'] = element.attrib['href']
+
+
+def _handle_enclosure(element, kwargs: Dict[str, Any]) -> None:
+    kwargs['enclosure_url'] = element.attrib['url']
+    if 'length' in element.attrib:
+        kwargs['enclosure_length'] = int(element.attrib['length'])
+    if 'type' in element.attrib:
+        kwargs['enclosure_type'] = element.attrib['type']
+
 
 class RSSEntry(FeedEntry):
     """
@@ -18,14 +43,21 @@ class RSSEntry(FeedEntry):
     :vartype author: Optional[str]
     :ivar comments: URL that links to a web page with comments related to the entry
     :vartype comments: Optional[str]
+    :ivar content: the full content of the entry (from the ``content:encoded`` extension)
+    :vartype content: Optional[str]
+    :ivar content_type: type of the content (``html`` if there is content)
+    :vartype content_type: Optional[str]
     """
 
-    __slots__ = ('author', 'comments')
+    __slots__ = ('author', 'comments', 'content', 'content_type')
 
-    def __init__(self, *, author: str = None, comments: str = None, **kwargs):
+    def __init__(self, *, author: str = None, comments: str = None, content: str = None,
+                 content_type: str = None, **kwargs):
         super().__init__(**kwargs)
         self.author = author
         self.comments = comments
+        self.content = content
+        self.content_type = content_type
 
 
 class RSSFeedReader(BaseFeedReader):
@@ -33,15 +65,50 @@ class RSSFeedReader(BaseFeedReader):
     Represents an RSS 2.0 (Really Simple Syndication) feed.
 
     :param respect_rate_limits: respect the rate limits (if any) set by the publisher
+    :param xml_parser: name of the XML parser engine to use (see
+        :mod:`~asphalt.feedreader.readers.xml`)
     """
 
-    def __init__(self, respect_rate_limits: bool = True, **kwargs):
+    entry_region_markers = (b'<item', b'</item>')
+
+    #: element handlers for the children of ``<channel>``, which collect the feed metadata (see
+    #: :mod:`~asphalt.feedreader.readers.extensions`)
+    channel_handlers = {
+        'title': text_handler('title'),
+        'link': text_handler('link'),
+        'description': text_handler('description'),
+        'lastBuildDate': date_handler('updated'),
+        ATOM_LINK: _handle_atom_link
+    }  # type: Dict[str, ElementHandler]
+    channel_handlers.update(extensions.feed_handlers)
+
+    #: element handlers for the children of ``<item>``, which collect the keyword arguments for
+    #: :class:`RSSEntry`
+    item_handlers = {
+        'title': text_handler('title', strip=False),
+        'link': text_handler('link', strip=False),
+        'author': text_handler('author', strip=False),
+        'comments': text_handler('comments', strip=False),
+        'description': text_handler('summary', strip=False),
+        'pubDate': date_handler('published'),
+        'enclosure': _handle_enclosure,
+        'category': list_handler('categories')
+    }  # type: Dict[str, ElementHandler]
+    item_handlers.update(extensions.entry_handlers)
+
+    def __init__(self, respect_rate_limits: bool = True, xml_parser: str = 'etree', **kwargs):
         super().__init__(**kwargs)
         self.http_headers.setdefault('accept', 'application/rss+xml; text/xml')
         self.respect_rate_limits = respect_rate_limits
+        get_xml_parser(xml_parser)  # fail early if the engine is not available
+        self.xml_parser = xml_parser
+
+    def _parse_document(
+            self, document: Union[str, bytes]) -> Tuple[Dict[str, Any], List[FeedEntry]]:
+        return self.parse_document(document, xml_parser=self.xml_parser)
 
     @classmethod
-    def can_parse(cls, document: str, content_type: str) -> Optional[str]:
+    def can_parse(cls, document: Union[str, bytes], content_type: str) -> Optional[str]:
         if content_type not in ('application/rss+xml', 'text/xml'):
             return ("Incompatible content type (got %r, needs to be either 'application/rss+xml' "
                     "or 'text/xml')" % content_type)
@@ -61,8 +128,9 @@ class RSSFeedReader(BaseFeedReader):
         return None
 
     @classmethod
-    def parse_document(cls, document: str) -> Tuple[Dict[str, Any], List[FeedEntry]]:
-        root = ElementTree.fromstring(document)
+    def parse_document(cls, document: Union[str, bytes], *,
+                       xml_parser: str = 'etree') -> Tuple[Dict[str, Any], List[FeedEntry]]:
+        root = get_xml_parser(xml_parser)(document)
         if root.tag != 'rss':
             raise ValueError('XML root tag was "%s"; expected "rss"' % root.tag)
         elif 'version' not in root.attrib:
@@ -74,38 +142,38 @@ class RSSFeedReader(BaseFeedReader):
         if channel is None:
             raise ValueError('missing "channel" element in RSS feed')
 
-        metadata = {}
+        metadata = {}  # type: Dict[str, Any]
+        handlers = cls.channel_handlers
         for tag in channel:
-            tag_text = tag.text.strip(whitespace) if tag.text else None
-            if tag.tag in ('title', 'link', 'description'):
-                metadata[tag.tag] = tag_text
-            elif tag.tag == 'lastBuildDate':
-                metadata['updated'] = parse(tag_text)
+            handler = handlers.get(tag.tag)
+            if handler is not None:
+                handler(tag, metadata)
 
+        # Only the IDs are extracted here; the rest is decoded when the entries are accessed
         events = []  # type: List[RSSEntry]
         for item in channel.iter('item'):
-            kwargs = {}
-            for tag in item:
-                if tag.tag in ('title', 'link', 'author', 'comments'):
-                    kwargs[tag.tag] = tag.text
-                elif tag.tag == 'guid':
-                    kwargs['id'] = tag.text
-                elif tag.tag == 'description':
-                    kwargs['summary'] = tag.text
-                elif tag.tag == 'pubDate':
-                    kwargs['published'] = parse(tag.text)
-                elif tag.tag == 'enclosure':
-                    kwargs['enclosure_url'] = tag.attrib['url']
-                    if 'length' in tag.attrib:
-                        kwargs['enclosure_length'] = int(tag.attrib['length'])
-                    if 'type' in tag.attrib:
-                        kwargs['enclosure_type'] = tag.attrib['type']
-                elif tag.tag == 'category':
-                    kwargs.setdefault('categories', []).append(tag.text)
-
-            if 'id' in kwargs:
-                events.insert(0, RSSEntry(**kwargs))
+            guid = item.find('guid')
+            if guid is not None:
+                events.insert(0, RSSEntry.lazy(guid.text, partial(cls.parse_item, item)))
             else:
                 logger.warning('Encountered item without a "guid" element')
 
         return metadata, events
+
+    @classmethod
+    def parse_item(cls, item) -> Dict[str, Any]:
+        """
+        Decode the fields of an ``<item>`` element.
+
+        :param item: the XML element
+        :return: keyword arguments for :class:`RSSEntry` (except ``id``)
+
+        """
+        kwargs = {}  # type: Dict[str, Any]
+        handlers = cls.item_handlers
+        for tag in item:
+            handler = handlers.get(tag.tag)
+            if handler is not None:
+                handler(tag, kwargs)
+
+        return kwargs
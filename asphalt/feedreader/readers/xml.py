@@ -0,0 +1,66 @@
+"""
+Pluggable XML parser engines for the XML based feed readers.
+
+The following engines are available:
+
+* ``etree``: the standard library's ElementTree, hardened by defusedxml (always available)
+* ``lxml``: the libxml2 based lxml library, configured to never resolve entities, load DTDs or
+  access the network (available if lxml is installed)
+"""
+
+from typing import Union, Callable, Dict, Any  # noqa
+
+from defusedxml import ElementTree
+
+try:
+    from lxml import etree as lxml_etree
+except ImportError:  # pragma: no cover
+    lxml_etree = None
+
+ParserEngine = Callable[[Union[str, bytes]], Any]
+
+
+def parse_etree(document: Union[str, bytes]):
+    """Parse the document using defusedxml's ElementTree."""
+    return ElementTree.fromstring(document)
+
+
+if lxml_etree is not None:
+    _lxml_options = dict(resolve_entities=False, no_network=True, load_dtd=False,
+                         huge_tree=False, remove_comments=True, remove_pis=True)
+    _lxml_parser = lxml_etree.XMLParser(**_lxml_options)
+
+    # lxml refuses to parse str objects with an encoding declaration, so decoded documents are
+    # re-encoded as UTF-8 and parsed with the declared encoding overridden
+    _lxml_unicode_parser = lxml_etree.XMLParser(encoding='utf-8', **_lxml_options)
+
+    def parse_lxml(document: Union[str, bytes]):
+        """Parse the document using lxml (with entity resolution and network access disabled)."""
+        if isinstance(document, str):
+            return lxml_etree.fromstring(document.encode('utf-8'), parser=_lxml_unicode_parser)
+
+        return lxml_etree.fromstring(document, parser=_lxml_parser)
+
+xml_parsers = {'etree': parse_etree}  # type: Dict[str, ParserEngine]
+parse_errors = (ElementTree.ParseError,)
+if lxml_etree is not None:
+    xml_parsers['lxml'] = parse_lxml
+    parse_errors += (lxml_etree.XMLSyntaxError,)
+
+
+def get_xml_parser(name: str) -> ParserEngine:
+    """
+    Look up an XML parser engine by name.
+
+    :param name: name of the engine (``etree`` or ``lxml``)
+    :return: a callable that takes the document and returns the root element
+    :raises LookupError: if there is no such engine or its library has not been installed
+
+    """
+    try:
+        return xml_parsers[name]
+    except KeyError:
+        if name == 'lxml':
+            raise LookupError('the lxml parser engine requires lxml to be installed') from None
+
+        raise LookupError('no such XML parser engine: {}'.format(name)) from None
@@ -0,0 +1,276 @@
+import asyncio
+import json
+import logging
+from functools import partial
+from typing import Dict, Any, Union, Set, Optional, Iterator  # noqa
+
+from aiohttp import ClientSession
+from asphalt.core import Context, Signal, Event, merge_config
+from typeguard import check_argument_types
+
+from asphalt.feedreader import component  # not importing create_feed due to circular imports
+from asphalt.feedreader.api import FeedStateStore, FeedReader
+from asphalt.feedreader.events import FeedMovedEvent
+
+logger = logging.getLogger(__name__)
+
+
+class RegistryEvent(Event):
+    """
+    Signals that a feed has been added to or removed from a feed registry.
+
+    :ivar str feed_id: identifier of the feed in the registry
+    :ivar FeedReader reader: the feed reader
+    """
+
+    __slots__ = ('feed_id', 'reader')
+
+    def __init__(self, source, topic: str, feed_id: str, reader: FeedReader):
+        super().__init__(source, topic)
+        self.feed_id = feed_id
+        self.reader = reader
+
+
+class FeedRegistry:
+    """
+    Manages a changing collection of feeds at run time.
+
+    Unlike the feeds configured on the component, the feeds in a registry are not added as
+    resources. Instead, they are looked up from the registry by their identifiers or URLs. Each
+    feed runs in its own child context, so it can be shut down independently of the others.
+
+    All the feeds of the registry share one HTTP client session, unless they are configured
+    otherwise.
+
+    If a state store has been given, the catalog of feed configurations is persisted in it and the
+    feeds are restored from it when the registry is started. Changes made during the same event
+    loop iteration are saved together.
+
+    :var feed_added: a signal dispatched when a feed has been added to the registry
+    :vartype feed_added: Signal[RegistryEvent]
+    :var feed_removed: a signal dispatched when a feed has been removed from the registry
+    :vartype feed_removed: Signal[RegistryEvent]
+
+    :param store: a feed state store or the resource name of one, for persisting the catalog
+    :param catalog_id: identifier of the catalog in the state store
+    :param client_session: an aiohttp client session or the resource name of one (a new session
+        is created if omitted)
+    :param catalog_file: path to a JSON file containing a feed catalog (as written by
+        ``asphalt-feedreader import --format catalog``), used to populate the registry when there
+        is no catalog in the state store
+    :param feed_defaults: default keyword arguments for
+        :func:`~asphalt.feedreader.component.create_feed`
+    """
+
+    feed_added = Signal(RegistryEvent)
+    feed_removed = Signal(RegistryEvent)
+
+    def __init__(self, store: Union[str, FeedStateStore] = None,
+                 catalog_id: str = 'feed_catalog',
+                 client_session: Union[str, ClientSession] = None, catalog_file: str = None,
+                 **feed_defaults):
+        assert check_argument_types()
+        self.store = store
+        self.catalog_id = catalog_id
+        self.session = client_session
+        self.catalog_file = catalog_file
+        self.feed_defaults = feed_defaults
+        self._ctx = None  # type: Context
+        self._configs = {}  # type: Dict[str, Dict[str, Any]]
+        self._feeds = {}  # type: Dict[str, FeedReader]
+        self._contexts = {}  # type: Dict[str, Context]
+        self._url_index = {}  # type: Dict[str, Set[str]]
+        self._indexed_urls = {}  # type: Dict[str, str]
+        self._save_handle = None  # type: Optional[asyncio.Handle]
+
+    async def start(self, ctx: Context) -> None:
+        self._ctx = ctx
+        if isinstance(self.store, str):
+            self.store = await ctx.request_resource(FeedStateStore, self.store)
+
+        if isinstance(self.session, str):
+            self.session = await ctx.request_resource(ClientSession, self.session)
+        elif self.session is None:
+            self.session = ClientSession(auto_decompress=False)
+            ctx.add_teardown_callback(self.session.close)
+
+        ctx.add_teardown_callback(self._shutdown)
+        catalog = None
+        if self.store is not None:
+            catalog = await self.store.load_state(self.catalog_id)
+
+        if catalog is not None:
+            await self._restore(catalog)
+            logger.info('Restored %d feeds from the feed catalog', len(self._feeds))
+        elif self.catalog_file:
+            with open(self.catalog_file, encoding='utf-8') as f:
+                await self._restore(json.load(f))
+
+            logger.info('Imported %d feeds from %s', len(self._feeds), self.catalog_file)
+            self._schedule_save()
+
+    async def _restore(self, catalog: Dict[str, Any]) -> None:
+        version = catalog.get('version')
+        if version != 1:
+            raise ValueError('cannot handle feed catalog version {}'.format(version))
+
+        for feed_id, config in catalog['feeds'].items():
+            try:
+                await self._start_feed(feed_id, config)
+            except Exception:
+                logger.exception('Error starting feed %s from the catalog', feed_id)
+
+    async def _shutdown(self) -> None:
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+            await self.save()
+
+        for feed_ctx in self._contexts.values():
+            await feed_ctx.close()
+
+    def __len__(self) -> int:
+        return len(self._feeds)
+
+    def __contains__(self, feed_id: str) -> bool:
+        return feed_id in self._feeds
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._feeds)
+
+    def get(self, feed_id: str) -> Optional[FeedReader]:
+        """Return the feed reader with the given identifier, or ``None`` if there is none."""
+        return self._feeds.get(feed_id)
+
+    def get_config(self, feed_id: str) -> Optional[Dict[str, Any]]:
+        """Return the configuration of the given feed, or ``None`` if there is no such feed."""
+        return self._configs.get(feed_id)
+
+    def find_by_url(self, url: str) -> Set[str]:
+        """Return the identifiers of all feeds reading the given URL."""
+        return set(self._url_index.get(url, ()))
+
+    def _feed_moved(self, feed_id: str, event: FeedMovedEvent) -> None:
+        # Ignore events from readers that have since been stopped or replaced
+        if self._feeds.get(feed_id) is event.source:
+            self._unindex(feed_id)
+            self._index(feed_id, event.new_url)
+
+    def _index(self, feed_id: str, url: str) -> None:
+        self._indexed_urls[feed_id] = url
+        self._url_index.setdefault(url, set()).add(feed_id)
+
+    def _unindex(self, feed_id: str) -> None:
+        url = self._indexed_urls.pop(feed_id)
+        feed_ids = self._url_index[url]
+        feed_ids.discard(feed_id)
+        if not feed_ids:
+            del self._url_index[url]
+
+    async def _start_feed(self, feed_id: str, config: Dict[str, Any]) -> FeedReader:
+        reader_args = merge_config(self.feed_defaults, config)
+        reader_args.setdefault('client_session', self.session)
+        reader_args.setdefault('state_id', feed_id)
+        feed_ctx = Context(self._ctx)
+        try:
+            reader = await component.create_feed(feed_ctx, **reader_args)
+        except BaseException:
+            await feed_ctx.close()
+            raise
+
+        self._configs[feed_id] = config
+        self._feeds[feed_id] = reader
+        self._contexts[feed_id] = feed_ctx
+        self._index(feed_id, reader.url)
+        moved = getattr(reader, 'moved', None)
+        if moved is not None:
+            moved.connect(partial(self._feed_moved, feed_id))
+
+        self.feed_added.dispatch(feed_id, reader)
+        return reader
+
+    async def _stop_feed(self, feed_id: str) -> FeedReader:
+        self._unindex(feed_id)
+        del self._configs[feed_id]
+        reader = self._feeds.pop(feed_id)
+        feed_ctx = self._contexts.pop(feed_id)
+        await feed_ctx.close()
+        self.feed_removed.dispatch(feed_id, reader)
+        return reader
+
+    async def add_feed(self, feed_id: str, **config) -> FeedReader:
+        """
+        Create and start a new feed.
+
+        The feed's state is stored under its identifier, unless ``state_id`` is given.
+
+        :param feed_id: unique identifier of the feed in the registry
+        :param config: keyword arguments to :func:`~asphalt.feedreader.component.create_feed`
+            (must be serializable if the catalog is persisted)
+        :return: the feed reader
+        :raises KeyError: if a feed with this identifier already exists
+
+        """
+        if feed_id in self._feeds:
+            raise KeyError('a feed with the identifier {!r} already exists'.format(feed_id))
+
+        reader = await self._start_feed(feed_id, config)
+        self._schedule_save()
+        return reader
+
+    async def remove_feed(self, feed_id: str) -> None:
+        """
+        Stop the given feed and remove it from the registry.
+
+        :param feed_id: identifier of the feed
+        :raises KeyError: if there is no such feed
+
+        """
+        if feed_id not in self._feeds:
+            raise KeyError(feed_id)
+
+        await self._stop_feed(feed_id)
+        self._schedule_save()
+
+    async def update_feed(self, feed_id: str, **config) -> FeedReader:
+        """
+        Change the configuration of the given feed.
+
+        The feed is restarted with its previous configuration merged with the given changes. If the
+        feed cannot be started with the new configuration, it is restarted with the previous one
+        and the exception is reraised.
+
+        :param feed_id: identifier of the feed
+        :param config: changed keyword arguments to
+            :func:`~asphalt.feedreader.component.create_feed`
+        :return: the new feed reader
+        :raises KeyError: if there is no such feed
+
+        """
+        if feed_id not in self._feeds:
+            raise KeyError(feed_id)
+
+        old_config = self._configs[feed_id]
+        config = merge_config(old_config, config)
+        await self._stop_feed(feed_id)
+        try:
+            reader = await self._start_feed(feed_id, config)
+        except Exception:
+            logger.warning('Error starting feed %s with the new configuration; restoring the '
+                           'previous one', feed_id)
+            await self._start_feed(feed_id, old_config)
+            raise
+
+        self._schedule_save()
+        return reader
+
+    def _schedule_save(self) -> None:
+        if self.store is not None and self._save_handle is None:
+            self._save_handle = asyncio.get_event_loop().call_soon(
+                lambda: asyncio.ensure_future(self.save()))
+
+    async def save(self) -> None:
+        """Persist the catalog in the state store (if one has been configured)."""
+        self._save_handle = None
+        if self.store is not None:
+            catalog = {'version': 1, 'feeds': dict(self._configs)}
+            await self.store.store_state(self.catalog_id, catalog)
@@ -0,0 +1,185 @@
+"""
+A shared, caching DNS resolver for the client sessions of feed readers.
+
+When feeds are spread across thousands of hosts, resolving the host names again on every poll
+adds latency and load on the name servers. The :class:`CachingResolver` caches the results of
+successful lookups for as long as the DNS records allow (when aiodns is installed and the TTLs
+are thus known) or for a fixed time, and caches failed lookups for a shorter time.
+"""
+
+import asyncio
+import logging
+import socket
+from collections import OrderedDict
+from typing import Dict, List, Any, Tuple, Optional  # noqa
+
+from aiohttp.abc import AbstractResolver
+from typeguard import check_argument_types
+
+try:
+    import aiodns
+except ImportError:  # pragma: no cover
+    aiodns = None
+
+logger = logging.getLogger(__name__)
+
+# (host, family)
+CacheKey = Tuple[str, int]
+
+
+class CachingResolver(AbstractResolver):
+    """
+    Resolves host names for aiohttp connectors, caching the results.
+
+    If aiodns is installed (``pip install asphalt-feedreader[dns]``), the addresses are looked up
+    with it and cached according to the TTL of the DNS records, bounded by ``min_ttl`` and
+    ``ttl``. Otherwise, the system resolver is used (in a thread pool) and the results are cached
+    for ``ttl`` seconds. Failed lookups are cached for ``negative_ttl`` seconds. Concurrent lookups
+    of the same host share a single query.
+
+    The resolver also determines how feed readers using it prepare for their scheduled updates:
+    ``warm_up_lead`` seconds before each update, the host name of the feed is resolved in advance
+    and, if ``preconnect`` is enabled, a connection is opened to the server.
+
+    :ivar int lookups: number of host names resolved through this resolver
+    :ivar int hits: number of lookups answered from the cache (including failures)
+    :ivar int failures: number of queries that failed
+    :ivar float resolve_time: total number of seconds spent on queries
+
+    :param ttl: number of seconds to cache addresses for (maximum, if the record TTLs are known)
+    :param min_ttl: minimum number of seconds to cache addresses for
+    :param negative_ttl: number of seconds to cache failed lookups for
+    :param max_entries: maximum number of host names to keep in the cache
+    :param warm_up_lead: number of seconds before a scheduled update to resolve the host name of
+        the feed (``None`` = don't warm up)
+    :param preconnect: ``True`` to also open a connection to the server in advance of a scheduled
+        update
+    """
+
+    def __init__(self, ttl: float = 300, min_ttl: float = 10, negative_ttl: float = 30,
+                 max_entries: int = 10000, warm_up_lead: Optional[float] = 5,
+                 preconnect: bool = False):
+        assert check_argument_types()
+        self.ttl = ttl
+        self.min_ttl = min_ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.warm_up_lead = warm_up_lead
+        self.preconnect = preconnect
+        self.lookups = self.hits = self.failures = 0
+        self.resolve_time = 0.0
+        self._cache = OrderedDict()  # type: Dict[CacheKey, Tuple[float, Any]]
+        self._pending = {}  # type: Dict[CacheKey, asyncio.Future]
+        self._dns_resolver = None
+
+    async def resolve(self, host: str, port: int = 0,
+                      family: int = socket.AF_INET) -> List[Dict[str, Any]]:
+        """
+        Resolve the given host name.
+
+        :param host: the host name
+        :param port: the port number to include in the results
+        :param family: the address family
+        :return: a list of address dictionaries, as expected by :class:`aiohttp.TCPConnector`
+        :raises OSError: if the host name cannot be resolved
+
+        """
+        self.lookups += 1
+        key = (host, family)
+        loop = asyncio.get_event_loop()
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] > loop.time():
+            self.hits += 1
+            result = cached[1]
+        else:
+            future = self._pending.get(key)
+            if future is None:
+                future = self._pending[key] = loop.create_task(self._query(host, family))
+                future.add_done_callback(lambda f: self._pending.pop(key, None))
+
+            result = await asyncio.shield(future)
+
+        if isinstance(result, OSError):
+            raise OSError(*result.args)
+
+        return [dict(address, port=port) for address in result]
+
+    async def _query(self, host: str, family: int) -> Any:
+        loop = asyncio.get_event_loop()
+        start = loop.time()
+        try:
+            if aiodns is not None:
+                addresses, ttl = await self._query_aiodns(host, family)
+            else:
+                addresses, ttl = await self._query_system(host, family)
+
+            if not addresses:
+                raise OSError('DNS lookup failed')
+        except OSError as exc:
+            self.failures += 1
+            logger.debug('Failed to resolve %s: %s', host, exc)
+            result = exc  # type: Any
+            ttl = self.negative_ttl
+        else:
+            result = addresses
+            ttl = min(max(ttl, self.min_ttl), self.ttl)
+        finally:
+            end = loop.time()
+            self.resolve_time += end - start
+
+        self._cache.pop((host, family), None)
+        self._cache[(host, family)] = (end + ttl, result)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+        return result
+
+    async def _query_system(self, host: str, family: int) -> Tuple[List[Dict[str, Any]], float]:
+        infos = await asyncio.get_event_loop().getaddrinfo(host, 0, type=socket.SOCK_STREAM,
+                                                           family=family)
+        addresses = [{'hostname': host, 'host': address[0], 'family': family_, 'proto': proto,
+                      'flags': socket.AI_NUMERICHOST}
+                     for family_, _, proto, _, address in infos]
+        return addresses, self.ttl
+
+    async def _query_aiodns(self, host: str, family: int) -> Tuple[List[Dict[str, Any]], float]:
+        if self._dns_resolver is None:
+            self._dns_resolver = aiodns.DNSResolver(loop=asyncio.get_event_loop())
+
+        # Like aiohttp's own resolver, only look up IPv4 addresses unless IPv6 is requested
+        family = socket.AF_INET6 if family == socket.AF_INET6 else socket.AF_INET
+        try:
+            records = await self._dns_resolver.query(
+                host, 'AAAA' if family == socket.AF_INET6 else 'A')
+        except aiodns.error.DNSError as exc:
+            raise OSError(exc.args[1] if len(exc.args) > 1 else 'DNS lookup failed') from exc
+
+        addresses = [{'hostname': host, 'host': record.host, 'family': family, 'proto': 0,
+                      'flags': socket.AI_NUMERICHOST} for record in records]
+        ttl = min((record.ttl for record in records), default=self.ttl)
+        return addresses, ttl
+
+    async def prefetch(self, host: str, family: int = socket.AF_UNSPEC) -> bool:
+        """
+        Resolve the given host name in advance, so that it is in the cache when needed.
+
+        The address family must match the one used by the connector (by default, any family).
+
+        :return: ``True`` if the host name was resolved successfully
+
+        """
+        try:
+            await self.resolve(host, family=family)
+        except OSError:
+            return False
+
+        return True
+
+    def clear(self) -> None:
+        """Remove all entries from the cache."""
+        self._cache.clear()
+
+    async def close(self) -> None:
+        if self._dns_resolver is not None:
+            self._dns_resolver.cancel()
+            self._dns_resolver = None
@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import re
+from inspect import isawaitable
+from typing import Callable, Iterable, Dict, Set, List, Optional, Pattern, Union  # noqa
+
+from typeguard import check_argument_types
+
+from asphalt.feedreader.api import FeedReader
+from asphalt.feedreader.events import EntryEvent
+from asphalt.feedreader.metadata import FeedEntry
+
+logger = logging.getLogger(__name__)
+
+word_re = re.compile(r'\w+')
+
+
+class Subscription:
+    """
+    A filtered subscription created with :meth:`EntryRouter.subscribe`.
+
+    :ivar callback: the callable that receives the matching entry events
+    """
+
+    __slots__ = ('router', 'callback', 'feeds', 'categories', 'keywords', 'patterns',
+                 'enclosure_types', 'criteria')
+
+    def __init__(self, router: 'EntryRouter', callback: Callable[[EntryEvent], None],
+                 feeds: Set[str], categories: Set[str], keywords: Set[str],
+                 patterns: List[Pattern], enclosure_types: Set[str]):
+        self.router = router
+        self.callback = callback
+        self.feeds = feeds
+        self.categories = categories
+        self.keywords = keywords
+        self.patterns = patterns
+        self.enclosure_types = enclosure_types
+        self.criteria = sum(1 for values in (feeds, categories, keywords, enclosure_types)
+                            if values)
+
+    def unsubscribe(self) -> None:
+        """Stop receiving entries through this subscription."""
+        self.router.unsubscribe(self)
+
+
+class _Index:
+    """An inverted index of subscriptions for one filter criterion."""
+
+    __slots__ = ('postings',)
+
+    def __init__(self):
+        self.postings = {}  # type: Dict[str, Set[Subscription]]
+
+    def add(self, subscription: Subscription, values: Set[str]) -> None:
+        for value in values:
+            self.postings.setdefault(value, set()).add(subscription)
+
+    def remove(self, subscription: Subscription, values: Set[str]) -> None:
+        for value in values:
+            postings = self.postings[value]
+            postings.discard(subscription)
+            if not postings:
+                del self.postings[value]
+
+    def matched(self, values: Iterable[str]) -> Set[Subscription]:
+        """Return the subscriptions constrained by this criterion that any of the values match."""
+        matched = set()  # type: Set[Subscription]
+        for value in values:
+            postings = self.postings.get(value)
+            if postings:
+                matched |= postings
+
+        return matched
+
+
+class EntryRouter:
+    """
+    Routes discovered entries only to the subscribers whose filters they match.
+
+    Instead of every subscriber receiving every entry and filtering it on its own, the filters
+    of all subscriptions are compiled into inverted indexes (by feed, category, keyword and
+    enclosure type). For each entry, only the posting lists of its own feed, categories, keywords
+    and enclosure type are looked up, and a subscription matches if it was found in the indexes of
+    all the criteria it is constrained by. The work done per entry is thus proportional to the
+    number of matching subscriptions (plus those that have no indexed filters at all) rather than
+    to the total number of subscriptions. Regular expressions are only evaluated for the
+    subscriptions that remain after that.
+
+    Feed readers are connected to the router with :meth:`attach`.
+    """
+
+    def __init__(self):
+        self._subscriptions = set()  # type: Set[Subscription]
+        self._feeds = _Index()
+        self._categories = _Index()
+        self._keywords = _Index()
+        self._enclosure_types = _Index()
+        self._unconstrained = set()  # type: Set[Subscription]
+        self._pattern_subscriptions = set()  # type: Set[Subscription]
+
+    def __len__(self) -> int:
+        return len(self._subscriptions)
+
+    def subscribe(self, callback: Callable[[EntryEvent], None], *,
+                  feeds: Iterable[str] = (), categories: Iterable[str] = (),
+                  keywords: Iterable[str] = (), patterns: Iterable[Union[str, Pattern]] = (),
+                  enclosure_types: Iterable[str] = ()) -> Subscription:
+        """
+        Subscribe to the entries matching the given filters.
+
+        Within each filter, any of the values must match. If several filters are given, all of
+        them must match. Categories and keywords are matched case insensitively. Keywords are
+        matched against the individual words of the title and summary, so each keyword must be a
+        single word (use ``patterns`` to match phrases).
+
+        :param callback: a callable (or coroutine function) that receives the
+            :class:`~asphalt.feedreader.events.EntryEvent` for each matching entry
+        :param feeds: state IDs of the feeds the entries must come from
+        :param categories: categories the entries must have
+        :param keywords: words that must appear in the title or summary
+        :param patterns: regular expressions one of which must match the title or summary
+        :param enclosure_types: MIME types of the enclosures the entries must have
+        :return: the subscription
+        :raises ValueError: if a keyword is not a single word
+
+        """
+        assert check_argument_types()
+        keywords = list(keywords)
+        for keyword in keywords:
+            if not word_re.fullmatch(keyword):
+                raise ValueError('keywords must be single words (use patterns to match phrases): '
+                                 '{!r}'.format(keyword))
+
+        subscription = Subscription(
+            self, callback, set(feeds), {category.casefold() for category in categories},
+            {keyword.casefold() for keyword in keywords},
+            [re.compile(pattern) if isinstance(pattern, str) else pattern
+             for pattern in patterns], set(enclosure_types))
+        self._subscriptions.add(subscription)
+        self._feeds.add(subscription, subscription.feeds)
+        self._categories.add(subscription, subscription.categories)
+        self._keywords.add(subscription, subscription.keywords)
+        self._enclosure_types.add(subscription, subscription.enclosure_types)
+        if not subscription.criteria:
+            self._unconstrained.add(subscription)
+        if subscription.patterns:
+            self._pattern_subscriptions.add(subscription)
+
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Remove the given subscription (no-op if it has been removed already)."""
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+            self._feeds.remove(subscription, subscription.feeds)
+            self._categories.remove(subscription, subscription.categories)
+            self._keywords.remove(subscription, subscription.keywords)
+            self._enclosure_types.remove(subscription, subscription.enclosure_types)
+            self._unconstrained.discard(subscription)
+            self._pattern_subscriptions.discard(subscription)
+
+    def match(self, feed_id: str, entry: FeedEntry) -> Set[Subscription]:
+        """
+        Return the subscriptions the given entry matches.
+
+        :param feed_id: state ID of the feed the entry was discovered in
+        :param entry: the entry
+
+        """
+        text = '\n'.join(text for text in (entry.title, entry.summary) if text)
+        matches = [self._feeds.matched([feed_id]),
+                   self._categories.matched(category.casefold()
+                                            for category in entry.categories if category),
+                   self._enclosure_types.matched(
+                       [entry.enclosure_type] if entry.enclosure_type else [])]
+        if self._keywords.postings:
+            matches.append(self._keywords.matched(set(word_re.findall(text.casefold()))))
+
+        # Count the criteria each subscription was matched by
+        counts = {}  # type: Dict[Subscription, int]
+        for matched in matches:
+            for subscription in matched:
+                counts[subscription] = counts.get(subscription, 0) + 1
+
+        candidates = {subscription for subscription, count in counts.items()
+                      if count == subscription.criteria}
+        candidates |= self._unconstrained
+        for subscription in candidates & self._pattern_subscriptions:
+            if not any(pattern.search(text) for pattern in subscription.patterns):
+                candidates.discard(subscription)
+
+        return candidates
+
+    def route(self, event: EntryEvent) -> None:
+        """
+        Deliver the given entry event to the matching subscribers.
+
+        :param event: an event from the ``entry_discovered`` signal of a feed reader
+
+        """
+        feed_id = getattr(event.source, 'state_id', event.source.url)
+        for subscription in self.match(feed_id, event.entry):
+            try:
+                retval = subscription.callback(event)
+                if isawaitable(retval):
+                    asyncio.ensure_future(retval)
+            except Exception:
+                logger.exception('Error delivering entry %s to %r', event.entry.id,
+                                 subscription.callback)
+
+    def attach(self, reader: FeedReader) -> None:
+        """Route the entries discovered by the given feed reader through this router."""
+        reader.entry_discovered.connect(self.route)
+
+    def detach(self, reader: FeedReader) -> None:
+        """Stop routing the entries discovered by the given feed reader."""
+        reader.entry_discovered.disconnect(self.route)
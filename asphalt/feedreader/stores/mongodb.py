@@ -1,9 +1,11 @@
-from typing import Union
+import time
+from typing import Union, Dict, Optional
 
 from asphalt.core import Context
 from asphalt.serialization.api import Serializer
 from asphalt.serialization.serializers.json import JSONSerializer
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import DuplicateKeyError
 from typeguard import check_argument_types
 
 from asphalt.feedreader.api import FeedStateStore
@@ -18,17 +20,20 @@ class MongoDBStore(FeedStateStore):
         none is specified)
     :param db: database to store the states in
     :param collection: name of the collection in the database
+    :param lease_collection: name of the collection for leases
     """
 
     def __init__(self, client: Union[str, AsyncIOMotorClient] = 'default',
                  serializer: Union[str, Serializer] = None, db: str = 'asphalt',
-                 collection: str = 'feed_states'):
+                 collection: str = 'feed_states', lease_collection: str = 'feed_leases'):
         assert check_argument_types()
         self.client = client
         self.serializer = serializer or JSONSerializer()
         self.db = db
         self.collection_name = collection
         self.collection = None
+        self.lease_collection_name = lease_collection
+        self.lease_collection = None
 
     async def start(self, ctx: Context):
         if isinstance(self.serializer, str):
@@ -38,12 +43,33 @@ class MongoDBStore(FeedStateStore):
 
         self.collection = self.client[self.db][self.collection_name]
         await self.collection.create_index('feed_id')
+        self.lease_collection = self.client[self.db][self.lease_collection_name]
 
     async def store_state(self, feed_id: str, state) -> None:
         serialized = self.serializer.serialize(state)
-        document = dict(feed_id=feed_id, state=serialized)
+        document = dict(feed_id=feed_id, state=serialized, touched=time.time())
         await self.collection.find_one_and_replace({'feed_id': feed_id}, document, upsert=True)
 
     async def load_state(self, feed_id: str):
         document = await self.collection.find_one({'feed_id': feed_id}, {'state': True})
         return self.serializer.deserialize(document['state']) if document else None
+
+    async def delete_state(self, feed_id: str) -> None:
+        await self.collection.delete_many({'feed_id': feed_id})
+
+    async def list_states(self) -> Dict[str, Optional[float]]:
+        cursor = self.collection.find({}, {'feed_id': True, 'touched': True})
+        return {document['feed_id']: document.get('touched')
+                for document in await cursor.to_list(None)}
+
+    async def acquire_lease(self, name: str, owner: str, duration: float) -> bool:
+        now = time.time()
+        try:
+            await self.lease_collection.find_one_and_update(
+                {'_id': name, '$or': [{'owner': owner}, {'expires': {'$lt': now}}]},
+                {'$set': {'owner': owner, 'expires': now + duration}}, upsert=True)
+        except DuplicateKeyError:
+            # The lease exists but is held by someone else
+            return False
+
+        return True
@@ -1,4 +1,5 @@
-from typing import Union
+import time
+from typing import Union, Dict, Optional, Any  # noqa
 
 from aioredis import Redis
 from asphalt.core import Context
@@ -13,21 +14,47 @@ class RedisStore(FeedStateStore):
     """
     Stores feed states in a Redis database.
 
+    By default, all the states are stored in a single hash. With ``sharded`` enabled, each state is
+    stored under its own key instead (``key_prefix`` + state ID), which spreads the states over
+    the nodes of a Redis cluster and avoids one huge key that is expensive to replicate. States
+    found in the hash are still loaded in sharded mode, and moved to their own keys when they are
+    next stored.
+
+    The times the states were last stored are kept in a sorted set (``feeds_key`` +
+    ``:touched``).
+
     :param client: a Redis client
     :param serializer: a serializer or the resource name of one (creates a new JSONSerializer if
         none is specified)
     :param db: number of the database to use
     :param feeds_key: key in the database to store the states in
+    :param lease_prefix: prefix for the keys of leases
+    :param sharded: ``True`` to store each state under its own key
+    :param key_prefix: prefix for the keys of the states in sharded mode
     """
 
+    lease_script = """\
+local current = redis.call('get', KEYS[1])
+if current == false or current == ARGV[1] then
+    redis.call('set', KEYS[1], ARGV[1], 'PX', ARGV[2])
+    return 1
+end
+return 0
+"""
+
     def __init__(self, client: Union[str, Redis] = 'default',
                  serializer: Union[str, Serializer] = None, db: int = 0,
-                 feeds_key: str = 'feed_states'):
+                 feeds_key: str = 'feed_states', lease_prefix: str = 'feed_lease:',
+                 sharded: bool = False, key_prefix: str = 'feed_state:'):
         assert check_argument_types()
         self.client = client
         self.serializer = serializer or JSONSerializer()
         self.db = db
         self.feeds_key = feeds_key
+        self.lease_prefix = lease_prefix
+        self.sharded = sharded
+        self.key_prefix = key_prefix
+        self.touched_key = feeds_key + ':touched'
 
     async def start(self, ctx: Context):
         if isinstance(self.serializer, str):
@@ -37,8 +64,43 @@ class RedisStore(FeedStateStore):
 
     async def store_state(self, feed_id: str, state) -> None:
         serialized = self.serializer.serialize(state)
-        await self.client.hset(self.feeds_key, feed_id, serialized)
+        transaction = self.client.multi_exec()
+        if self.sharded:
+            transaction.set(self.key_prefix + feed_id, serialized)
+            transaction.hdel(self.feeds_key, feed_id)
+        else:
+            transaction.hset(self.feeds_key, feed_id, serialized)
+
+        transaction.zadd(self.touched_key, time.time(), feed_id)
+        await transaction.execute()
 
     async def load_state(self, feed_id: str):
-        serialized = await self.client.hget(self.feeds_key, feed_id)
+        serialized = None
+        if self.sharded:
+            serialized = await self.client.get(self.key_prefix + feed_id)
+        if serialized is None:
+            serialized = await self.client.hget(self.feeds_key, feed_id)
+
         return self.serializer.deserialize(serialized) if serialized is not None else None
+
+    async def delete_state(self, feed_id: str) -> None:
+        transaction = self.client.multi_exec()
+        transaction.delete(self.key_prefix + feed_id)
+        transaction.hdel(self.feeds_key, feed_id)
+        transaction.zrem(self.touched_key, feed_id)
+        await transaction.execute()
+
+    async def list_states(self) -> Dict[str, Optional[float]]:
+        states = dict.fromkeys(key.decode('utf-8') for key in
+                               await self.client.hkeys(self.feeds_key))  # type: Dict[str, Any]
+        values = iter(await self.client.zrange(self.touched_key, withscores=True))
+        for feed_id, touched in zip(values, values):
+            states[feed_id.decode('utf-8')] = float(touched)
+
+        return states
+
+    async def acquire_lease(self, name: str, owner: str, duration: float) -> bool:
+        # Redis rejects expiry times below one millisecond
+        retval = await self.client.eval(self.lease_script, keys=[self.lease_prefix + name],
+                                        args=[owner, max(int(duration * 1000), 1)])
+        return bool(retval)
@@ -1,9 +1,11 @@
-from typing import Union
+import time
+from typing import Union, Dict, Optional
 
 from asphalt.core import Context, executor
 from asphalt.serialization.api import Serializer
 from asphalt.serialization.serializers.json import JSONSerializer
-from sqlalchemy import Table, MetaData, Column, LargeBinary, select, Unicode
+from sqlalchemy import Table, MetaData, Column, LargeBinary, select, Unicode, Float, and_, or_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.engine import Engine
 from typeguard import check_argument_types
 
@@ -17,24 +19,35 @@ class SQLAlchemyStore(FeedStateStore):
     This store imposes a maximum limit of 191 characters to length of the state id due to that
     being the maximum size of mysql index entries for columns with the utf8mb4 encoding.
 
+    The time each state was last stored is recorded in the ``touched`` column.
+
     :param engine: an SQLAlchemy engine or the resource name of one
     :param serializer: a serializer or the resource name of one (creates a new JSONSerializer if
         none is specified)
     :param table_name: name of the table in which to store the feed states
+    :param lease_table_name: name of the table in which to store leases
     """
 
     def __init__(self, engine: Union[str, Engine] = 'default',
-                 serializer: Union[str, Serializer] = None, table_name: str = 'feed_states'):
+                 serializer: Union[str, Serializer] = None, table_name: str = 'feed_states',
+                 lease_table_name: str = 'feed_leases'):
         assert check_argument_types()
         self.engine = engine
         self.serializer = serializer or JSONSerializer()
         self.table_name = table_name
 
         # 191 = max key length in MySQL for InnoDB/utf8mb4 tables
-        self.feeds_table = Table(table_name, MetaData(),
+        self.metadata = MetaData()
+        self.feeds_table = Table(table_name, self.metadata,
                                  Column('id', Unicode(191), primary_key=True),
                                  Column('state', LargeBinary, nullable=False),
+                                 Column('touched', Float),
                                  mysql_charset='utf8mb4')
+        self.leases_table = Table(lease_table_name, self.metadata,
+                                  Column('id', Unicode(191), primary_key=True),
+                                  Column('owner', Unicode(191), nullable=False),
+                                  Column('expires', Float, nullable=False),
+                                  mysql_charset='utf8mb4')
 
     async def start(self, ctx: Context):
         if isinstance(self.serializer, str):
@@ -42,15 +55,16 @@ class SQLAlchemyStore(FeedStateStore):
         if isinstance(self.engine, str):
             self.engine = await ctx.request_resource(Engine, self.engine)
 
-        await ctx.call_in_executor(self.feeds_table.create, self.engine, checkfirst=True)
+        await ctx.call_in_executor(self.metadata.create_all, self.engine, checkfirst=True)
 
     @executor
     def store_state(self, feed_id: str, state) -> None:
         serialized = self.serializer.serialize(state)
+        now = time.time()
         query = self.feeds_table.update().where(self.feeds_table.c.id == feed_id).\
-            values(state=serialized)
+            values(state=serialized, touched=now)
         if self.engine.execute(query).rowcount == 0:
-            query = self.feeds_table.insert().values(id=feed_id, state=serialized)
+            query = self.feeds_table.insert().values(id=feed_id, state=serialized, touched=now)
             self.engine.execute(query)
 
     @executor
@@ -58,3 +72,31 @@ class SQLAlchemyStore(FeedStateStore):
         query = select([self.feeds_table.c.state]).where(self.feeds_table.c.id == feed_id)
         serialized = self.engine.scalar(query)
         return self.serializer.deserialize(serialized) if serialized is not None else None
+
+    @executor
+    def delete_state(self, feed_id: str) -> None:
+        self.engine.execute(self.feeds_table.delete().where(self.feeds_table.c.id == feed_id))
+
+    @executor
+    def list_states(self) -> Dict[str, Optional[float]]:
+        query = select([self.feeds_table.c.id, self.feeds_table.c.touched])
+        return {feed_id: touched for feed_id, touched in self.engine.execute(query)}
+
+    @executor
+    def acquire_lease(self, name: str, owner: str, duration: float) -> bool:
+        now = time.time()
+        table = self.leases_table
+        query = table.update().\
+            where(and_(table.c.id == name, or_(table.c.owner == owner, table.c.expires < now))).\
+            values(owner=owner, expires=now + duration)
+        if self.engine.execute(query).rowcount:
+            return True
+
+        try:
+            self.engine.execute(table.insert().values(id=name, owner=owner,
+                                                      expires=now + duration))
+        except IntegrityError:
+            # The lease exists but is held by someone else
+            return False
+
+        return True
@@ -0,0 +1,261 @@
+"""Helpers for downloading feed documents with content encoding and size limits."""
+
+import asyncio
+import zlib
+from typing import Optional, List, Callable, Tuple  # noqa
+
+from aiohttp import ClientResponse
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+
+def _brotli_output_limit_supported() -> bool:
+    # Only newer versions of the brotli library can limit the size of the decompressed output
+    try:
+        brotli.Decompressor().process(b'', output_buffer_limit=1)
+    except TypeError:
+        return False
+
+    return True
+
+
+#: content codings that can be decoded by :func:`read_document`
+supported_encodings = ('gzip', 'deflate', 'br') if brotli is not None else ('gzip', 'deflate')
+
+#: ``True`` if brotli encoded documents can be decoded while enforcing a maximum size
+brotli_size_limit = brotli is not None and _brotli_output_limit_supported()
+
+
+def accepted_encodings(max_size: Optional[int]) -> Tuple[str, ...]:
+    """
+    Return the content codings to accept when downloading a document of the given maximum size.
+
+    Brotli is left out when a maximum size must be enforced but the brotli library cannot limit
+    the size of its output, as a small brotli stream can decompress to an arbitrary size.
+
+    :param max_size: maximum size of the decoded document, in bytes (``None`` = no limit)
+
+    """
+    if max_size is not None and not brotli_size_limit:
+        return tuple(encoding for encoding in supported_encodings if encoding != 'br')
+
+    return supported_encodings
+
+
+chunk_size = 65536
+
+#: number of seconds the body of a response may take before the minimum transfer rate is enforced
+rate_grace_period = 5
+
+
+class DocumentTooLargeError(ValueError):
+    """Raised when a downloaded document exceeds the configured maximum size."""
+
+    def __init__(self, max_size: int):
+        super().__init__('the document exceeds the maximum size of {} bytes'.format(max_size))
+        self.max_size = max_size
+
+
+class FeedGoneError(Exception):
+    """Raised when the server responds with ``410 Gone``, indicating the feed has been retired."""
+
+    def __init__(self, url: str):
+        super().__init__('the feed at {} is gone'.format(url))
+        self.url = url
+
+
+class FetchTimeoutError(asyncio.TimeoutError):
+    """
+    Raised when downloading a feed document exceeds one of its deadlines.
+
+    :ivar str stage: the deadline that was exceeded: ``connect``, ``first_byte``, ``total`` or
+        ``transfer_rate``
+    """
+
+    messages = {
+        'connect': 'timed out connecting to the server',
+        'first_byte': 'timed out waiting for the response',
+        'total': 'the download did not complete in time',
+        'transfer_rate': 'the transfer rate dropped below the minimum'
+    }
+
+    def __init__(self, stage: str):
+        super().__init__(self.messages[stage])
+        self.stage = stage
+
+
+class TransferStatistics:
+    """
+    Keeps track of the amount of data transferred while downloading a feed.
+
+    :ivar int documents: number of documents downloaded
+    :ivar int bytes_received: total number of bytes received over the wire (only counts downloads
+        where the transfer size is known)
+    :ivar int bytes_decoded: total size of the downloaded documents after decompression
+    :ivar last_bytes_received: bytes received over the wire for the last document (``None`` if not
+        known)
+    :vartype last_bytes_received: Optional[int]
+    :ivar int last_bytes_decoded: size of the last document after decompression
+    :ivar int timeouts: number of downloads that exceeded one of their deadlines
+    """
+
+    __slots__ = ('documents', 'bytes_received', 'bytes_decoded', 'last_bytes_received',
+                 'last_bytes_decoded', 'timeouts')
+
+    def __init__(self):
+        self.documents = self.bytes_received = self.bytes_decoded = self.last_bytes_decoded = 0
+        self.timeouts = 0
+        self.last_bytes_received = None  # type: Optional[int]
+
+    def record(self, received: Optional[int], decoded: int) -> None:
+        self.documents += 1
+        self.bytes_decoded += decoded
+        self.last_bytes_decoded = decoded
+        self.last_bytes_received = received
+        if received is not None:
+            self.bytes_received += received
+
+    @property
+    def compression_ratio(self) -> Optional[float]:
+        """The ratio of decoded bytes to bytes received over the wire (if known)."""
+        if self.bytes_received:
+            return self.bytes_decoded / self.bytes_received
+
+        return None
+
+
+class _ZlibDecoder:
+    __slots__ = ('encoding', '_decompressor')
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        self._decompressor = None
+
+    def decode(self, data: bytes, max_length: int) -> bytes:
+        if self._decompressor is None:
+            if self.encoding == 'gzip':
+                wbits = 16 + zlib.MAX_WBITS
+            elif data and data[0] & 0x0f == 8:
+                wbits = zlib.MAX_WBITS
+            else:
+                # Some servers send raw deflate streams without the zlib header
+                wbits = -zlib.MAX_WBITS
+
+            self._decompressor = zlib.decompressobj(wbits)
+
+        return self._decompressor.decompress(data, max_length)
+
+    def flush(self) -> bytes:
+        return self._decompressor.flush() if self._decompressor else b''
+
+
+class _BrotliDecoder:
+    __slots__ = ('_decompressor',)
+
+    def __init__(self):
+        self._decompressor = brotli.Decompressor()
+
+    def decode(self, data: bytes, max_length: int) -> bytes:
+        if max_length:
+            return self._decompressor.process(data, output_buffer_limit=max_length)
+
+        return self._decompressor.process(data)
+
+    def flush(self) -> bytes:
+        return b''
+
+
+async def read_document(response: ClientResponse, *, decode: bool, max_size: int = None,
+                        statistics: TransferStatistics = None, deadline: float = None,
+                        min_rate: float = None) -> bytes:
+    """
+    Read the body of the given response, enforcing the maximum size while streaming.
+
+    :param response: the response to read
+    :param decode: ``True`` to decode the body according to its ``Content-Encoding`` header (only
+        use this if the client session was created with ``auto_decompress=False``)
+    :param max_size: maximum size of the (decoded) document, in bytes
+    :param statistics: statistics object to record the transfer sizes in
+    :param deadline: event loop time by which the body must have been read
+    :param min_rate: minimum average transfer rate (in bytes per second), enforced after the
+        first :data:`rate_grace_period` seconds
+    :return: the (decoded) response body
+    :raises DocumentTooLargeError: if the decoded document exceeds ``max_size``
+    :raises FetchTimeoutError: if the deadline passes or the transfer is too slow
+    :raises ValueError: if the content encoding is not supported
+
+    """
+    content_length = response.headers.get('content-length')
+    content_length = int(content_length) if content_length and content_length.isdigit() else None
+    encoding = response.headers.get('content-encoding', 'identity').lower() if decode else None
+    if encoding in (None, 'identity'):
+        decoder = None
+        if max_size is not None and content_length is not None and content_length > max_size:
+            raise DocumentTooLargeError(max_size)
+    elif encoding in ('gzip', 'deflate'):
+        decoder = _ZlibDecoder(encoding)
+    elif encoding == 'br' and brotli is not None:
+        if max_size is not None and not brotli_size_limit:
+            raise ValueError('cannot enforce the maximum document size on brotli encoded content '
+                             'with the installed version of the brotli library')
+
+        decoder = _BrotliDecoder()
+    else:
+        raise ValueError('unsupported content encoding: {}'.format(encoding))
+
+    loop = asyncio.get_event_loop()
+    start = loop.time()
+    chunks = []  # type: List[bytes]
+    received = size = 0
+    while True:
+        # Wait for the next chunk until either the deadline passes or the average transfer rate
+        # would drop below the minimum
+        wait_until = None  # type: Optional[float]
+        if min_rate is not None:
+            wait_until = start + max(rate_grace_period, received / min_rate)
+
+        if deadline is not None:
+            wait_until = min(wait_until, deadline) if wait_until is not None else deadline
+
+        if wait_until is None:
+            chunk = await response.content.read(chunk_size)
+        else:
+            try:
+                chunk = await asyncio.wait_for(response.content.read(chunk_size),
+                                               max(wait_until - loop.time(), 0))
+            except asyncio.TimeoutError:
+                stage = 'total' if deadline is not None and wait_until >= deadline \
+                    else 'transfer_rate'
+                raise FetchTimeoutError(stage) from None
+
+        if not chunk:
+            break
+
+        received += len(chunk)
+        if decoder is not None:
+            # Limit the output to one byte over the maximum to detect decompression bombs early
+            chunk = decoder.decode(chunk, max_size - size + 1 if max_size is not None else 0)
+
+        size += len(chunk)
+        if max_size is not None and size > max_size:
+            raise DocumentTooLargeError(max_size)
+
+        chunks.append(chunk)
+
+    if decoder is not None:
+        chunk = decoder.flush()
+        size += len(chunk)
+        if max_size is not None and size > max_size:
+            raise DocumentTooLargeError(max_size)
+
+        chunks.append(chunk)
+
+    if statistics is not None:
+        # If the session decompressed the body on its own, the wire size is only known from the
+        # Content-Length header
+        statistics.record(received if decode else content_length, size)
+
+    return b''.join(chunks)
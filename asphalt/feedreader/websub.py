@@ -0,0 +1,288 @@
+import asyncio
+import hashlib
+import hmac
+import logging
+import os
+from typing import Dict, Optional, Union  # noqa
+
+from aiohttp import ClientSession, web
+from asphalt.core import Context
+from typeguard import check_argument_types
+
+from asphalt.feedreader.api import FeedReader
+
+logger = logging.getLogger(__name__)
+
+signature_methods = {
+    'sha1': hashlib.sha1,
+    'sha256': hashlib.sha256,
+    'sha384': hashlib.sha384,
+    'sha512': hashlib.sha512
+}
+
+
+class Subscription:
+    """
+    Represents a WebSub subscription of a single feed reader.
+
+    :ivar FeedReader reader: the feed reader that receives the pushed content
+    :ivar str hub: URL of the hub
+    :ivar str topic: the topic URL the subscription is for
+    :ivar str callback_url: the callback URL given to the hub
+    :ivar bool verified: ``True`` if the hub has verified the subscription intent
+    :ivar lease_seconds: the lease duration granted by the hub
+    :vartype lease_seconds: Optional[int]
+    """
+
+    __slots__ = ('reader', 'hub', 'topic', 'token', 'callback_url', 'secret', 'mode', 'verified',
+                 'lease_seconds', 'renew_handle', 'expire_handle')
+
+    def __init__(self, reader: FeedReader, hub: str, topic: str, token: str, callback_url: str):
+        self.reader = reader
+        self.hub = hub
+        self.topic = topic
+        self.token = token
+        self.callback_url = callback_url
+        self.secret = os.urandom(32).hex()
+        self.mode = 'subscribe'
+        self.verified = False
+        self.lease_seconds = None  # type: Optional[int]
+        self.renew_handle = None  # type: Optional[asyncio.Handle]
+        self.expire_handle = None  # type: Optional[asyncio.Handle]
+
+    def cancel_timers(self) -> None:
+        for handle in (self.renew_handle, self.expire_handle):
+            if handle is not None:
+                handle.cancel()
+
+        self.renew_handle = self.expire_handle = None
+
+
+class WebSubSubscriber:
+    """
+    Subscribes feed readers to WebSub_ (formerly PubSubHubbub) hubs and receives pushed content.
+
+    This runs an HTTP server that hosts the callback endpoint for the hubs. The hub verifies each
+    subscription intent against this endpoint and then pushes new content to it, which is fed to
+    :meth:`~asphalt.feedreader.readers.base.BaseFeedReader.process_document` of the subscribed
+    feed reader. Pushed content is authenticated with a per-subscription HMAC secret. Leases are
+    renewed automatically before they expire. If a lease expires without the hub having verified
+    its renewal, the subscription is dropped and the feed reader goes back to its usual polling
+    interval (and subscribes again when it next sees the hub advertised in the feed).
+
+    Feed readers subscribe automatically if they have been configured with a subscriber and the
+    feed advertises a hub. Subscribed feed readers are polled in ``fallback_interval`` instead of
+    their usual interval.
+
+    .. _WebSub: https://www.w3.org/TR/websub/
+
+    :param callback_url: the externally reachable base URL of the callback endpoint (defaults to
+        ``http://<host>:<port><path>``)
+    :param host: the host name or address to bind the HTTP server to
+    :param port: the port to bind the HTTP server to
+    :param path: the URL path prefix of the callback endpoint
+    :param lease_seconds: the lease duration to request from hubs
+    :param fallback_interval: the polling interval (in seconds) for subscribed feed readers
+    :param client_session: an aiohttp client session or the resource name of one (for sending
+        subscription requests to hubs)
+    """
+
+    def __init__(self, callback_url: str = None, host: str = '0.0.0.0', port: int = 8080,
+                 path: str = '/websub', lease_seconds: int = 86400,
+                 fallback_interval: int = 86400,
+                 client_session: Union[str, ClientSession] = None):
+        assert check_argument_types()
+        self.path = path.rstrip('/')
+        self.callback_url = (callback_url or 'http://{}:{}{}'.format(host, port, path)).rstrip('/')
+        self.host = host
+        self.port = port
+        self.lease_seconds = lease_seconds
+        self.fallback_interval = fallback_interval
+        self.session = client_session
+        self._subscriptions = {}  # type: Dict[str, Subscription]
+        self._tokens = {}  # type: Dict[FeedReader, str]
+
+    async def start(self, ctx: Context) -> None:
+        if isinstance(self.session, str):
+            self.session = await ctx.request_resource(ClientSession, self.session)
+        elif self.session is None:
+            self.session = ClientSession()
+            ctx.add_teardown_callback(self.session.close)
+
+        app = web.Application()
+        app.router.add_get(self.path + '/{token}', self.handle_verification)
+        app.router.add_post(self.path + '/{token}', self.handle_content)
+        handler = app.make_handler()
+        server = await ctx.loop.create_server(handler, self.host, self.port)
+        ctx.add_teardown_callback(self._cancel_renewals)
+
+        async def shutdown():
+            server.close()
+            await server.wait_closed()
+            await app.shutdown()
+            await handler.shutdown(5)
+            await app.cleanup()
+
+        ctx.add_teardown_callback(shutdown)
+        logger.info('Listening for WebSub callbacks on %s:%d (callback URL: %s)', self.host,
+                    self.port, self.callback_url)
+
+    def _cancel_renewals(self) -> None:
+        for subscription in self._subscriptions.values():
+            subscription.cancel_timers()
+
+    def get_subscription(self, reader: FeedReader) -> Optional[Subscription]:
+        """Return the subscription of the given feed reader, if any."""
+        token = self._tokens.get(reader)
+        return self._subscriptions.get(token) if token else None
+
+    def is_subscribed(self, reader: FeedReader) -> bool:
+        """Return ``True`` if the given feed reader has a verified, active subscription."""
+        subscription = self.get_subscription(reader)
+        return subscription is not None and subscription.verified
+
+    async def subscribe(self, reader: FeedReader, hub: str, topic: str) -> None:
+        """
+        Request the hub to start pushing content from the given topic to the feed reader.
+
+        If the reader already has a subscription with another hub or topic, that subscription is
+        replaced.
+
+        :param reader: the feed reader
+        :param hub: the URL of the hub
+        :param topic: the topic URL (the self link of the feed)
+
+        """
+        subscription = self.get_subscription(reader)
+        if subscription is not None:
+            if subscription.hub == hub and subscription.topic == topic:
+                return
+
+            await self.unsubscribe(reader)
+
+        token = os.urandom(16).hex()
+        callback_url = '{}/{}'.format(self.callback_url, token)
+        subscription = Subscription(reader, hub, topic, token, callback_url)
+        self._subscriptions[token] = subscription
+        self._tokens[reader] = token
+        try:
+            await self._send_request(subscription)
+        except BaseException:
+            self._remove(subscription)
+            raise
+
+    async def unsubscribe(self, reader: FeedReader) -> None:
+        """
+        Request the hub to stop pushing content to the given feed reader.
+
+        :param reader: the feed reader
+
+        """
+        subscription = self.get_subscription(reader)
+        if subscription is not None:
+            subscription.cancel_timers()
+            subscription.mode = 'unsubscribe'
+            subscription.verified = False
+            await self._send_request(subscription)
+
+    async def _send_request(self, subscription: Subscription) -> None:
+        data = {
+            'hub.mode': subscription.mode,
+            'hub.topic': subscription.topic,
+            'hub.callback': subscription.callback_url
+        }
+        if subscription.mode == 'subscribe':
+            data['hub.secret'] = subscription.secret
+            data['hub.lease_seconds'] = str(self.lease_seconds)
+
+        logger.info('Sending WebSub %s request for %s to %s', subscription.mode,
+                    subscription.topic, subscription.hub)
+        async with self.session.post(subscription.hub, data=data) as resp:
+            resp.raise_for_status()
+
+    def _renew(self, subscription: Subscription) -> None:
+        async def renew():
+            try:
+                await self._send_request(subscription)
+            except Exception:
+                logger.exception('Error renewing WebSub subscription for %s', subscription.topic)
+
+        subscription.renew_handle = None
+        asyncio.ensure_future(renew())
+
+    def _expire(self, subscription: Subscription) -> None:
+        logger.warning('WebSub subscription for %s expired without being renewed',
+                       subscription.topic)
+        subscription.verified = False
+        self._remove(subscription)
+
+    async def handle_verification(self, request: web.Request) -> web.Response:
+        subscription = self._subscriptions.get(request.match_info['token'])
+        mode = request.query.get('hub.mode')
+        if subscription is None or request.query.get('hub.topic') != subscription.topic:
+            return web.Response(status=404)
+
+        if mode == 'denied':
+            logger.warning('WebSub hub %s denied the subscription for %s: %s', subscription.hub,
+                           subscription.topic, request.query.get('hub.reason'))
+            self._remove(subscription)
+            return web.Response()
+        elif mode != subscription.mode or 'hub.challenge' not in request.query:
+            return web.Response(status=404)
+
+        if mode == 'subscribe':
+            subscription.verified = True
+            lease_seconds = request.query.get('hub.lease_seconds', '')
+            if lease_seconds.isdigit():
+                # Renew the lease when 90% of it has passed, and drop the subscription if the
+                # renewal has not been verified by the time the lease expires
+                loop = asyncio.get_event_loop()
+                subscription.cancel_timers()
+                subscription.lease_seconds = int(lease_seconds)
+                subscription.renew_handle = loop.call_later(
+                    subscription.lease_seconds * 0.9, self._renew, subscription)
+                subscription.expire_handle = loop.call_later(
+                    subscription.lease_seconds, self._expire, subscription)
+
+            logger.info('WebSub subscription for %s verified (lease: %s seconds)',
+                        subscription.topic, subscription.lease_seconds)
+        else:
+            self._remove(subscription)
+            logger.info('WebSub subscription for %s cancelled', subscription.topic)
+
+        return web.Response(text=request.query['hub.challenge'])
+
+    def _remove(self, subscription: Subscription) -> None:
+        subscription.cancel_timers()
+        del self._subscriptions[subscription.token]
+        if self._tokens.get(subscription.reader) == subscription.token:
+            del self._tokens[subscription.reader]
+
+    async def handle_content(self, request: web.Request) -> web.Response:
+        subscription = self._subscriptions.get(request.match_info['token'])
+        if subscription is None or not subscription.verified:
+            return web.Response(status=404)
+
+        body = await request.read()
+        method, _, signature = request.headers.get('X-Hub-Signature', '').partition('=')
+        digestmod = signature_methods.get(method)
+        if digestmod is None:
+            logger.warning('Ignoring WebSub content for %s: missing or unsupported signature',
+                           subscription.topic)
+        elif not hmac.compare_digest(
+                hmac.new(subscription.secret.encode('ascii'), body, digestmod).hexdigest(),
+                signature.lower()):
+            logger.warning('Ignoring WebSub content for %s: signature mismatch',
+                           subscription.topic)
+        else:
+            asyncio.ensure_future(self._process(subscription, body))
+
+        # The hub must get a successful response even if the content is ignored
+        return web.Response(status=202)
+
+    @staticmethod
+    async def _process(subscription: Subscription, body: bytes) -> None:
+        try:
+            await subscription.reader.process_document(body, partial=True)
+        except Exception:
+            logger.exception('Error processing WebSub content for %s', subscription.topic)
@@ -0,0 +1,278 @@
+"""
+Runs feed readers in worker processes to spread the fetching and parsing over several cores.
+
+Each worker process runs its own event loop with its own instances of the feed readers assigned
+to it. The workers forward new entries, metadata changes and updated feed states to the parent
+process, where they are applied to the feed reader resources. Events are thus dispatched in the
+parent process as usual, and the state store, duplicate index and other shared resources are only
+used there.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+from functools import partial
+from multiprocessing.connection import Connection
+from typing import Dict, Any, List, Tuple, Optional  # noqa
+
+from asphalt.core import Context
+from typeguard import check_argument_types
+
+from asphalt.feedreader.api import FeedStateStore, FeedReader
+from asphalt.feedreader.events import EntryEvent, MetadataEvent
+
+logger = logging.getLogger(__name__)
+
+#: feed reader options that refer to resources only available in the parent process
+parent_options = frozenset(['store', 'dedup_index', 'websub', 'coalescer', 'cluster',
+                            'working_set', 'entry_cache', 'circuit_breaker', 'pipeline',
+                            'resolver'])
+
+#: parent side options that have no effect in worker mode (a warning is logged if they are set)
+unsupported_options = frozenset(['websub', 'coalescer', 'cluster', 'circuit_breaker', 'resolver'])
+
+# (index, reader class, keyword arguments, initial state) for each feed of a worker
+WorkerFeeds = List[Tuple[int, type, Dict[str, Any], Optional[Dict[str, Any]]]]
+
+
+class _ForwardingStore(FeedStateStore):
+    """Serves the initial state of a worker side feed reader and forwards its state updates."""
+
+    def __init__(self, worker: '_Worker', index: int, state: Optional[Dict[str, Any]]):
+        self.worker = worker
+        self.index = index
+        self.state = state
+
+    async def start(self, ctx: Context) -> None:
+        pass
+
+    async def load_state(self, state_id: str) -> Optional[Dict[str, Any]]:
+        return self.state
+
+    async def store_state(self, state_id: str, state: Dict[str, Any]) -> None:
+        self.state = state
+        self.worker.send(('state', self.index, state))
+
+
+class _Worker:
+    def __init__(self, connection: Connection, loop: asyncio.AbstractEventLoop):
+        self.connection = connection
+        self.loop = loop
+        self.closed = asyncio.Event(loop=loop)
+        self._buffer = []  # type: List[tuple]
+
+    def send(self, message: tuple) -> None:
+        # Send everything that was produced during the same event loop iteration as one batch
+        if not self._buffer:
+            self.loop.call_soon(self.flush)
+
+        self._buffer.append(message)
+
+    def flush(self) -> None:
+        buffer, self._buffer = self._buffer, []
+        try:
+            self.connection.send(buffer)
+        except (BrokenPipeError, EOFError):
+            self.closed.set()
+
+    def connection_readable(self) -> None:
+        # The parent never sends anything, so the connection only becomes readable when closed
+        self.loop.remove_reader(self.connection.fileno())
+        self.closed.set()
+
+    async def run(self, feeds: WorkerFeeds) -> None:
+        ctx = Context()
+        try:
+            for index, reader_class, config, state in feeds:
+                store = _ForwardingStore(self, index, state)
+                reader = reader_class(store=store, **config)
+                reader.entry_discovered.connect(partial(self.forward_entry, index))
+                reader.metadata_changed.connect(partial(self.forward_metadata, index))
+                await reader.start(ctx)
+
+            self.loop.add_reader(self.connection.fileno(), self.connection_readable)
+            await self.closed.wait()
+        finally:
+            await ctx.close()
+
+    def forward_entry(self, index: int, event: EntryEvent) -> None:
+        # The entries of one update are dispatched back to back, so they are sent as one message
+        # to be processed as a batch in the parent process
+        if self._buffer and self._buffer[-1][:2] == ('entries', index):
+            self._buffer[-1][2].append(event.entry)
+        else:
+            self.send(('entries', index, [event.entry]))
+
+    def forward_metadata(self, index: int, event: MetadataEvent) -> None:
+        self.send(('metadata', index, event.changes))
+
+
+def run_worker(connection: Connection, feeds: WorkerFeeds, log_level: int) -> None:
+    """
+    Run the given feed readers until the connection to the parent process is closed.
+
+    This is the entry point of worker processes.
+
+    :param connection: the connection to the parent process
+    :param feeds: a list of (index, reader class, keyword arguments, initial state) tuples
+    :param log_level: the logging level of the parent process
+
+    """
+    logging.basicConfig(level=log_level)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(_Worker(connection, loop).run(feeds))
+    finally:
+        loop.close()
+
+
+class WorkerPool:
+    """
+    Distributes the fetching and parsing of feeds over a number of worker processes.
+
+    Feeds are partitioned among the workers in a round robin fashion. Each feed reader handed to
+    :meth:`add_feed` is recreated in its worker process from the given keyword arguments, with the
+    options referring to parent side resources (the state store, duplicate index, WebSub
+    subscriber, request coalescer, cluster, working set, entry cache and circuit breaker) removed.
+    Of these, the WebSub subscriber, request coalescer, cluster, circuit breaker and DNS resolver
+    have no effect in worker mode, so a warning is logged if a feed configures any of them.
+    The parent side feed reader should not poll the feed itself.
+
+    The worker processes are started with the ``spawn`` method (as forking a process with a
+    running event loop is unsafe), so the feed reader classes and their options must be
+    picklable.
+
+    :param workers: number of worker processes to start
+    """
+
+    def __init__(self, workers: int):
+        assert check_argument_types()
+        if workers < 1:
+            raise ValueError('workers must be a positive integer')
+
+        self.workers = workers
+        self._feeds = []  # type: List[Tuple[FeedReader, Dict[str, Any]]]
+        self._processes = []  # type: List[multiprocessing.Process]
+        self._connections = []  # type: List[Connection]
+        self._queue = None  # type: asyncio.Queue
+        self._closing = False
+
+    def add_feed(self, reader: FeedReader, config: Dict[str, Any]) -> None:
+        """
+        Assign the given feed reader to a worker process.
+
+        :param reader: the (parent side) feed reader, already started
+        :param config: keyword arguments for recreating the feed reader in a worker process
+
+        """
+        ignored = sorted(key for key, value in config.items()
+                         if key in unsupported_options and value is not None)
+        if ignored:
+            logger.warning('Ignoring options not supported in worker mode: %s (url=%s)',
+                           ', '.join(ignored), reader.url)
+
+        config = {key: value for key, value in config.items()
+                  if key not in parent_options and key != 'reader'}
+        if isinstance(config.get('client_session'), str):
+            del config['client_session']
+
+        self._feeds.append((reader, config))
+
+    async def start(self, ctx: Context) -> None:
+        self._queue = asyncio.Queue()
+        mp_context = multiprocessing.get_context('spawn')
+        log_level = logging.getLogger().getEffectiveLevel()
+        for worker_index in range(self.workers):
+            feeds = [(index, type(reader), config, self._initial_state(reader))
+                     for index, (reader, config) in enumerate(self._feeds)
+                     if index % self.workers == worker_index]
+            if not feeds:
+                break
+
+            parent_connection, child_connection = mp_context.Pipe(duplex=False)
+            process = mp_context.Process(target=run_worker, args=(child_connection, feeds,
+                                                                  log_level), daemon=True)
+            process.start()
+            child_connection.close()
+            ctx.loop.add_reader(parent_connection.fileno(), self._connection_readable,
+                                parent_connection)
+            self._processes.append(process)
+            self._connections.append(parent_connection)
+            logger.info('Started feed worker process %d with %d feeds', process.pid, len(feeds))
+
+        consumer_task = ctx.loop.create_task(self._consume())
+
+        async def shutdown():
+            self._closing = True
+            for process in self._processes:
+                process.terminate()
+
+            for process in self._processes:
+                await ctx.loop.run_in_executor(None, process.join)
+
+            consumer_task.cancel()
+            for connection in self._connections:
+                if not connection.closed:
+                    ctx.loop.remove_reader(connection.fileno())
+                    connection.close()
+
+        ctx.add_teardown_callback(shutdown)
+
+    @staticmethod
+    def _initial_state(reader: FeedReader) -> Optional[Dict[str, Any]]:
+        # A feed with no saved state must be onboarded by the worker, so it gets no state either
+        if getattr(reader, '_onboarding', False):
+            return None
+
+        return reader.__getstate__()
+
+    def _connection_readable(self, connection: Connection) -> None:
+        try:
+            while connection.poll():
+                self._queue.put_nowait(connection.recv())
+        except (EOFError, OSError):
+            asyncio.get_event_loop().remove_reader(connection.fileno())
+            connection.close()
+            if not self._closing:
+                logger.error('A feed worker process has exited unexpectedly')
+
+    async def _consume(self) -> None:
+        while True:
+            for message in await self._queue.get():
+                try:
+                    await self.handle_message(*message)
+                except Exception:
+                    logger.exception('Error handling a message from a feed worker process')
+
+    async def handle_message(self, kind: str, index: int, payload) -> None:
+        reader = self._feeds[index][0]
+        if kind == 'entries':
+            dedup_index = getattr(reader, 'dedup_index', None)
+            if dedup_index is not None:
+                payload = [entry for entry in payload if not dedup_index.check(entry)]
+
+            pipeline = getattr(reader, 'pipeline', None)
+            if pipeline is not None:
+                payload = await pipeline.process(payload, reader.url)
+
+            entry_cache = getattr(reader, 'entry_cache', None)
+            for entry in payload:
+                if entry_cache is not None:
+                    entry_cache.add(reader.state_id, entry)
+
+                reader.entry_discovered.dispatch(entry=entry)
+        elif kind == 'metadata':
+            for key, value in payload.items():
+                setattr(reader.metadata, key, value)
+
+            reader.metadata_changed.dispatch(payload)
+        elif kind == 'state':
+            reader.__setstate__(payload)
+            store = getattr(reader, 'store', None)
+            if store is not None:
+                await store.store_state(reader.state_id, payload)
+
+            dedup_index = getattr(reader, 'dedup_index', None)
+            if dedup_index is not None:
+                await dedup_index.save()
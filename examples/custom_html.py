@@ -10,7 +10,7 @@ You must have ``lxml`` and ``beautifulsoup4`` installed for this to work.
 """
 
 import re
-from typing import Tuple, Dict, Any, List
+from typing import Tuple, Dict, Any, List, Union
 from urllib.parse import urlparse
 
 import click
@@ -25,7 +25,8 @@ lse_path_re = re.compile(r'/Events/\d{4}/\d{2}/(.+?)/')
 
 class LSEFeedReader(BaseFeedReader):
     @classmethod
-    def parse_document(cls, document: str) -> Tuple[Dict[str, Any], List[FeedEntry]]:
+    def parse_document(
+            cls, document: Union[str, bytes]) -> Tuple[Dict[str, Any], List[FeedEntry]]:
         # Use BeautifulSoup to parse the document
         root = soupparser.fromstring(document, features='html.parser')
 
@@ -0,0 +1,33 @@
+import time
+
+import pytest
+
+from asphalt.feedreader.api import FeedStateStore
+
+
+class MemoryStore(FeedStateStore):
+    def __init__(self):
+        self.states = {}
+        self.touched = {}
+
+    async def start(self, ctx):
+        pass
+
+    async def load_state(self, state_id):
+        return self.states.get(state_id)
+
+    async def store_state(self, state_id, state):
+        self.states[state_id] = state
+        self.touched[state_id] = time.time()
+
+    async def delete_state(self, state_id):
+        self.states.pop(state_id, None)
+        self.touched.pop(state_id, None)
+
+    async def list_states(self):
+        return {state_id: self.touched.get(state_id) for state_id in self.states}
+
+
+@pytest.fixture
+def memory_store():
+    return MemoryStore()
@@ -74,6 +74,7 @@ def test_parse_document():
         'updated': datetime(2005, 7, 31, 12, 29, 29, tzinfo=timezone.utc),
         'id': 'tag:example.org,2003:3',
         'link': 'http://example.org/',
+        'self_link': 'http://example.org/feed.atom',
         'copyright': 'Copyright (c) 2003, Mark Pilgrim',
         'generator': 'Example Toolkit'
     }
@@ -93,3 +94,52 @@ def test_parse_document():
     assert event.enclosure_length == 1337
     assert event.enclosure_type == 'audio/mpeg'
     assert event.content_type == 'xhtml'
+
+
+def test_parse_document_bytes():
+    document = """\
+<?xml version="1.0" encoding="ISO-8859-1"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+ <title>Ålandsbladet</title>
+ <entry>
+   <title>Smörgåsbord</title>
+   <id>1</id>
+ </entry>
+</feed>
+""".encode('iso-8859-1')
+    metadata, events = AtomFeedReader.parse_document(document)
+    assert metadata == {'title': 'Ålandsbladet'}
+    assert events[0].title == 'Smörgåsbord'
+
+
+def test_parse_extensions():
+    document = """\
+<feed xmlns="http://www.w3.org/2005/Atom" xmlns:media="http://search.yahoo.com/mrss/"
+      xmlns:itunes="http://www.itunes.com/dtds/podcast-1.0.dtd">
+ <id>tag:example.org,2003:3</id>
+ <itunes:author>Jane Doe</itunes:author>
+ <entry>
+   <id>tag:example.org,2003:3.2397</id>
+   <content type="html">&lt;p&gt;Atom content&lt;/p&gt;</content>
+   <media:title>Episode 1</media:title>
+   <itunes:episode>1</itunes:episode>
+ </entry>
+</feed>
+"""
+    metadata, events = AtomFeedReader.parse_document(document)
+    assert metadata['extensions'] == {'itunes:author': 'Jane Doe'}
+    event = cast(AtomEntry, events[0])
+    assert event.content == '<p>Atom content</p>'
+    assert event.extensions == {'media:title': 'Episode 1', 'itunes:episode': '1'}
+
+
+def test_parse_paging_links():
+    document = """\
+<feed xmlns="http://www.w3.org/2005/Atom">
+ <link rel="next" href="http://example.org/feed?page=2"/>
+ <link rel="prev-archive" href="http://example.org/archive/2017-01"/>
+</feed>
+"""
+    metadata, events = AtomFeedReader.parse_document(document)
+    assert metadata == {'next_link': 'http://example.org/feed?page=2',
+                        'prev_archive_link': 'http://example.org/archive/2017-01'}
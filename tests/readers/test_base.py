@@ -1,11 +1,14 @@
+import asyncio
+from datetime import datetime, timezone
 from typing import Tuple, Dict, Any, List
 
 import pytest
 from async_generator import aclosing
 from defusedxml.ElementTree import fromstring
 
-from asphalt.core import stream_events
+from asphalt.core import stream_events, Context
 from asphalt.feedreader import FeedEntry
+from asphalt.feedreader.dedup import DuplicateIndex
 from asphalt.feedreader.events import MetadataEvent, EntryEvent
 from asphalt.feedreader.readers.base import BaseFeedReader
 
@@ -23,6 +26,13 @@ class DummyFeedReader(BaseFeedReader):
         return {'title': 'feed title'}, entries
 
 
+@pytest.fixture
+def context(event_loop):
+    ctx = Context()
+    yield ctx
+    event_loop.run_until_complete(ctx.close())
+
+
 @pytest.fixture
 def feed():
     return DummyFeedReader('http://localhost/blah')
@@ -80,3 +90,227 @@ async def test_update(event_loop, feed):
     assert events[1].entry.title == 'foo'
     assert events[2].entry.id == '2'
     assert events[2].entry.title == 'bar'
+
+
+@pytest.mark.asyncio
+async def test_update_seen_entries(feed):
+    events = []
+    feed.entry_discovered.connect(events.append)
+    await feed.update()
+    await feed.update()
+    await asyncio.sleep(0)
+    assert feed._seen_entry_ids == {'1', '2'}
+    assert [event.entry.id for event in events] == ['1', '2']
+
+
+@pytest.mark.asyncio
+async def test_update_duplicate_index(feed):
+    feed.dedup_index = DuplicateIndex(capacity=100)
+    feed.dedup_index.check(FeedEntry('x', title='foo'))
+    events = []
+    feed.entry_discovered.connect(events.append)
+    await feed.update()
+    await asyncio.sleep(0)
+    assert [event.entry.id for event in events] == ['2']
+    assert feed._seen_entry_ids == {'1', '2'}
+
+
+@pytest.mark.asyncio
+async def test_update_undecodable_entry(feed, caplog):
+    def loader():
+        raise ValueError('bad date')
+
+    feed.parse_document = lambda document: ({}, [FeedEntry.lazy('1', loader),
+                                                 FeedEntry.lazy('2', lambda: {'title': 'bar'})])
+    events = []
+    feed.entry_discovered.connect(events.append)
+    await feed.update()
+    await asyncio.sleep(0)
+    assert [event.entry.id for event in events] == ['2']
+    assert feed._seen_entry_ids == {'1', '2'}
+    assert 'Error decoding entry 1; skipping it' in caplog.text
+
+
+class CountingFeedReader(DummyFeedReader):
+    entry_region_markers = (b'<entry', b'</entry>')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.document = b'<feed><updated>1</updated><entry id="1" title="foo"></entry></feed>'
+        self.parse_count = 0
+
+    async def fetch_document(self):
+        return self.document
+
+    def parse_document(self, document):
+        self.parse_count += 1
+        return super().parse_document(document)
+
+
+@pytest.mark.asyncio
+async def test_update_unchanged_document(context, memory_store):
+    feed = CountingFeedReader('http://localhost/blah', store=memory_store, interval=None)
+    await feed.start(context)
+    await feed.update()
+    await feed.update()
+    assert feed.parse_count == 1
+    assert memory_store.states['http://localhost/blah']['content_hash'] == feed._content_hash
+
+    # The digest is persisted, so a restarted reader does not parse the same document again
+    feed2 = CountingFeedReader('http://localhost/blah', store=memory_store, interval=None)
+    await feed2.start(context)
+    await feed2.update()
+    assert feed2.parse_count == 0
+
+    feed2.document = feed2.document.replace(b'<updated>1', b'<updated>2')
+    await feed2.update()
+    assert feed2.parse_count == 1
+
+
+@pytest.mark.parametrize('hash_entries_only, parse_count', [
+    (False, 2),
+    (True, 1)
+], ids=['whole_document', 'entries_only'])
+@pytest.mark.asyncio
+async def test_hash_entries_only(hash_entries_only, parse_count):
+    feed = CountingFeedReader('http://localhost/blah', hash_entries_only=hash_entries_only)
+    await feed.update()
+    feed.document = feed.document.replace(b'<updated>1', b'<updated>2')
+    await feed.update()
+    assert feed.parse_count == parse_count
+
+
+class PagedFeedReader(BaseFeedReader):
+    """Serves pages of two entries each, linked from the newest to the oldest."""
+
+    pages = {
+        'http://localhost/feed': ('7 8', 'page2'),
+        'http://localhost/page2': ('5 6', 'page3'),
+        'http://localhost/page3': ('3 4', 'page4'),
+        'http://localhost/page4': ('1 2', 'page5'),
+        'http://localhost/page5': ('0', None)
+    }
+
+    def __init__(self, **kwargs):
+        super().__init__('http://localhost/feed', interval=None, **kwargs)
+        self.fetched_pages = []
+
+    async def fetch_document(self):
+        return self.url
+
+    async def fetch_page(self, url):
+        self.fetched_pages.append(url)
+        return url
+
+    def parse_document(self, document):
+        ids, next_link = self.pages[document]
+        entries = [FeedEntry(id=entry_id, published=datetime(2017, 1, int(entry_id) + 1,
+                                                             tzinfo=timezone.utc))
+                   for entry_id in ids.split()]
+        return {'next_link': next_link}, entries
+
+
+@pytest.mark.parametrize('catch_up_pages, expected_ids', [
+    (10, ['3', '4', '5', '6', '7', '8']),
+    (1, ['5', '6', '7', '8']),
+    (0, ['7', '8'])
+], ids=['all', 'budget', 'disabled'])
+@pytest.mark.asyncio
+async def test_catch_up(catch_up_pages, expected_ids):
+    feed = PagedFeedReader(catch_up_pages=catch_up_pages, catch_up_concurrency=2)
+    feed._seen_entry_ids = {'1', '2'}
+    events = []
+    feed.entry_discovered.connect(events.append)
+    await feed.update()
+    await asyncio.sleep(0)
+    assert [event.entry.id for event in events] == expected_ids
+    assert len(feed.fetched_pages) == min(catch_up_pages, 3)
+    assert feed._seen_entry_ids == {'7', '8'}
+
+
+@pytest.mark.asyncio
+async def test_catch_up_mixed_timezones():
+    class MixedFeedReader(PagedFeedReader):
+        # Newest entry first on each page, and every other publication date is naive
+        pages = {url: (' '.join(reversed(ids.split())), next_link)
+                 for url, (ids, next_link) in PagedFeedReader.pages.items()}
+
+        def parse_document(self, document):
+            metadata, entries = super().parse_document(document)
+            for entry in entries:
+                if int(entry.id) % 2:
+                    entry.published = entry.published.replace(tzinfo=None)
+
+            return metadata, entries
+
+    feed = MixedFeedReader()
+    feed._seen_entry_ids = {'1', '2'}
+    events = []
+    feed.entry_discovered.connect(events.append)
+    await feed.update()
+    await asyncio.sleep(0)
+    assert [event.entry.id for event in events] == ['3', '4', '5', '6', '7', '8']
+
+
+@pytest.mark.asyncio
+async def test_no_catch_up_first_update():
+    feed = PagedFeedReader()
+    await feed.update()
+    assert not feed.fetched_pages
+
+
+class OnboardingFeedReader(BaseFeedReader):
+    async def fetch_document(self):
+        return b'dummy'
+
+    def parse_document(self, document):
+        return {}, [FeedEntry(id=str(day), published=datetime(2017, 1, day, tzinfo=timezone.utc))
+                    for day in (1, 3, 2, 5, 4)]
+
+
+@pytest.mark.parametrize('options, expected_ids', [
+    ({}, ['1', '3', '2', '5', '4']),
+    ({'onboarding': 'none'}, []),
+    ({'onboarding': 'newest', 'onboarding_limit': 2}, ['4', '5']),
+    ({'onboarding': 'since', 'onboarding_since': datetime(2017, 1, 3)}, ['3', '5', '4'])
+], ids=['all', 'none', 'newest', 'since'])
+@pytest.mark.asyncio
+async def test_onboarding(options, expected_ids):
+    feed = OnboardingFeedReader('http://localhost/blah', interval=None, **options)
+    events = []
+    feed.entry_discovered.connect(events.append)
+    await feed.update()
+    await asyncio.sleep(0)
+    assert [event.entry.id for event in events] == expected_ids
+    assert feed._seen_entry_ids == {'1', '2', '3', '4', '5'}
+
+
+@pytest.mark.asyncio
+async def test_onboarding_existing_state():
+    feed = OnboardingFeedReader('http://localhost/blah', interval=None, onboarding='none')
+    feed.__setstate__({'version': 1, 'seen_entry_ids': ['1']})
+    events = []
+    feed.entry_discovered.connect(events.append)
+    await feed.update()
+    await asyncio.sleep(0)
+    assert [event.entry.id for event in events] == ['3', '2', '5', '4']
+
+
+@pytest.mark.asyncio
+async def test_onboarding_undated():
+    feed = OnboardingFeedReader('http://localhost/blah', interval=None, onboarding='newest',
+                                onboarding_limit=2)
+    feed.parse_document = lambda document: ({}, [FeedEntry(id=str(i)) for i in (5, 4, 3, 2, 1)])
+    events = []
+    feed.entry_discovered.connect(events.append)
+    await feed.update()
+    await asyncio.sleep(0)
+    assert [event.entry.id for event in events] == ['4', '5']
+    assert feed._seen_entry_ids == {'1', '2', '3', '4', '5'}
+
+
+def test_onboarding_invalid_policy():
+    exc = pytest.raises(ValueError, OnboardingFeedReader, 'http://localhost/blah',
+                        onboarding='foo')
+    exc.match('onboarding must be one of: all, none, newest, since')
+    pytest.raises(ValueError, OnboardingFeedReader, 'http://localhost/blah', onboarding='since')
@@ -0,0 +1,87 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from asphalt.feedreader.readers.html import HTMLFeedReader, compile_selector
+
+document = b"""\
+<html>
+  <head><title>Events</title></head>
+  <body>
+    <!-- listing -->
+    <div class="event">
+      <a href="/events/1">More</a>
+      <h2>First <em>event</em></h2>
+      <time datetime="2017-04-02T08:29:30">April 2nd</time>
+      <ul class="tags"><li>Foo</li><li> Bar </li></ul>
+    </div>
+    <div class="event">
+      <a href="http://example.com/events/2">More</a>
+      <h2>Second event</h2>
+    </div>
+    <div class="event"><h2>No link</h2></div>
+  </body>
+</html>
+"""
+
+
+@pytest.mark.parametrize('spec, expected', [
+    ('h2', ['First event']),
+    ('h2::text', ['First']),
+    ('a::attr(href)', ['/events/1']),
+    ('li', ['Foo', 'Bar']),
+    ('::attr(class)', ['event']),
+    ('xpath:.//a/@href', ['/events/1']),
+    ('xpath:string(.//h2)', ['First event']),
+    ('xpath:.//li', ['Foo', 'Bar'])
+], ids=['css_text_content', 'css_text', 'css_attr', 'css_multiple', 'css_self', 'xpath_attr',
+        'xpath_string', 'xpath_elements'])
+def test_compile_selector(spec, expected):
+    from lxml.html import document_fromstring
+
+    element = document_fromstring(document).find_class('event')[0]
+    assert compile_selector(spec)(element) == expected
+
+
+@pytest.mark.parametrize('spec', ['h2[', 'xpath:.//['], ids=['css', 'xpath'])
+def test_invalid_selector(spec):
+    pytest.raises(ValueError, compile_selector, spec).match('invalid selector')
+
+
+def test_invalid_fields():
+    exc = pytest.raises(ValueError, HTMLFeedReader, url='http://example.org/events',
+                        entries='div', fields={'title': 'h2'})
+    exc.match('either an "id" or a "link" selector is required')
+    exc = pytest.raises(ValueError, HTMLFeedReader, url='http://example.org/events',
+                        entries='div', fields={'link': 'a', 'foo': 'h2', '_loader': 'h2'})
+    exc.match('invalid entry field\\(s\\): foo, _loader')
+
+
+def test_parse_document():
+    reader = HTMLFeedReader(url='http://example.org/events', entries='div.event', fields={
+        'title': 'h2',
+        'link': 'a::attr(href)',
+        'published': 'time::attr(datetime)',
+        'categories': 'ul.tags li'
+    })
+    metadata, entries = reader.parse_document(document)
+    assert metadata == {'title': 'Events'}
+    assert len(entries) == 2
+    assert entries[0].id == entries[0].link == 'http://example.org/events/1'
+    assert entries[0].title == 'First event'
+    assert entries[0].published == datetime(2017, 4, 2, 8, 29, 30, tzinfo=timezone.utc)
+    assert entries[0].categories == ('Foo', 'Bar')
+    assert entries[1].id == 'http://example.com/events/2'
+    assert entries[1].published is None
+    assert entries[1].categories == ()
+
+
+def test_parser_key():
+    reader = HTMLFeedReader(url='http://example.org/events', entries='div.event',
+                            fields={'link': 'a::attr(href)'})
+    reader2 = HTMLFeedReader(url='http://example.org/events', entries='div.event',
+                             fields={'link': 'a::attr(href)'})
+    reader3 = HTMLFeedReader(url='http://example.org/events', entries='div',
+                             fields={'link': 'a::attr(href)'})
+    assert reader.parser_key == reader2.parser_key
+    assert reader.parser_key != reader3.parser_key
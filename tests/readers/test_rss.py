@@ -3,6 +3,7 @@ from typing import cast
 
 import pytest
 
+from asphalt.feedreader.readers.extensions import register_handler, extension_handler
 from asphalt.feedreader.readers.rss import RSSFeedReader, RSSEntry
 
 
@@ -66,3 +67,92 @@ def test_parse_document():
     assert event.enclosure_url == 'http://www.example.org/song1.mp3'
     assert event.enclosure_length == 1337
     assert event.enclosure_type == 'audio/mpeg'
+
+
+def test_parse_document_bytes():
+    document = """\
+<?xml version="1.0" encoding="ISO-8859-1" ?>
+<rss version="2.0">
+  <channel>
+    <title>Ålandsbladet</title>
+    <item>
+      <title>Smörgåsbord</title>
+      <guid>1</guid>
+    </item>
+  </channel>
+</rss>
+""".encode('iso-8859-1')
+    metadata, events = RSSFeedReader.parse_document(document)
+    assert metadata == {'title': 'Ålandsbladet'}
+    assert events[0].title == 'Smörgåsbord'
+
+
+def test_parse_extensions():
+    document = """\
+<rss version="2.0" xmlns:content="http://purl.org/rss/1.0/modules/content/"
+     xmlns:dc="http://purl.org/dc/elements/1.1/"
+     xmlns:itunes="http://www.itunes.com/dtds/podcast-1.0.dtd"
+     xmlns:media="http://search.yahoo.com/mrss/"
+     xmlns:sy="http://purl.org/rss/1.0/modules/syndication/">
+  <channel>
+    <title>Podcast</title>
+    <sy:updatePeriod>daily</sy:updatePeriod>
+    <sy:updateFrequency>4</sy:updateFrequency>
+    <itunes:image href="http://example.org/cover.jpg"/>
+    <item>
+      <guid>1</guid>
+      <dc:creator> Jane Doe </dc:creator>
+      <dc:date>2002-05-19T15:21:36Z</dc:date>
+      <content:encoded><![CDATA[<p>Full text</p>]]></content:encoded>
+      <itunes:duration>01:02:03</itunes:duration>
+      <media:group>
+        <media:content url="http://example.org/ep1.mp3" type="audio/mpeg" fileSize="1337"/>
+        <media:content url="http://example.org/ep1.ogg" type="audio/ogg"/>
+      </media:group>
+      <media:thumbnail url="http://example.org/ep1.jpg"/>
+    </item>
+  </channel>
+</rss>
+"""
+    metadata, events = RSSFeedReader.parse_document(document)
+    assert metadata['extensions'] == {
+        'sy:updatePeriod': 'daily',
+        'sy:updateFrequency': '4',
+        'itunes:image': 'http://example.org/cover.jpg'
+    }
+
+    event = cast(RSSEntry, events[0])
+    assert event.published == datetime(2002, 5, 19, 15, 21, 36, tzinfo=timezone.utc)
+    assert event.content == '<p>Full text</p>'
+    assert event.content_type == 'html'
+    assert event.enclosure_url == 'http://example.org/ep1.mp3'
+    assert event.enclosure_type == 'audio/mpeg'
+    assert event.enclosure_length == 1337
+    assert event.extensions == {
+        'dc:creator': 'Jane Doe',
+        'itunes:duration': '01:02:03',
+        'media:content': [
+            {'url': 'http://example.org/ep1.mp3', 'type': 'audio/mpeg', 'fileSize': '1337'},
+            {'url': 'http://example.org/ep1.ogg', 'type': 'audio/ogg'}
+        ],
+        'media:thumbnail': 'http://example.org/ep1.jpg'
+    }
+
+
+def test_register_handler():
+    class CustomRSSFeedReader(RSSFeedReader):
+        pass
+
+    register_handler(CustomRSSFeedReader, 'item_handlers', '{http://example.org/ns}rating',
+                     extension_handler('ex:rating'))
+    document = """\
+<rss version="2.0" xmlns:ex="http://example.org/ns">
+  <channel><item><guid>1</guid><ex:rating>5</ex:rating></item></channel>
+</rss>
+"""
+    metadata, events = CustomRSSFeedReader.parse_document(document)
+    assert events[0].extensions == {'ex:rating': '5'}
+
+    # The handler must not leak to the superclass
+    metadata, events = RSSFeedReader.parse_document(document)
+    assert events[0].extensions == {}
@@ -0,0 +1,77 @@
+from pathlib import Path
+
+import pytest
+from defusedxml import EntitiesForbidden
+
+from asphalt.feedreader.readers.atom import AtomFeedReader
+from asphalt.feedreader.readers.rss import RSSFeedReader
+from asphalt.feedreader.readers.xml import get_xml_parser, parse_errors
+
+lxml = pytest.importorskip('lxml')
+
+corpus_dir = Path(__file__).parent / 'corpus'
+corpus = sorted(path.name for path in corpus_dir.glob('*.xml'))
+
+
+def entry_attributes(entry):
+    attrs = {}
+    for cls in type(entry).__mro__:
+        for attr in getattr(cls, '__slots__', ()):
+            attrs[attr] = getattr(entry, attr)
+
+    return attrs
+
+
+@pytest.mark.parametrize('filename', corpus)
+@pytest.mark.parametrize('decode', [False, True], ids=['bytes', 'str'])
+def test_identical_output(filename, decode):
+    reader_class = AtomFeedReader if filename.startswith('atom') else RSSFeedReader
+    document = corpus_dir.joinpath(filename).read_bytes()
+    if decode:
+        # Emulate a document decoded by the HTTP layer (the prolog encoding is then ignored)
+        document = document.decode('iso-8859-1' if 'latin1' in filename else 'utf-8')
+
+    etree_metadata, etree_entries = reader_class.parse_document(document, xml_parser='etree')
+    lxml_metadata, lxml_entries = reader_class.parse_document(document, xml_parser='lxml')
+    assert lxml_metadata == etree_metadata
+    assert [entry_attributes(entry) for entry in lxml_entries] == \
+        [entry_attributes(entry) for entry in etree_entries]
+    assert etree_entries
+
+
+def test_lxml_no_external_entities():
+    document = b"""\
+<?xml version="1.0"?>
+<!DOCTYPE rss [<!ENTITY xxe SYSTEM "file:///etc/passwd">]>
+<rss version="2.0"><channel><title>&xxe;</title></channel></rss>
+"""
+    metadata, entries = RSSFeedReader.parse_document(document, xml_parser='lxml')
+    assert not metadata.get('title')
+    with pytest.raises(EntitiesForbidden):
+        RSSFeedReader.parse_document(document, xml_parser='etree')
+
+
+def test_parse_error():
+    with pytest.raises(parse_errors):
+        get_xml_parser('lxml')(b'<rss>')
+
+
+def test_reader_engine():
+    reader = RSSFeedReader(url='http://example.org/rss', xml_parser='lxml')
+    document = corpus_dir.joinpath('rss_full.xml').read_bytes()
+    metadata, entries = reader._parse_document(document)
+    assert isinstance(entries[0].title, str)
+    assert reader.xml_parser == 'lxml'
+    assert 'parse_document' not in vars(reader)
+
+    # Only lxml accepts (and ignores) the entity declaration
+    document = b'<!DOCTYPE rss [<!ENTITY x "y">]><rss version="2.0"><channel/></rss>'
+    reader._parse_document(document)
+    with pytest.raises(EntitiesForbidden):
+        RSSFeedReader(url='http://example.org/rss')._parse_document(document)
+
+
+def test_unknown_engine():
+    exc = pytest.raises(LookupError, AtomFeedReader, url='http://example.org/atom',
+                        xml_parser='foo')
+    exc.match('no such XML parser engine: foo')
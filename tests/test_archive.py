@@ -0,0 +1,120 @@
+import asyncio
+import os
+from datetime import datetime, timezone
+
+import pytest
+
+from asphalt.core import Context
+from asphalt.feedreader.archive import EntryArchive
+from asphalt.feedreader.readers.rss import RSSFeedReader, RSSEntry
+
+
+@pytest.fixture
+def context(event_loop):
+    ctx = Context()
+    yield ctx
+    event_loop.run_until_complete(ctx.close())
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr('asphalt.feedreader.archive.time.time', lambda: clock[0])
+    return clock
+
+
+def timestamp(seconds):
+    return datetime.fromtimestamp(seconds, timezone.utc)
+
+
+async def fill(archive, clock, count):
+    for i in range(count):
+        archive.add('foo' if i % 2 else 'bar', RSSEntry(id=str(i), title='Entry %d' % i,
+                                                        author='author@example.org'))
+        clock[0] += 1
+
+
+@pytest.mark.asyncio
+async def test_scan(context, tmpdir, clock):
+    archive = EntryArchive(str(tmpdir), block_entries=3)
+    await archive.start(context)
+    await fill(archive, clock, 10)
+    records = list(archive.scan())
+    assert [entry.id for _, _, entry in records] == [str(i) for i in range(10)]
+    assert records[1] == (1001.0, 'foo', records[1][2])
+    assert isinstance(records[1][2], RSSEntry)
+    assert records[1][2].author == 'author@example.org'
+
+    assert [entry.id for _, _, entry in archive.scan(timestamp(1004), timestamp(1007))] == \
+        ['4', '5', '6']
+    assert [entry.id for _, _, entry in archive.scan(timestamp(1004), feed_id='foo')] == \
+        ['5', '7', '9']
+
+
+@pytest.mark.asyncio
+async def test_reopen(tmpdir, clock):
+    ctx = Context()
+    archive = EntryArchive(str(tmpdir), block_entries=3)
+    await archive.start(ctx)
+    await fill(archive, clock, 5)
+    await ctx.close()
+
+    # Simulate a crash in the middle of writing a block
+    filename, = os.listdir(str(tmpdir))
+    with open(str(tmpdir.join(filename)), 'ab') as f:
+        f.write(b'\x10\x00\x00\x00garbage')
+
+    ctx = Context()
+    archive = EntryArchive(str(tmpdir), block_entries=3)
+    await archive.start(ctx)
+    clock[0] = 900  # the clock was turned back
+    await fill(archive, clock, 1)
+    assert [(archived, entry.id) for archived, _, entry in archive.scan()] == \
+        [(1000.0 + i, str(i)) for i in range(5)] + [(1004.0, '0')]
+    await ctx.close()
+    assert os.listdir(str(tmpdir)) == [filename]
+
+
+@pytest.mark.asyncio
+async def test_segments_retention(context, tmpdir, clock):
+    archive = EntryArchive(str(tmpdir), block_entries=2, segment_size=1, retention=5)
+    await archive.start(context)
+    await fill(archive, clock, 6)
+    archive.flush()
+    assert len(os.listdir(str(tmpdir))) == 3
+
+    assert archive.purge(now=1007) == 1
+    assert len(os.listdir(str(tmpdir))) == 2
+    assert [entry.id for _, _, entry in archive.scan()] == ['2', '3', '4', '5']
+
+    # The segment being written to is never deleted
+    assert archive.purge(now=2000) == 1
+    assert [entry.id for _, _, entry in archive.scan()] == ['4', '5']
+
+
+@pytest.mark.asyncio
+async def test_replay(context, tmpdir, clock):
+    archive = EntryArchive(str(tmpdir))
+    await archive.start(context)
+    await fill(archive, clock, 4)
+    events = []
+    archive.entry_replayed.connect(events.append)
+    assert await archive.replay(start=timestamp(1001), feed_id='foo') == 2
+    await asyncio.sleep(0)
+    assert [(event.feed_id, event.entry.id, event.archived) for event in events] == \
+        [('foo', '1', timestamp(1001)), ('foo', '3', timestamp(1003))]
+
+
+@pytest.mark.asyncio
+async def test_attach(context, tmpdir):
+    archive = EntryArchive(str(tmpdir))
+    await archive.start(context)
+    reader = RSSFeedReader(url='http://example.org/rss', interval=None)
+    archive.attach(reader)
+    await reader.process_document(b'<rss version="2.0"><channel><title>Feed</title>'
+                                  b'<item><guid>1</guid><title>Item</title></item>'
+                                  b'</channel></rss>')
+    await asyncio.sleep(0)
+    (_, feed_id, entry), = archive.scan()
+    assert feed_id == 'http://example.org/rss'
+    assert entry.title == 'Item'
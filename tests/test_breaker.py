@@ -0,0 +1,101 @@
+import pytest
+from aiohttp import ClientConnectionError
+
+from asphalt.feedreader.breaker import CircuitBreaker
+from asphalt.feedreader.readers.rss import RSSFeedReader
+
+
+class FailingFeedReader(RSSFeedReader):
+    fetch_count = 0
+    failing = True
+
+    async def fetch_document(self):
+        self.fetch_count += 1
+        if self.failing:
+            raise ClientConnectionError('connection refused')
+
+        return b'<rss version="2.0"><channel><title>Feed</title></channel></rss>'
+
+
+@pytest.fixture
+def breaker():
+    return CircuitBreaker(failure_threshold=2, reset_timeout=10, max_reset_timeout=15)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr('asphalt.feedreader.breaker.time.time', lambda: clock[0])
+    return clock
+
+
+def test_open_and_probe(breaker, clock):
+    assert not breaker.record_failure('example.org')
+    assert breaker.allow('example.org')
+    assert breaker.record_failure('example.org')
+    assert breaker.is_open('example.org')
+    assert not breaker.allow('example.org')
+    assert breaker.allow('example.com')
+
+    # Only one probe is let through after the reset timeout
+    clock[0] += 10
+    assert breaker.allow('example.org')
+    assert not breaker.allow('example.org')
+
+    # A failed probe doubles the reset timeout, up to the maximum
+    assert breaker.record_failure('example.org')
+    clock[0] += 10
+    assert not breaker.allow('example.org')
+    clock[0] += 5
+    assert breaker.allow('example.org')
+
+    breaker.record_success('example.org')
+    assert not breaker.is_open('example.org')
+    assert breaker.get_state('example.org') is None
+
+
+def test_lost_probe(breaker, clock):
+    breaker.record_failure('example.org')
+    breaker.record_failure('example.org')
+    clock[0] += 10
+    assert breaker.allow('example.org')
+    clock[0] += breaker.probe_timeout
+    assert breaker.allow('example.org')
+
+
+def test_restore(breaker, clock):
+    breaker.record_failure('example.org')
+    breaker.record_failure('example.org')
+    state = breaker.get_state('example.org')
+    assert state == {'failures': 2, 'open_until': 1010.0, 'timeout': 10}
+
+    breaker2 = CircuitBreaker()
+    breaker2.restore('example.org', state)
+    assert not breaker2.allow('example.org')
+    assert breaker2.get_state('example.org') == state
+
+
+@pytest.mark.asyncio
+async def test_reader(breaker, clock, memory_store):
+    feed = FailingFeedReader(url='http://example.org/feed1', store=memory_store,
+                             circuit_breaker=breaker)
+    feed2 = FailingFeedReader(url='http://example.org/feed2', circuit_breaker=breaker)
+    for _ in range(2):
+        with pytest.raises(ClientConnectionError):
+            await feed.update()
+
+    # The circuit is open, so neither reader on the same host fetches anything
+    await feed.update()
+    await feed2.update()
+    assert feed.fetch_count == 2
+    assert feed2.fetch_count == 0
+    assert memory_store.states['http://example.org/feed1']['circuit']['failures'] == 2
+
+    # The successful probe closes the circuit for all the readers on the host
+    clock[0] += 10
+    feed.failing = feed2.failing = False
+    await feed.update()
+    await feed2.update()
+    assert feed.fetch_count == 3
+    assert feed2.fetch_count == 1
+    assert 'circuit' not in memory_store.states['http://example.org/feed1']
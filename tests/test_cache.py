@@ -0,0 +1,86 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+from asphalt.feedreader.cache import EntryCache, estimate_entry_size
+from asphalt.feedreader.metadata import FeedEntry
+from asphalt.feedreader.readers.rss import RSSFeedReader
+
+
+def make_entry(entry_id, day):
+    return FeedEntry(entry_id, title='Entry ' + entry_id,
+                     published=datetime(2017, 1, day, tzinfo=timezone.utc))
+
+
+@pytest.fixture
+def cache():
+    cache = EntryCache()
+    cache.add('foo', make_entry('1', 1))
+    cache.add('bar', make_entry('2', 2))
+    cache.add('foo', make_entry('3', 3))
+    cache.add('bar', make_entry('4', 4))
+    return cache
+
+
+def ids(entries):
+    return [entry.id for entry in entries]
+
+
+def test_latest(cache):
+    assert ids(cache.latest()) == ['4', '3', '2', '1']
+    assert ids(cache.latest(limit=2)) == ['4', '3']
+    assert ids(cache.latest('foo')) == ['3', '1']
+    assert ids(cache.latest('baz')) == []
+
+
+def test_latest_since(cache):
+    since = datetime(2017, 1, 2, tzinfo=timezone.utc)
+    assert ids(cache.latest(since=since)) == ['4', '3', '2']
+    assert ids(cache.latest('foo', since=since)) == ['3']
+    assert ids(cache.latest(since=since, limit=1)) == ['4']
+
+
+def test_replace(cache):
+    cache.add('foo', make_entry('1', 5))
+    assert len(cache) == 4
+    assert ids(cache.latest(limit=1)) == ['1']
+
+
+def test_evict_max_entries(cache):
+    cache.max_entries = 4
+    cache.add('foo', make_entry('5', 5))
+    assert len(cache) == 4
+    assert cache.get('foo', '1') is None
+    assert ids(cache.latest('foo')) == ['5', '3']
+
+
+def test_evict_max_memory(cache):
+    cache.max_memory = cache.memory_usage
+    cache.add('foo', make_entry('5', 5))
+    assert cache.memory_usage <= cache.max_memory
+    assert cache.get('foo', '1') is None
+    assert cache.get('foo', '5') is not None
+
+
+def test_discard_feed(cache):
+    cache.discard_feed('foo')
+    assert ids(cache.latest()) == ['4', '2']
+    assert cache.memory_usage == sum(estimate_entry_size(entry) for entry in cache.latest())
+
+
+def test_clear(cache):
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.latest() == []
+    assert cache.memory_usage == 0
+
+
+@pytest.mark.asyncio
+async def test_reader_adds_entries():
+    cache = EntryCache()
+    reader = RSSFeedReader(url='http://example.org/rss', entry_cache=cache, interval=None)
+    await reader.process_document(b'<rss version="2.0"><channel><title>Feed</title>'
+                                  b'<item><guid>1</guid></item></channel></rss>')
+    await asyncio.sleep(0)
+    assert ids(cache.latest('http://example.org/rss')) == ['1']
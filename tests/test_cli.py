@@ -0,0 +1,168 @@
+import json
+
+import pytest
+from aiohttp import web
+from click.testing import CliRunner
+
+from asphalt.feedreader import cli
+from asphalt.feedreader.cli import FeedProbe, probe_feeds, build_feed_configs, make_feed_id
+from asphalt.feedreader.opml import Subscription, parse_opml
+
+OPML_DOCUMENT = """\
+<opml version="2.0">
+  <body>
+    <outline text="Example RSS" xmlUrl="http://example.org/rss"/>
+    <outline text="Example RSS" xmlUrl="http://example.org/rss2"/>
+    <outline xmlUrl="http://example.org/atom"/>
+    <outline text="Broken" xmlUrl="http://example.org/broken"/>
+  </body>
+</opml>
+"""
+
+
+def rss_handler(request):
+    return web.Response(body='<rss version="2.0"><channel></channel></rss>',
+                        content_type='application/rss+xml', headers={'ETag': '"abc"'})
+
+
+def atom_handler(request):
+    return web.Response(body='<feed xmlns="http://www.w3.org/2005/Atom"></feed>',
+                        content_type='application/atom+xml',
+                        headers={'Last-Modified': 'Sat, 02 Sep 2017 10:00:00 GMT'})
+
+
+def html_handler(request):
+    return web.Response(body='<html></html>', content_type='text/html')
+
+
+@pytest.fixture
+def base_url(event_loop, unused_tcp_port):
+    app = web.Application(loop=event_loop)
+    app.router.add_get('/rss', rss_handler)
+    app.router.add_get('/atom', atom_handler)
+    app.router.add_get('/html', html_handler)
+    handler = app.make_handler(loop=event_loop)
+    server = event_loop.run_until_complete(
+        event_loop.create_server(handler, host='127.0.0.1', port=unused_tcp_port))
+    yield 'http://127.0.0.1:%d' % unused_tcp_port
+    server.close()
+    event_loop.run_until_complete(server.wait_closed())
+    event_loop.run_until_complete(handler.shutdown())
+
+
+def make_probe(url, reader):
+    probe = FeedProbe(url)
+    probe.reader = reader
+    probe.error = None if reader else 'unable to detect the feed type'
+    probe.size = 100
+    probe.latency = 0.1
+    return probe
+
+
+@pytest.mark.asyncio
+async def test_probe_feeds(base_url):
+    urls = [base_url + path for path in ('/rss', '/atom', '/html', '/missing')]
+    rss, atom, html, missing = await probe_feeds(urls, concurrency=2, timeout=5)
+    assert rss.url == urls[0]
+    assert rss.ok
+    assert rss.reader == 'rss'
+    assert rss.status == 200
+    assert rss.size == 44
+    assert rss.latency > 0
+    assert rss.etag == '"abc"'
+    assert rss.last_modified is None
+
+    assert atom.reader == 'atom'
+    assert atom.content_type == 'application/atom+xml'
+    assert atom.last_modified == 'Sat, 02 Sep 2017 10:00:00 GMT'
+
+    assert not html.ok
+    assert html.error == 'unable to detect the feed type'
+
+    assert not missing.ok
+    assert missing.status == 404
+    assert missing.error == 'HTTP 404 Not Found'
+
+
+@pytest.mark.asyncio
+async def test_probe_connection_error(unused_tcp_port):
+    probe, = await probe_feeds(['http://127.0.0.1:%d/rss' % unused_tcp_port], timeout=5)
+    assert not probe.ok
+    assert probe.error
+
+
+@pytest.mark.parametrize('subscription, taken, expected', [
+    (Subscription('http://example.org/rss', 'Example: News!'), (), 'example_news'),
+    (Subscription('http://example.org/rss', 'Example'), ('example', 'example_2'), 'example_3'),
+    (Subscription('http://www.example.org/rss'), (), 'www_example_org')
+], ids=['title', 'taken', 'host'])
+def test_make_feed_id(subscription, taken, expected):
+    assert make_feed_id(subscription, taken) == expected
+
+
+def test_build_feed_configs():
+    subscriptions = parse_opml(OPML_DOCUMENT)
+    probes = [make_probe(subscription.url, reader)
+              for subscription, reader in zip(subscriptions, ['rss', 'rss', 'atom', None])]
+    assert build_feed_configs(subscriptions, probes) == {
+        'example_rss': {'url': 'http://example.org/rss', 'reader': 'rss'},
+        'example_rss_2': {'url': 'http://example.org/rss2', 'reader': 'rss'},
+        'example_org': {'url': 'http://example.org/atom', 'reader': 'atom'}
+    }
+
+
+@pytest.mark.parametrize('output_format', ['config', 'catalog'])
+def test_import(monkeypatch, tmpdir, output_format):
+    async def fake_probe_feeds(urls, concurrency, timeout):
+        assert concurrency == 5
+        return [make_probe(url, None if url.endswith('broken') else 'rss') for url in urls]
+
+    monkeypatch.setattr(cli, 'probe_feeds', fake_probe_feeds)
+    tmpdir.join('feeds.opml').write(OPML_DOCUMENT)
+    result = CliRunner().invoke(cli.main, ['import', str(tmpdir.join('feeds.opml')), '-c', '5',
+                                           '-f', output_format, '-o', str(tmpdir.join('out'))])
+    assert result.exit_code == 0, result.output
+    assert 'FAIL  http://example.org/broken (unable to detect the feed type)' in result.output
+    assert '3 of 4 feeds working' in result.output
+
+    if output_format == 'catalog':
+        catalog = json.loads(tmpdir.join('out').read())
+        assert catalog['version'] == 1
+        assert catalog['feeds']['example_org'] == {'url': 'http://example.org/atom',
+                                                   'reader': 'rss'}
+        assert len(catalog['feeds']) == 3
+    else:
+        assert 'feeds:\n  example_org:\n    reader: rss\n    url: http://example.org/atom\n' in \
+            tmpdir.join('out').read()
+
+
+def test_validate_failures(monkeypatch):
+    async def fake_probe_feeds(urls, concurrency, timeout):
+        return [make_probe(url, None) for url in urls]
+
+    monkeypatch.setattr(cli, 'probe_feeds', fake_probe_feeds)
+    result = CliRunner().invoke(cli.main, ['validate', 'http://example.org/broken'])
+    assert result.exit_code == 1
+    assert '0 of 1 feeds working' in result.output
+
+
+@pytest.mark.parametrize('config', [
+    'feeds:\n  foo:\n    url: http://example.org/rss\n',
+    '{"version": 1, "feeds": {"foo": {"url": "http://example.org/rss"}}}',
+    'component:\n  components:\n    feedreader:\n      feeds:\n'
+    '        foo:\n          url: http://example.org/rss\n'
+], ids=['feeds', 'catalog', 'application'])
+def test_export(tmpdir, config):
+    tmpdir.join('config.yml').write(config)
+    result = CliRunner().invoke(cli.main, ['export', str(tmpdir.join('config.yml')), '-o',
+                                           str(tmpdir.join('feeds.opml'))])
+    assert result.exit_code == 0, result.output
+    assert parse_opml(tmpdir.join('feeds.opml').read_binary()) == [
+        Subscription('http://example.org/rss', 'foo')]
+
+
+def test_export_no_feeds(tmpdir):
+    tmpdir.join('config.yml').write('component:\n  type: foo\n')
+    result = CliRunner().invoke(cli.main, ['export', str(tmpdir.join('config.yml'))])
+    assert result.exit_code == 2
+    assert 'no feed configurations found' in result.output
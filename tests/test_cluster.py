@@ -0,0 +1,87 @@
+import time
+
+import pytest
+from asphalt.core import Context
+
+from asphalt.feedreader.cluster import FeedCluster
+from asphalt.feedreader.readers.rss import RSSFeedReader
+
+
+@pytest.fixture
+def context(event_loop):
+    ctx = Context()
+    yield ctx
+    event_loop.run_until_complete(ctx.close())
+
+
+@pytest.fixture
+def clusters(event_loop, context, memory_store):
+    clusters = [FeedCluster(memory_store, node_id='node%d' % i) for i in range(3)]
+    for cluster in clusters:
+        event_loop.run_until_complete(cluster.start(context))
+
+    for cluster in clusters:
+        event_loop.run_until_complete(cluster.heartbeat())
+
+    return clusters
+
+
+def test_membership(clusters):
+    for cluster in clusters:
+        assert cluster.nodes == ['node0', 'node1', 'node2']
+
+
+def test_single_owner(clusters):
+    owners = {}
+    for i in range(100):
+        state_id = 'http://example.org/feed%d' % i
+        owning = [cluster.node_id for cluster in clusters if cluster.owns(state_id)]
+        assert len(owning) == 1
+        owners[state_id] = owning[0]
+
+    # The feeds should be spread across all the nodes
+    assert set(owners.values()) == {'node0', 'node1', 'node2'}
+
+
+@pytest.mark.asyncio
+async def test_leave_rebalances(clusters):
+    state_ids = ['http://example.org/feed%d' % i for i in range(100)]
+    before = {state_id: clusters[2].owns(state_id) for state_id in state_ids}
+    await clusters[0].leave()
+    await clusters[2].heartbeat()
+    assert clusters[2].nodes == ['node1', 'node2']
+
+    # Feeds owned by the remaining nodes must not move
+    assert all(clusters[2].owns(state_id) for state_id in state_ids if before[state_id])
+
+
+@pytest.mark.asyncio
+async def test_dead_node_expires(clusters, memory_store):
+    memory_store.states['feed_cluster']['nodes']['node1'] = time.time() - 1
+    await clusters[0].heartbeat()
+    assert clusters[0].nodes == ['node0', 'node2']
+
+
+@pytest.mark.asyncio
+async def test_acquire(clusters):
+    reader = RSSFeedReader(url='http://example.org/rss', interval=60)
+    owner = next(cluster for cluster in clusters if cluster.owns(reader.state_id))
+    other = next(cluster for cluster in clusters if cluster is not owner)
+    assert await owner.acquire(reader)
+    assert not await other.acquire(reader)
+
+    # Even if the other node thinks it owns the feed, the lease prevents it from polling
+    other.owns = lambda state_id: True
+    assert not await other.acquire(reader)
+
+
+@pytest.mark.asyncio
+async def test_reader_reloads_state_on_takeover(context, memory_store):
+    cluster = FeedCluster(memory_store, node_id='node0')
+    await cluster.start(context)
+    reader = RSSFeedReader(url='http://example.org/rss', store=memory_store, cluster=cluster,
+                           interval=None)
+    await reader.start(context)
+    memory_store.states[reader.state_id] = {'version': 1, 'seen_entry_ids': ['foo']}
+    assert await reader.acquire_lease()
+    assert reader._seen_entry_ids == {'foo'}
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from asphalt.feedreader.coalesce import RequestCoalescer
+from asphalt.feedreader.readers.rss import RSSFeedReader
+
+document = b"""\
+<rss version="2.0"><channel><title>Shared</title>
+<item><guid>1</guid><title>First</title></item>
+</channel></rss>
+"""
+
+
+class SlowFeedReader(RSSFeedReader):
+    fetch_count = parse_count = 0
+
+    async def fetch_document(self):
+        SlowFeedReader.fetch_count += 1
+        await asyncio.sleep(0.05)
+        return document
+
+    @classmethod
+    def parse_document(cls, document, **kwargs):
+        SlowFeedReader.parse_count += 1
+        return super().parse_document(document, **kwargs)
+
+
+@pytest.fixture
+def coalescer():
+    SlowFeedReader.fetch_count = SlowFeedReader.parse_count = 0
+    return RequestCoalescer(ttl=1)
+
+
+def make_reader(coalescer, state_id):
+    return SlowFeedReader(url='http://example.org/rss', state_id=state_id, coalescer=coalescer)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_updates(coalescer):
+    readers = [make_reader(coalescer, 'tenant%d' % i) for i in range(3)]
+    events = []
+    for reader in readers:
+        reader.entry_discovered.connect(events.append)
+
+    await asyncio.gather(*[reader.update() for reader in readers])
+    await asyncio.sleep(0)
+    assert SlowFeedReader.fetch_count == 1
+    assert SlowFeedReader.parse_count == 1
+
+    # Each reader still dispatches the entry based on its own state
+    assert len(events) == 3
+
+
+@pytest.mark.asyncio
+async def test_near_simultaneous_updates(coalescer):
+    await make_reader(coalescer, 'tenant1').update()
+    await make_reader(coalescer, 'tenant2').update()
+    assert SlowFeedReader.fetch_count == 1
+
+
+@pytest.mark.asyncio
+async def test_expiry(coalescer):
+    coalescer.ttl = 0.01
+    await make_reader(coalescer, 'tenant1').update()
+    await asyncio.sleep(0.05)
+    await make_reader(coalescer, 'tenant2').update()
+    assert SlowFeedReader.fetch_count == 2
+    assert SlowFeedReader.parse_count == 2
+
+
+@pytest.mark.asyncio
+async def test_different_headers(coalescer):
+    reader1 = make_reader(coalescer, 'tenant1')
+    reader2 = make_reader(coalescer, 'tenant2')
+    reader2.http_headers['Authorization'] = 'Bearer xyz'
+    await asyncio.gather(reader1.update(), reader2.update())
+    assert SlowFeedReader.fetch_count == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_download_not_cached(coalescer):
+    async def fail():
+        raise RuntimeError('boom')
+
+    with pytest.raises(RuntimeError):
+        await coalescer.fetch('http://example.org/rss', {}, fail)
+
+    async def succeed():
+        return b'foo'
+
+    assert await coalescer.fetch('http://example.org/rss', {}, succeed) == b'foo'
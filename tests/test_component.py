@@ -6,6 +6,7 @@ import pytest
 from asphalt.feedreader import FeedReader, FeedReaderComponent, create_feed
 from asphalt.feedreader.readers.atom import AtomFeedReader
 from asphalt.feedreader.readers.rss import RSSFeedReader
+from asphalt.feedreader.registry import FeedRegistry
 
 
 def rss_handler(request):
@@ -79,3 +80,13 @@ async def test_default_config(context):
     resource = await context.request_resource(FeedReader)
     assert isinstance(resource, RSSFeedReader)
     assert context.feed is resource
+
+
+@pytest.mark.asyncio
+async def test_registry_only_config(context):
+    component = FeedReaderComponent(registry={'reader': 'rss', 'interval': None})
+    await component.start(context)
+
+    registry = context.require_resource(FeedRegistry)
+    assert len(registry) == 0
+    assert context.get_resource(FeedReader) is None
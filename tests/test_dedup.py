@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+from asphalt.core import Context
+
+from asphalt.feedreader import FeedEntry
+from asphalt.feedreader.dedup import (
+    DuplicateIndex, BloomFilter, canonicalize_url, entry_fingerprint)
+
+
+@pytest.fixture
+def context(event_loop):
+    ctx = Context()
+    yield ctx
+    event_loop.run_until_complete(ctx.close())
+
+
+@pytest.mark.parametrize('url, expected', [
+    ('HTTP://WWW.Example.org/story/1/', 'http://example.org/story/1'),
+    ('https://example.org/story?b=2&a=1#comments', 'https://example.org/story?a=1&b=2'),
+    ('https://example.org/story?id=5&utm_source=rss&fbclid=xyz', 'https://example.org/story?id=5')
+], ids=['case_slash', 'query_fragment', 'tracking'])
+def test_canonicalize_url(url, expected):
+    assert canonicalize_url(url) == expected
+
+
+def test_fingerprint_link():
+    entry1 = FeedEntry('1', link='http://www.example.org/story?utm_medium=feed')
+    entry2 = FeedEntry('2', link='http://example.org/story/')
+    assert entry_fingerprint(entry1) == entry_fingerprint(entry2)
+
+
+def test_fingerprint_text():
+    entry1 = FeedEntry('1', title='Big  News', summary='Something\nhappened')
+    entry2 = FeedEntry('2', title='big news', summary='something happened ')
+    assert entry_fingerprint(entry1) == entry_fingerprint(entry2)
+    assert entry_fingerprint(FeedEntry('3')) is None
+
+
+def test_bloom_filter():
+    bloom = BloomFilter(100, 0.01)
+    bloom.add(b'foo')
+    assert b'foo' in bloom
+    assert b'bar' not in bloom
+
+
+def test_check():
+    index = DuplicateIndex(capacity=100, lru_size=2)
+    assert not index.check(FeedEntry('a', link='http://example.org/1'))
+    assert index.check(FeedEntry('b', link='http://example.org/1'))
+    assert not index.check(FeedEntry('c', link='http://example.org/2'))
+    assert not index.check(FeedEntry('d', link='http://example.org/3'))
+
+    # Evicted from the LRU cache but still present in the Bloom filter
+    assert index.check(FeedEntry('e', link='http://example.org/1'))
+    assert not index.check(FeedEntry('f'))
+    assert not index.check(FeedEntry('f'))
+
+
+def test_rotation():
+    index = DuplicateIndex(capacity=200, lru_size=1)
+    false_positives = sum(index.check(FeedEntry(str(i), link='http://example.org/%d' % i))
+                          for i in range(2000))
+    assert false_positives < 15
+
+    # Only the two most recent generations are kept, so old stories are eventually forgotten
+    # while the false positive rate stays bounded
+    assert index._bloom_count <= 200
+    assert index.check(FeedEntry('a', link='http://example.org/1700'))
+    assert not index.check(FeedEntry('b', link='http://example.org/0'))
+    false_positives = sum(index.check(FeedEntry(str(i), link='http://example.org/new/%d' % i))
+                          for i in range(1000))
+    assert false_positives < 10
+
+
+@pytest.mark.asyncio
+async def test_save_throttling(memory_store):
+    context = Context()
+    index = DuplicateIndex(capacity=100, store=memory_store, save_interval=0.1)
+    await index.start(context)
+    index.check(FeedEntry('a', link='http://example.org/1'))
+    await index.save()
+    assert len(memory_store.states['duplicate_index']['recent']) == 1
+
+    # The second save is postponed until the interval has elapsed
+    index.check(FeedEntry('b', link='http://example.org/2'))
+    await index.save()
+    assert len(memory_store.states['duplicate_index']['recent']) == 1
+    await asyncio.sleep(0.2)
+    assert len(memory_store.states['duplicate_index']['recent']) == 2
+
+    # Pending changes are saved when the context is closed
+    index.check(FeedEntry('c', link='http://example.org/3'))
+    await index.save()
+    await context.close()
+    assert len(memory_store.states['duplicate_index']['recent']) == 3
+
+
+@pytest.mark.asyncio
+async def test_persistence(context, memory_store):
+    index = DuplicateIndex(capacity=100, store=memory_store)
+    await index.start(context)
+    index.check(FeedEntry('a', link='http://example.org/1'))
+    await index.save()
+    assert 'duplicate_index' in memory_store.states
+
+    index2 = DuplicateIndex(capacity=100, store=memory_store)
+    await index2.start(context)
+    assert index2.check(FeedEntry('b', link='http://example.org/1'))
+    assert not index2.check(FeedEntry('c', link='http://example.org/2'))
+
+
+@pytest.mark.asyncio
+async def test_persistence_size_changed(context, memory_store):
+    index = DuplicateIndex(capacity=100, lru_size=1, store=memory_store)
+    index.check(FeedEntry('a', link='http://example.org/1'))
+    index.check(FeedEntry('b', link='http://example.org/2'))
+    await index.save()
+
+    index2 = DuplicateIndex(capacity=1000, store=memory_store)
+    await index2.start(context)
+    assert index2.check(FeedEntry('c', link='http://example.org/2'))
+    assert not index2.check(FeedEntry('d', link='http://example.org/1'))
@@ -0,0 +1,71 @@
+import time
+
+import pytest
+
+from asphalt.core import Context
+from asphalt.feedreader.api import FeedStateStore
+from asphalt.feedreader.gc import StateCollector
+
+
+@pytest.fixture
+def context(event_loop):
+    ctx = Context()
+    yield ctx
+    event_loop.run_until_complete(ctx.close())
+
+
+@pytest.mark.asyncio
+async def test_collect(context, memory_store):
+    for state_id in ('feed1', 'feed2', 'feed3', 'lease:feed:feed1'):
+        await memory_store.store_state(state_id, {})
+
+    memory_store.touched['feed3'] = None
+    collector = StateCollector(memory_store, max_age=60, interval=None)
+    await collector.start(context)
+    collector.protect('feed1', 'feed2')
+    collector.unprotect('feed2')
+    now = time.time()
+    assert await collector.collect(now) == 0
+    assert set(memory_store.states) == {'feed1', 'feed2', 'feed3', 'lease:feed:feed1'}
+
+    # The state with an unknown storage time is timed from the first run that saw it
+    assert await collector.collect(now + 30) == 0
+    assert await collector.collect(now + 61) == 2
+    assert set(memory_store.states) == {'feed1', 'lease:feed:feed1'}
+
+
+@pytest.mark.asyncio
+async def test_unknown_touched_time(context, memory_store):
+    await memory_store.store_state('feed1', {})
+    memory_store.touched['feed1'] = None
+    collector = StateCollector(memory_store, max_age=60, interval=None)
+    await collector.start(context)
+    assert await collector.collect(time.time() + 1000) == 0
+    assert await collector.collect(time.time() + 1061) == 1
+
+
+@pytest.mark.asyncio
+async def test_unsupported_store(context):
+    class LimitedStore(FeedStateStore):
+        async def start(self, ctx):
+            pass
+
+        async def load_state(self, state_id):
+            pass
+
+        async def store_state(self, state_id, state):
+            pass
+
+    collector = StateCollector(LimitedStore(), interval=None)
+    with pytest.raises(TypeError) as exc:
+        await collector.start(context)
+
+    exc.match('LimitedStore does not implement list_states\\(\\)')
+
+
+@pytest.mark.asyncio
+async def test_resource_store(context, memory_store):
+    context.add_resource(memory_store, types=[type(memory_store).__mro__[1]])
+    collector = StateCollector(interval=None)
+    await collector.start(context)
+    assert collector.store is memory_store
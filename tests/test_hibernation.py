@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from asphalt.feedreader.hibernation import WorkingSet
+from asphalt.feedreader.readers.rss import RSSFeedReader
+
+document = b"""\
+<rss version="2.0"><channel><title>Feed</title>
+<item><guid>1</guid><title>First</title></item>
+</channel></rss>
+"""
+
+
+@pytest.fixture
+def working_set():
+    return WorkingSet(max_size=2, hibernate_interval=60)
+
+
+def make_reader(url, memory_store, working_set):
+    return RSSFeedReader(url=url, store=memory_store, working_set=working_set, interval=None)
+
+
+@pytest.mark.asyncio
+async def test_hibernate_and_wake(memory_store, working_set):
+    reader = make_reader('http://example.org/rss', memory_store, working_set)
+    events = []
+    reader.entry_discovered.connect(events.append)
+    await reader.process_document(document)
+    assert reader in working_set
+
+    assert reader.hibernate()
+    assert reader.hibernating
+    assert reader._seen_entry_ids == set()
+    assert reader not in working_set
+
+    # The state is reloaded before processing, so the entry is not dispatched again
+    await reader.process_document(document.replace(b'</channel>', b'<!-- --></channel>'))
+    assert not reader.hibernating
+    assert reader._seen_entry_ids == {'1'}
+    await asyncio.sleep(0)
+    assert len(events) == 1
+
+
+def test_hibernate_without_store(working_set):
+    reader = RSSFeedReader(url='http://example.org/rss', working_set=working_set, interval=None)
+    assert not reader.hibernate()
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction(memory_store, working_set):
+    readers = [make_reader('http://example.org/rss%d' % i, memory_store, working_set)
+               for i in range(3)]
+    for reader in readers:
+        await reader.process_document(document)
+
+    assert len(working_set) == 2
+    assert [reader.hibernating for reader in readers] == [True, False, False]
+
+    await readers[0].wake()
+    assert [reader.hibernating for reader in readers] == [False, True, False]
+
+
+def test_busy_reader_not_evicted(memory_store, working_set):
+    reader = make_reader('http://example.org/rss', memory_store, working_set)
+    reader._busy = 1
+    assert not reader.hibernate()
@@ -0,0 +1,100 @@
+import pickle
+
+import pytest
+
+from asphalt.feedreader.metadata import FeedEntry, FeedMetadata
+from asphalt.feedreader.readers.atom import AtomEntry, Person
+from asphalt.feedreader.readers.rss import RSSEntry, RSSFeedReader
+
+
+def test_lazy_entry():
+    calls = []
+
+    def loader():
+        calls.append(None)
+        return {'title': 'Foo', 'categories': ['a', 'b'], 'author': 'foo@example.org'}
+
+    entry = RSSEntry.lazy('1', loader)
+    assert entry.id == '1'
+    assert not calls
+
+    assert entry.title == 'Foo'
+    assert entry.categories == ('a', 'b')
+    assert entry.author == 'foo@example.org'
+    assert entry.summary is None
+    assert len(calls) == 1
+
+
+def test_lazy_entry_no_type_checks():
+    entry = AtomEntry.lazy('1', lambda: {'title': 1, 'authors': [Person('Foo')]})
+    entry.load()
+    assert entry.title == 1
+    assert entry.authors == (Person('Foo'),)
+    assert entry.contributors == ()
+    assert entry.extensions == {}
+
+
+def test_lazy_entry_load_error():
+    def loader():
+        raise ValueError('bad date')
+
+    entry = FeedEntry.lazy('1', loader)
+    pytest.raises(ValueError, entry.load)
+    pytest.raises(ValueError, getattr, entry, 'title')
+    FeedEntry('2').load()
+
+
+def test_lazy_entry_nonexistent_attribute():
+    entry = FeedEntry.lazy('1', dict)
+    pytest.raises(AttributeError, getattr, entry, 'foo')
+    pytest.raises(AttributeError, getattr, FeedEntry('2'), 'foo')
+
+
+def test_pickle_lazy_entry():
+    entry = RSSEntry.lazy('1', lambda: {'title': 'Foo', 'comments': 'http://example.org/c'})
+    entry = pickle.loads(pickle.dumps(entry))
+    assert entry.id == '1'
+    assert entry.title == 'Foo'
+    assert entry.comments == 'http://example.org/c'
+
+
+def test_parse_document_defers_decoding(monkeypatch):
+    document = """\
+<rss version="2.0"><channel><title>Feed</title>
+<item><guid>1</guid><pubDate>Sun, 19 May 2002 15:21:36 GMT</pubDate></item>
+<item><guid>2</guid><pubDate>Mon, 20 May 2002 15:21:36 GMT</pubDate></item>
+</channel></rss>"""
+    parsed_items = []
+    original = RSSFeedReader.parse_item
+    monkeypatch.setattr(RSSFeedReader, 'parse_item',
+                        staticmethod(lambda item: parsed_items.append(item) or original(item)))
+    metadata, entries = RSSFeedReader.parse_document(document)
+    assert [entry.id for entry in entries] == ['2', '1']
+    assert not parsed_items
+
+    assert entries[0].published.day == 20
+    assert len(parsed_items) == 1
+
+
+@pytest.mark.parametrize('period, frequency, interval', [
+    ('hourly', None, 3600),
+    ('daily', '4', 21600),
+    ('daily', 'x', 86400),
+    ('fortnightly', '1', None)
+], ids=['hourly', 'daily_4', 'invalid_frequency', 'invalid_period'])
+def test_update_interval(period, frequency, interval):
+    metadata = FeedMetadata()
+    metadata.extensions = {'sy:updatePeriod': period}
+    if frequency is not None:
+        metadata.extensions['sy:updateFrequency'] = frequency
+
+    assert metadata.update_interval == interval
+    assert FeedMetadata().update_interval is None
+
+
+def test_metadata_extensions_state():
+    metadata = FeedMetadata()
+    metadata.extensions = {'itunes:author': 'Jane Doe'}
+    restored = FeedMetadata()
+    restored.__setstate__(metadata.__getstate__())
+    assert restored.extensions == {'itunes:author': 'Jane Doe'}
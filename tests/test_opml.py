@@ -0,0 +1,42 @@
+import pytest
+
+from asphalt.feedreader.opml import Subscription, parse_opml, generate_opml
+
+OPML_DOCUMENT = b"""\
+<?xml version="1.0" encoding="UTF-8"?>
+<opml version="1.0">
+  <head><title>Subscriptions</title></head>
+  <body>
+    <outline text="Example" xmlUrl="http://example.org/rss" htmlUrl="http://example.org/"/>
+    <outline text="News">
+      <outline title="World" text="ignored">
+        <outline text="CNN" type="rss" xmlUrl=" http://rss.cnn.com/rss/edition.rss "/>
+      </outline>
+      <outline text="Duplicate" xmlUrl="http://example.org/rss"/>
+      <outline xmlUrl="http://example.org/atom"/>
+    </outline>
+  </body>
+</opml>
+"""
+
+
+def test_parse_opml():
+    assert parse_opml(OPML_DOCUMENT) == [
+        Subscription('http://example.org/rss', 'Example', 'http://example.org/'),
+        Subscription('http://rss.cnn.com/rss/edition.rss', 'CNN', categories=['News', 'World']),
+        Subscription('http://example.org/atom', categories=['News'])
+    ]
+
+
+@pytest.mark.parametrize('document', [b'<opml', b'<rss version="2.0"><channel/></rss>'],
+                         ids=['malformed', 'not_opml'])
+def test_parse_invalid(document):
+    pytest.raises(ValueError, parse_opml, document).match('invalid OPML document')
+
+
+def test_generate_roundtrip():
+    subscriptions = parse_opml(OPML_DOCUMENT)
+    document = generate_opml(subscriptions, 'My feeds')
+    assert document.startswith(b'<?xml version="1.0" encoding="UTF-8"?>\n<opml version="2.0">')
+    assert b'<title>My feeds</title>' in document
+    assert parse_opml(document) == subscriptions
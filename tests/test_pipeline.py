@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+
+from asphalt.core import Context
+from asphalt.feedreader.metadata import FeedEntry
+from asphalt.feedreader.pipeline import (
+    EntryPipeline, resolve_urls, normalize_whitespace, sanitize_html, strip_html)
+from asphalt.feedreader.readers.atom import AtomEntry
+from asphalt.feedreader.readers.base import BaseFeedReader
+from asphalt.feedreader.readers.rss import RSSEntry
+
+
+class DummyFeedReader(BaseFeedReader):
+    async def fetch_document(self):
+        return b'dummy'
+
+    def parse_document(self, document):
+        return {}, [FeedEntry('1', title='foo'), FeedEntry('2', title='bar')]
+
+
+@pytest.fixture
+def context(event_loop):
+    ctx = Context()
+    yield ctx
+    event_loop.run_until_complete(ctx.close())
+
+
+def test_resolve_urls():
+    entry = FeedEntry('1', link='/posts/1', enclosure_url=' audio.mp3 ')
+    resolve_urls(entry, 'http://example.org/blog/feed.xml')
+    assert entry.link == 'http://example.org/posts/1'
+    assert entry.enclosure_url == 'http://example.org/blog/audio.mp3'
+
+
+def test_normalize_whitespace():
+    entry = FeedEntry('1', title='  Foo\n   bar ', summary='\n summary \n',
+                      categories=[' a ', 'b', '', 'a', 'long\n  name'])
+    normalize_whitespace(entry, 'http://example.org/')
+    assert entry.title == 'Foo bar'
+    assert entry.summary == 'summary'
+    assert entry.categories == ('a', 'b', 'long name')
+
+
+def test_sanitize_html():
+    entry = AtomEntry(
+        id='1', summary='Plain text & <b onclick="evil()">bold</b><script>alert(1)</script>',
+        content='<p style="x">See <a href="/more">more</a> <a href="javascript:evil()">here</a>'
+                '<img src="a.png"/></p><iframe src="http://evil"><p>x</p></iframe>&amp; done',
+        content_type='html')
+    sanitize_html(entry, 'http://example.org/feed')
+    assert entry.summary == 'Plain text &amp; <b>bold</b>'
+    assert entry.content == ('<p>See <a href="http://example.org/more">more</a> <a>here</a>'
+                             '<img src="http://example.org/a.png"/></p>&amp; done')
+
+
+@pytest.mark.parametrize('html, expected', [
+    ('<a href="java&#9;script:alert(1)">x</a>', '<a>x</a>'),
+    ('<a href=" JAVA\nSCRIPT:alert(1)">x</a>', '<a>x</a>'),
+    ('<svg><a xlink:href="javascript:alert(1)">x</a></svg>', '<svg><a>x</a></svg>'),
+    ('<img src="data:text/html;base64,PHNjcmlwdD4="/>', '<img/>'),
+    ('<a href="mailto:foo@example.org">x</a>', '<a href="mailto:foo@example.org">x</a>'),
+    ('<svg><use xlink:href="#icon"/></svg>',
+     '<svg><use xlink:href="http://example.org/feed#icon"/></svg>')
+], ids=['tab', 'newline', 'xlink', 'data', 'mailto', 'xlink_relative'])
+def test_sanitize_urls(html, expected):
+    entry = AtomEntry(id='1', content=html, content_type='html')
+    sanitize_html(entry, 'http://example.org/feed')
+    assert entry.content == expected
+
+
+def test_sanitize_plain_text():
+    entry = AtomEntry(id='1', summary='1 < 2 & 3 > 2', content='<b>not html</b>',
+                      content_type='text')
+    sanitize_html(entry, 'http://example.org/feed')
+    assert entry.summary == '1 < 2 & 3 > 2'
+    assert entry.content == '<b>not html</b>'
+
+
+def test_strip_html():
+    entry = RSSEntry(id='1', summary='<p>First &amp; <i>second</i></p><p>third</p>',
+                     content='<style>p {}</style><div>Full\n text</div>', content_type='html')
+    strip_html(entry, 'http://example.org/feed')
+    assert entry.summary == 'First & second third'
+    assert entry.content == 'Full text'
+    assert entry.content_type == 'text'
+
+
+@pytest.mark.asyncio
+async def test_process(context):
+    def fail(entry, base_url):
+        raise Exception('foo')
+
+    pipeline = EntryPipeline(['resolve_urls', fail, 'asphalt.feedreader.pipeline:strip_html'],
+                             batch_size=2)
+    await pipeline.start(context)
+    entries = [FeedEntry(str(i), link='/%d' % i, summary='<b>%d</b>' % i) for i in range(5)]
+    processed = await pipeline.process(entries, 'http://example.org/')
+    assert [entry.link for entry in processed] == ['http://example.org/%d' % i for i in range(5)]
+    assert [entry.summary for entry in processed] == [str(i) for i in range(5)]
+
+    # The original entries must be left intact
+    assert entries[0].link == '/0'
+
+
+@pytest.mark.asyncio
+async def test_reader_pipeline(context):
+    def uppercase_title(entry, base_url):
+        entry.title = entry.title.upper()
+
+    pipeline = EntryPipeline([uppercase_title])
+    await pipeline.start(context)
+    feed = DummyFeedReader('http://localhost/blah', pipeline=pipeline, interval=None)
+    events = []
+    feed.entry_discovered.connect(events.append)
+    await feed.update()
+    await asyncio.sleep(0)
+    assert [event.entry.title for event in events] == ['FOO', 'BAR']
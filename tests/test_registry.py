@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+from asphalt.core import Context
+
+from asphalt.feedreader.readers.atom import AtomFeedReader
+from asphalt.feedreader.readers.rss import RSSFeedReader
+from asphalt.feedreader.registry import FeedRegistry
+
+
+@pytest.fixture
+def context(event_loop):
+    ctx = Context()
+    yield ctx
+    event_loop.run_until_complete(ctx.close())
+
+
+@pytest.fixture
+def registry(event_loop, context, memory_store):
+    registry = FeedRegistry(memory_store, reader='rss', interval=None)
+    event_loop.run_until_complete(registry.start(context))
+    return registry
+
+
+@pytest.mark.asyncio
+async def test_add_remove(registry):
+    events = []
+    registry.feed_added.connect(events.append)
+    registry.feed_removed.connect(events.append)
+    reader = await registry.add_feed('foo', url='http://example.org/rss')
+    assert isinstance(reader, RSSFeedReader)
+    assert reader.state_id == 'foo'
+    assert reader.session is registry.session
+    assert 'foo' in registry
+    assert registry.get('foo') is reader
+    assert registry.find_by_url('http://example.org/rss') == {'foo'}
+
+    await registry.remove_feed('foo')
+    await asyncio.sleep(0)
+    assert 'foo' not in registry
+    assert registry.find_by_url('http://example.org/rss') == set()
+    assert [(event.topic, event.feed_id, event.reader) for event in events] == [
+        ('feed_added', 'foo', reader), ('feed_removed', 'foo', reader)]
+
+
+@pytest.mark.asyncio
+async def test_add_duplicate(registry):
+    await registry.add_feed('foo', url='http://example.org/rss')
+    with pytest.raises(KeyError):
+        await registry.add_feed('foo', url='http://example.org/rss2')
+
+
+@pytest.mark.asyncio
+async def test_remove_nonexistent(registry):
+    with pytest.raises(KeyError):
+        await registry.remove_feed('foo')
+
+
+@pytest.mark.asyncio
+async def test_update(registry):
+    await registry.add_feed('foo', url='http://example.org/feed')
+    reader = await registry.update_feed('foo', reader='atom')
+    assert isinstance(reader, AtomFeedReader)
+    assert reader.url == 'http://example.org/feed'
+    assert registry.get('foo') is reader
+    assert registry.get_config('foo') == {'url': 'http://example.org/feed', 'reader': 'atom'}
+
+
+@pytest.mark.asyncio
+async def test_update_failure(registry):
+    old_reader = await registry.add_feed('foo', url='http://example.org/feed')
+    with pytest.raises(LookupError):
+        await registry.update_feed('foo', reader='nonexistent')
+
+    reader = registry.get('foo')
+    assert reader is not old_reader
+    assert reader.url == 'http://example.org/feed'
+    assert registry.get_config('foo') == {'url': 'http://example.org/feed'}
+    assert registry.find_by_url('http://example.org/feed') == {'foo'}
+
+
+@pytest.mark.asyncio
+async def test_moved_feed(registry):
+    reader = await registry.add_feed('foo', url='http://example.org/rss')
+    reader._move('http://example.org/moved')  # as after a permanent redirect
+    await asyncio.sleep(0)
+    assert registry.find_by_url('http://example.org/moved') == {'foo'}
+    assert registry.find_by_url('http://example.org/rss') == set()
+
+    await registry.remove_feed('foo')
+    reader._move('http://example.org/moved2')
+    await asyncio.sleep(0)
+    assert 'foo' not in registry
+    assert registry.find_by_url('http://example.org/moved') == set()
+    assert registry.find_by_url('http://example.org/moved2') == set()
+
+
+@pytest.mark.asyncio
+async def test_catalog(context, registry, memory_store):
+    await registry.add_feed('foo', url='http://example.org/rss')
+    await registry.add_feed('bar', url='http://example.org/rss2')
+    await registry.remove_feed('foo')
+    await asyncio.sleep(0.01)
+    assert memory_store.states['feed_catalog'] == {
+        'version': 1, 'feeds': {'bar': {'url': 'http://example.org/rss2'}}}
+
+    registry2 = FeedRegistry(memory_store, reader='rss', interval=None)
+    await registry2.start(context)
+    assert list(registry2) == ['bar']
+    assert registry2.get('bar').url == 'http://example.org/rss2'
+
+
+@pytest.mark.asyncio
+async def test_catalog_file(context, memory_store, tmpdir):
+    path = tmpdir.join('catalog.json')
+    path.write('{"version": 1, "feeds": {"foo": {"url": "http://example.org/atom", '
+               '"reader": "atom"}}}')
+    registry = FeedRegistry(memory_store, catalog_file=str(path), interval=None)
+    await registry.start(context)
+    assert isinstance(registry.get('foo'), AtomFeedReader)
+    await asyncio.sleep(0.01)
+    assert memory_store.states['feed_catalog'] == {
+        'version': 1, 'feeds': {'foo': {'url': 'http://example.org/atom', 'reader': 'atom'}}}
+
+    # The catalog in the store takes precedence over the file from now on
+    path.write('{"version": 1, "feeds": {}}')
+    registry2 = FeedRegistry(memory_store, catalog_file=str(path), interval=None)
+    await registry2.start(context)
+    assert list(registry2) == ['foo']
@@ -0,0 +1,80 @@
+import asyncio
+import socket
+
+import pytest
+
+from asphalt.feedreader.resolver import CachingResolver
+
+
+@pytest.fixture
+def queries(event_loop, monkeypatch):
+    queries = []
+
+    async def getaddrinfo(host, port, *, family=0, type=0, proto=0, flags=0):
+        queries.append(host)
+        await asyncio.sleep(0.01)
+        if host == 'nonexistent.invalid':
+            raise socket.gaierror(-2, 'Name or service not known')
+
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, '', ('10.0.0.%d' % len(queries), port))]
+
+    monkeypatch.setattr(event_loop, 'getaddrinfo', getaddrinfo)
+    monkeypatch.setattr('asphalt.feedreader.resolver.aiodns', None)
+    return queries
+
+
+@pytest.mark.asyncio
+async def test_cache(queries):
+    resolver = CachingResolver()
+    addresses = await resolver.resolve('example.org', 80)
+    assert addresses == [{'hostname': 'example.org', 'host': '10.0.0.1', 'port': 80,
+                          'family': socket.AF_INET, 'proto': 6,
+                          'flags': socket.AI_NUMERICHOST}]
+    addresses = await resolver.resolve('example.org', 443)
+    assert addresses[0]['host'] == '10.0.0.1'
+    assert addresses[0]['port'] == 443
+    assert queries == ['example.org']
+    assert resolver.lookups == 2
+    assert resolver.hits == 1
+    assert resolver.resolve_time > 0
+
+
+@pytest.mark.asyncio
+async def test_expiry(queries):
+    resolver = CachingResolver(ttl=0, min_ttl=0)
+    await resolver.resolve('example.org')
+    await resolver.resolve('example.org')
+    assert queries == ['example.org', 'example.org']
+    assert resolver.hits == 0
+
+
+@pytest.mark.asyncio
+async def test_negative_cache(queries):
+    resolver = CachingResolver()
+    for _ in range(2):
+        with pytest.raises(OSError):
+            await resolver.resolve('nonexistent.invalid')
+
+    assert queries == ['nonexistent.invalid']
+    assert resolver.failures == 1
+    assert not await resolver.prefetch('nonexistent.invalid')
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups(queries):
+    resolver = CachingResolver()
+    results = await asyncio.gather(*[resolver.resolve('example.org') for _ in range(3)])
+    assert queries == ['example.org']
+    assert results[0] == results[1] == results[2]
+
+
+@pytest.mark.asyncio
+async def test_max_entries(queries):
+    resolver = CachingResolver(max_entries=2)
+    for host in ('a.example.org', 'b.example.org', 'c.example.org', 'a.example.org'):
+        assert await resolver.prefetch(host)
+
+    assert queries == ['a.example.org', 'b.example.org', 'c.example.org', 'a.example.org']
+    resolver.clear()
+    await resolver.resolve('c.example.org')
+    assert len(queries) == 5
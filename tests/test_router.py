@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from asphalt.feedreader.metadata import FeedEntry
+from asphalt.feedreader.readers.rss import RSSFeedReader
+from asphalt.feedreader.router import EntryRouter
+
+
+@pytest.fixture
+def router():
+    return EntryRouter()
+
+
+@pytest.fixture
+def entry():
+    return FeedEntry('1', title='Python 3.6 released', summary='The new version brings f-strings',
+                     categories=['Programming', 'News'], enclosure_type='audio/mpeg')
+
+
+@pytest.mark.parametrize('filters, matches', [
+    ({}, True),
+    ({'feeds': ['foo']}, True),
+    ({'feeds': ['bar']}, False),
+    ({'categories': ['programming']}, True),
+    ({'categories': ['Sports', 'News']}, True),
+    ({'categories': ['Sports']}, False),
+    ({'keywords': ['PYTHON']}, True),
+    ({'keywords': ['java', 'strings']}, True),
+    ({'keywords': ['java']}, False),
+    ({'keywords': ['python', 'released']}, True),
+    ({'patterns': [r'\d\.\d']}, True),
+    ({'patterns': [r'^Java']}, False),
+    ({'enclosure_types': ['audio/mpeg']}, True),
+    ({'enclosure_types': ['video/mp4']}, False),
+    ({'feeds': ['foo'], 'categories': ['news'], 'keywords': ['python']}, True),
+    ({'feeds': ['foo'], 'categories': ['news'], 'keywords': ['java']}, False),
+    ({'feeds': ['foo'], 'categories': ['news', 'programming'], 'patterns': ['^Python']}, True),
+    ({'feeds': ['bar'], 'categories': ['news', 'programming'], 'patterns': ['^Python']}, False)
+])
+def test_match(router, entry, filters, matches):
+    subscription = router.subscribe(lambda event: None, **filters)
+    assert (subscription in router.match('foo', entry)) is matches
+
+
+@pytest.mark.parametrize('keyword', ['new version', 'f-strings', ''])
+def test_subscribe_phrase_keyword(router, keyword):
+    exc = pytest.raises(ValueError, router.subscribe, lambda event: None, keywords=[keyword])
+    exc.match('keywords must be single words')
+    assert len(router) == 0
+
+
+def test_unsubscribe(router, entry):
+    subscription = router.subscribe(lambda event: None, categories=['news'])
+    subscription.unsubscribe()
+    subscription.unsubscribe()
+    assert len(router) == 0
+    assert router.match('foo', entry) == set()
+    assert not router._categories.postings
+    assert not router._unconstrained
+
+
+@pytest.mark.asyncio
+async def test_route(router):
+    reader = RSSFeedReader(url='http://example.org/rss', interval=None)
+    router.attach(reader)
+    python_events = []
+    sports_events = []
+    router.subscribe(python_events.append, keywords=['python'])
+    router.subscribe(sports_events.append, categories=['sports'])
+    await reader.process_document(b'<rss version="2.0"><channel><title>Feed</title>'
+                                  b'<item><guid>1</guid><title>Python news</title></item>'
+                                  b'<item><guid>2</guid><title>Other news</title></item>'
+                                  b'</channel></rss>')
+    await asyncio.sleep(0)
+    assert [event.entry.id for event in python_events] == ['1']
+    assert sports_events == []
+
+    router.detach(reader)
+    assert not reader.entry_discovered.listeners
@@ -1,4 +1,7 @@
+import asyncio
 import os
+import time
+from uuid import uuid4
 
 import pytest
 from aioredis import create_reconnecting_redis
@@ -36,7 +39,7 @@ def serializer(context, direct_resources):
         return serializer
 
 
-@pytest.fixture(params=['sqlalchemy', 'redis', 'mongodb'])
+@pytest.fixture(params=['sqlalchemy', 'redis', 'redis_sharded', 'mongodb'])
 def store(request, event_loop, context, direct_resources, serializer):
     if request.param == 'sqlalchemy':
         engine = create_engine('sqlite:///:memory:', connect_args={'check_same_thread': False},
@@ -47,7 +50,7 @@ def store(request, event_loop, context, direct_resources, serializer):
             engine = 'default'
 
         store_ = SQLAlchemyStore(engine=engine, serializer=serializer)
-    elif request.param == 'redis':
+    elif request.param in ('redis', 'redis_sharded'):
         address = (os.getenv('REDIS_HOST', 'localhost'), 6379)
         redis = event_loop.run_until_complete(create_reconnecting_redis(address))
         context.add_teardown_callback(redis.close)
@@ -55,7 +58,8 @@ def store(request, event_loop, context, direct_resources, serializer):
             context.add_resource(redis)
             redis = 'default'
 
-        store_ = RedisStore(client=redis, serializer=serializer)
+        store_ = RedisStore(client=redis, serializer=serializer,
+                            sharded=request.param == 'redis_sharded')
     elif request.param == 'mongodb':
         host = os.getenv('MONGODB_HOST', 'localhost')
         client = AsyncIOMotorClient(host=host)
@@ -82,3 +86,43 @@ async def test_store_load_state(store):
 async def test_store_load_nonexistent_state(store):
     state = await store.load_state('blah')
     assert state is None
+
+
+@pytest.fixture
+def lease_name():
+    # The leases outlive the tests in the Redis and MongoDB variants, so each test gets its own
+    return 'feed-{}'.format(uuid4().hex)
+
+
+@pytest.mark.asyncio
+async def test_acquire_lease(store, lease_name):
+    assert await store.acquire_lease(lease_name, 'node1', 10)
+    assert await store.acquire_lease(lease_name, 'node1', 10)
+    assert not await store.acquire_lease(lease_name, 'node2', 10)
+    assert await store.acquire_lease(lease_name + '-other', 'node2', 10)
+
+
+@pytest.mark.asyncio
+async def test_acquire_expired_lease(store, lease_name):
+    assert await store.acquire_lease(lease_name, 'node1', 0.05)
+    assert not await store.acquire_lease(lease_name, 'node2', 10)
+    await asyncio.sleep(0.1)
+    assert await store.acquire_lease(lease_name, 'node2', 10)
+
+
+@pytest.mark.asyncio
+async def test_delete_state(store):
+    await store.store_state('feed', {'a': 5})
+    await store.delete_state('feed')
+    await store.delete_state('nonexistent')
+    assert await store.load_state('feed') is None
+
+
+@pytest.mark.asyncio
+async def test_list_states(store):
+    before = time.time()
+    await store.store_state('feed1', {'a': 5})
+    await store.store_state('feed2', {'a': 6})
+    states = await store.list_states()
+    assert set(states) >= {'feed1', 'feed2'}
+    assert before <= states['feed1'] <= time.time()
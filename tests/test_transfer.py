@@ -0,0 +1,339 @@
+import asyncio
+import gzip
+import zlib
+from collections import Counter
+
+import pytest
+from aiohttp import web, ClientSession, ClientResponseError
+
+from asphalt.core.context import Context
+from asphalt.feedreader.hibernation import WorkingSet
+from asphalt.feedreader.readers.rss import RSSFeedReader
+from asphalt.feedreader.resolver import CachingResolver
+from asphalt.feedreader.transfer import (
+    DocumentTooLargeError, FeedGoneError, FetchTimeoutError, brotli_size_limit)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+document = ('<rss version="2.0"><channel><title>Compressed</title>' +
+            ''.join('<item><guid>%d</guid><title>Item %d</title></item>' % (i, i)
+                    for i in range(500)) +
+            '</channel></rss>').encode('utf-8')
+
+
+def make_handler(encoding):
+    if encoding == 'gzip':
+        body = gzip.compress(document)
+    elif encoding == 'deflate':
+        body = zlib.compress(document)
+    elif encoding == 'rawdeflate':
+        compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+        body = compressor.compress(document) + compressor.flush()
+        encoding = 'deflate'
+    elif encoding == 'br':
+        body = brotli.compress(document)
+    else:
+        body = document
+
+    async def handler(request):
+        headers = {'Content-Encoding': encoding} if encoding != 'identity' else {}
+        handler.accept_encoding = request.headers.get('Accept-Encoding')
+        return web.Response(body=body, headers=headers, content_type='application/rss+xml')
+
+    return handler
+
+
+@pytest.fixture
+def context(event_loop):
+    ctx = Context()
+    yield ctx
+    event_loop.run_until_complete(ctx.close())
+
+
+@pytest.fixture
+def handlers():
+    return {encoding: make_handler(encoding)
+            for encoding in ('identity', 'gzip', 'deflate', 'rawdeflate', 'br')
+            if encoding != 'br' or brotli is not None}
+
+
+@pytest.fixture(scope='module')
+def bombs():
+    # 10 MB of zeros, compressed to some kilobytes (gzip) or a few bytes (brotli)
+    payload = bytes(10 * 1024 * 1024)
+    bombs = {'gzip': gzip.compress(payload, 1)}
+    if brotli is not None:
+        bombs['br'] = brotli.compress(payload, quality=1)
+
+    return bombs
+
+
+@pytest.fixture
+def request_counts():
+    return Counter()
+
+
+@pytest.fixture
+def base_url(event_loop, unused_tcp_port, handlers, bombs, request_counts):
+    app = web.Application(loop=event_loop)
+    for encoding, handler in handlers.items():
+        app.router.add_get('/' + encoding, handler)
+
+    async def bomb(request):
+        # Sent regardless of the Accept-Encoding header
+        encoding = request.match_info['encoding']
+        return web.Response(body=bombs[encoding], headers={'Content-Encoding': encoding})
+
+    app.router.add_get('/bomb/{encoding}', bomb)
+
+    async def redirect(request):
+        status, location = request.match_info['status'], request.match_info['location']
+        return web.Response(status=int(status), headers={'Location': '/' + location})
+
+    app.router.add_get('/redirect/{status}/{location:.+}', redirect)
+
+    async def gone(request):
+        return web.Response(status=410)
+
+    app.router.add_get('/gone', gone)
+
+    async def slow_headers(request):
+        await asyncio.sleep(1)
+        return web.Response(body=document)
+
+    async def slow_body(request):
+        response = web.StreamResponse()
+        await response.prepare(request)
+        for i in range(10):
+            response.write(document[:100])
+            await response.drain()
+            await asyncio.sleep(0.1)
+
+        return response
+
+    async def flaky(request):
+        # Fails the first two requests
+        request_counts['flaky'] += 1
+        if request_counts['flaky'] <= 2:
+            return web.Response(status=503)
+
+        return web.Response(body=document)
+
+    async def first_slow(request):
+        # Responds slowly to the first request only
+        request_counts['first_slow'] += 1
+        if request_counts['first_slow'] == 1:
+            await asyncio.sleep(1)
+
+        return web.Response(body=document)
+
+    app.router.add_get('/slow_headers', slow_headers)
+    app.router.add_get('/slow_body', slow_body)
+    app.router.add_get('/flaky', flaky)
+    app.router.add_get('/first_slow', first_slow)
+    handler = app.make_handler(loop=event_loop)
+    server = event_loop.run_until_complete(
+        event_loop.create_server(handler, host='127.0.0.1', port=unused_tcp_port))
+    yield 'http://127.0.0.1:%d/' % unused_tcp_port
+    event_loop.run_until_complete(handler.shutdown(1))
+    server.close()
+    event_loop.run_until_complete(server.wait_closed())
+
+
+@pytest.mark.parametrize('encoding', ['identity', 'gzip', 'deflate', 'rawdeflate', 'br'])
+@pytest.mark.asyncio
+async def test_fetch_document(context, base_url, handlers, encoding):
+    if encoding not in handlers:
+        pytest.skip('brotli is not installed')
+
+    feed = RSSFeedReader(url=base_url + encoding, interval=None)
+    await feed.start(context)
+    assert await feed.fetch_document() == document
+    assert feed.statistics.documents == 1
+    assert feed.statistics.last_bytes_decoded == len(document)
+    if encoding == 'identity':
+        assert feed.statistics.last_bytes_received == len(document)
+    else:
+        assert feed.statistics.last_bytes_received < len(document) / 5
+
+    assert 'gzip' in handlers[encoding].accept_encoding
+
+
+@pytest.mark.parametrize('encoding', ['identity', 'gzip'])
+@pytest.mark.asyncio
+async def test_max_document_size(context, base_url, encoding):
+    feed = RSSFeedReader(url=base_url + encoding, interval=None, max_document_size=1000)
+    await feed.start(context)
+    with pytest.raises(DocumentTooLargeError) as exc:
+        await feed.fetch_document()
+
+    assert str(exc.value) == 'the document exceeds the maximum size of 1000 bytes'
+
+
+@pytest.mark.parametrize('encoding', ['gzip', 'br'])
+@pytest.mark.asyncio
+async def test_decompression_bomb(context, base_url, bombs, encoding):
+    if encoding not in bombs:
+        pytest.skip('brotli is not installed')
+
+    feed = RSSFeedReader(url=base_url + 'bomb/' + encoding, interval=None,
+                         max_document_size=1000)
+    await feed.start(context)
+    if encoding == 'br' and not brotli_size_limit:
+        # Brotli is not requested if its output cannot be limited, and rejected if sent anyway
+        assert 'br' not in feed.http_headers['accept-encoding']
+        with pytest.raises(ValueError) as exc:
+            await feed.fetch_document()
+
+        assert 'brotli' in str(exc.value)
+    else:
+        with pytest.raises(DocumentTooLargeError):
+            await feed.fetch_document()
+
+
+@pytest.mark.asyncio
+async def test_auto_decompressing_session(context, base_url, event_loop):
+    session = ClientSession(loop=event_loop)
+    context.add_teardown_callback(session.close)
+    feed = RSSFeedReader(url=base_url + 'gzip', interval=None, client_session=session)
+    await feed.start(context)
+    assert feed.http_headers['accept-encoding'] == 'gzip, deflate'
+    assert await feed.fetch_document() == document
+    assert feed.statistics.last_bytes_decoded == len(document)
+
+
+@pytest.mark.parametrize('path, moved_to', [
+    ('redirect/301/identity', 'identity'),
+    ('redirect/308/identity', 'identity'),
+    ('redirect/302/identity', None),
+    ('redirect/301/redirect/302/identity', 'redirect/302/identity')
+], ids=['301', '308', '302', '301_302'])
+@pytest.mark.asyncio
+async def test_redirect(context, base_url, memory_store, path, moved_to):
+    feed = RSSFeedReader(url=base_url + path, interval=None, store=memory_store)
+    events = []
+    feed.moved.connect(events.append)
+    await feed.start(context)
+    await feed.update()
+    await asyncio.sleep(0)
+    assert feed.url == base_url + (moved_to or path)
+    assert [(event.old_url, event.new_url) for event in events] == \
+        ([(base_url + path, base_url + moved_to)] if moved_to else [])
+    state = memory_store.states[base_url + path]
+    if moved_to:
+        assert state['url'] == base_url + moved_to
+        assert state['moved_from'] == base_url + path
+    else:
+        assert 'url' not in state
+
+    # A restarted reader picks up the new URL, unless it has been reconfigured
+    feed = RSSFeedReader(url=base_url + path, interval=None, store=memory_store)
+    await feed.start(context)
+    assert feed.url == base_url + (moved_to or path)
+    feed = RSSFeedReader(url=base_url + 'gzip', interval=None, store=memory_store,
+                         state_id=base_url + path)
+    await feed.start(context)
+    assert feed.url == base_url + 'gzip'
+
+
+@pytest.mark.asyncio
+async def test_gone(context, base_url, memory_store):
+    feed = RSSFeedReader(url=base_url + 'gone', interval=None, store=memory_store)
+    await feed.start(context)
+    with pytest.raises(FeedGoneError):
+        await feed.update()
+
+    assert feed.gone
+    assert memory_store.states[base_url + 'gone']['gone'] is True
+
+    # A retired feed is not polled after a restart
+    feed = RSSFeedReader(url=base_url + 'gone', interval=1, store=memory_store)
+    await feed.start(context)
+    assert feed.gone
+    assert feed.statistics.documents == 0
+
+
+@pytest.mark.asyncio
+async def test_gone_hibernating(context, base_url, memory_store):
+    working_set = WorkingSet(max_size=10, hibernate_interval=60)
+    feed = RSSFeedReader(url=base_url + 'gone', interval=None, store=memory_store,
+                         working_set=working_set)
+    await feed.start(context)
+    await feed.save_state()
+    assert feed.hibernate()
+
+    # The stored state must not be reloaded over the 410 before it is saved
+    with pytest.raises(FeedGoneError):
+        await feed.update()
+
+    assert feed.gone
+    assert memory_store.states[base_url + 'gone']['gone'] is True
+
+
+@pytest.mark.asyncio
+async def test_gone_stops_polling(context, base_url):
+    feed = RSSFeedReader(url=base_url + 'gone', interval=None)
+    await feed.start(context)
+    await asyncio.wait_for(feed.loop_update(), 5)
+    assert feed.gone
+
+
+@pytest.mark.parametrize('path, options, stage', [
+    ('slow_headers', {'first_byte_timeout': 0.2}, 'first_byte'),
+    ('slow_headers', {'first_byte_timeout': 5, 'total_timeout': 0.2}, 'total'),
+    ('slow_body', {'total_timeout': 0.3}, 'total'),
+    ('slow_body', {'min_transfer_rate': 10000}, 'transfer_rate')
+], ids=['first_byte', 'total_headers', 'total_body', 'transfer_rate'])
+@pytest.mark.asyncio
+async def test_fetch_timeout(context, base_url, monkeypatch, path, options, stage):
+    monkeypatch.setattr('asphalt.feedreader.transfer.rate_grace_period', 0.2)
+    feed = RSSFeedReader(url=base_url + path, interval=None, **options)
+    await feed.start(context)
+    with pytest.raises(FetchTimeoutError) as exc:
+        await feed.fetch()
+
+    assert exc.value.stage == stage
+    assert feed.statistics.timeouts == 1
+
+
+@pytest.mark.parametrize('retries', [1, 2])
+@pytest.mark.asyncio
+async def test_retries(context, base_url, request_counts, retries):
+    feed = RSSFeedReader(url=base_url + 'flaky', interval=None, retries=retries,
+                         retry_backoff=0.01)
+    await feed.start(context)
+    if retries == 1:
+        with pytest.raises(ClientResponseError):
+            await feed.fetch()
+    else:
+        assert await feed.fetch() == document
+
+    assert request_counts['flaky'] == retries + 1
+
+
+@pytest.mark.asyncio
+async def test_hedged_request(context, base_url, request_counts, event_loop):
+    feed = RSSFeedReader(url=base_url + 'first_slow', interval=None, hedge_after=0.1)
+    await feed.start(context)
+    start = event_loop.time()
+    assert await feed.fetch() == document
+    assert event_loop.time() - start < 0.9
+    assert request_counts['first_slow'] == 2
+
+
+@pytest.mark.parametrize('preconnect', [False, True], ids=['resolve', 'preconnect'])
+@pytest.mark.asyncio
+async def test_resolver_warm_up(context, base_url, preconnect):
+    resolver = CachingResolver(preconnect=preconnect)
+    feed = RSSFeedReader(url=base_url.replace('127.0.0.1', 'localhost') + 'identity',
+                         resolver=resolver, interval=None)
+    await feed.start(context)
+    await feed.warm_up()
+    assert resolver.lookups == (2 if preconnect else 1)
+
+    await feed.update()
+    assert resolver.hits == (2 if preconnect else 1)
+    assert feed.metadata.title == 'Compressed'
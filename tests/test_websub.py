@@ -0,0 +1,161 @@
+import asyncio
+import hashlib
+import hmac
+
+import pytest
+from aiohttp import web, ClientSession
+from asphalt.core import Context
+
+from asphalt.feedreader.readers.atom import AtomFeedReader
+from asphalt.feedreader.websub import WebSubSubscriber
+
+feed_document = """\
+<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <link rel="hub" href="http://127.0.0.1:{hub_port}/hub"/>
+  <link rel="self" href="http://example.org/feed"/>
+  <entry><id>1</id><title>First</title></entry>
+</feed>
+"""
+
+pushed_document = b"""\
+<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <link rel="self" href="http://example.org/feed"/>
+  <entry><id>2</id><title>Second</title></entry>
+</feed>
+"""
+
+
+class StandInHub:
+    """A minimal WebSub hub that verifies intents and then pushes content to the subscriber."""
+
+    def __init__(self):
+        self.subscriptions = {}
+        self.verified = asyncio.Event()
+        self.challenge_echoed = None
+        self.lease_seconds = '3600'
+        self.failing = False
+
+    async def handle_request(self, request):
+        if self.failing:
+            return web.Response(status=503)
+
+        form = await request.post()
+        asyncio.ensure_future(self.verify(dict(form)))
+        return web.Response(status=202)
+
+    async def verify(self, form):
+        params = {'hub.mode': form['hub.mode'], 'hub.topic': form['hub.topic'],
+                  'hub.challenge': 'abc123', 'hub.lease_seconds': self.lease_seconds}
+        async with ClientSession() as session:
+            async with session.get(form['hub.callback'], params=params) as resp:
+                self.challenge_echoed = await resp.text() == 'abc123'
+
+        if self.challenge_echoed:
+            self.subscriptions[form['hub.callback']] = form.get('hub.secret')
+
+        self.verified.set()
+
+    async def publish(self, body, secret=None):
+        async with ClientSession() as session:
+            for callback, subscriber_secret in self.subscriptions.items():
+                signature = hmac.new((secret or subscriber_secret).encode(), body,
+                                     hashlib.sha256).hexdigest()
+                headers = {'X-Hub-Signature': 'sha256=' + signature,
+                           'Content-Type': 'application/atom+xml'}
+                async with session.post(callback, data=body, headers=headers) as resp:
+                    assert resp.status == 202
+
+
+@pytest.fixture
+def context(event_loop):
+    ctx = Context()
+    yield ctx
+    event_loop.run_until_complete(ctx.close())
+
+
+@pytest.fixture
+def hub(event_loop, unused_tcp_port):
+    hub = StandInHub()
+    app = web.Application(loop=event_loop)
+    app.router.add_post('/hub', hub.handle_request)
+    handler = app.make_handler(loop=event_loop)
+    server = event_loop.run_until_complete(
+        event_loop.create_server(handler, host='127.0.0.1', port=unused_tcp_port))
+    hub.port = unused_tcp_port
+    yield hub
+    event_loop.run_until_complete(handler.shutdown(1))
+    server.close()
+    event_loop.run_until_complete(server.wait_closed())
+
+
+@pytest.fixture
+def subscriber(event_loop, context, unused_tcp_port_factory):
+    subscriber = WebSubSubscriber(host='127.0.0.1', port=unused_tcp_port_factory(),
+                                  fallback_interval=3600)
+    event_loop.run_until_complete(subscriber.start(context))
+    return subscriber
+
+
+@pytest.fixture
+def feed(event_loop, context, hub, subscriber):
+    feed = AtomFeedReader(url='http://example.org/feed', websub=subscriber, interval=None)
+    event_loop.run_until_complete(feed.start(context))
+    return feed
+
+
+@pytest.mark.parametrize('secret, delivered', [
+    (None, True),
+    ('wrongsecret', False)
+], ids=['valid_signature', 'invalid_signature'])
+@pytest.mark.asyncio
+async def test_subscribe_and_push(hub, subscriber, feed, secret, delivered):
+    events = []
+    feed.entry_discovered.connect(events.append)
+    await feed.process_document(feed_document.format(hub_port=hub.port))
+    await asyncio.wait_for(hub.verified.wait(), 5)
+    assert hub.challenge_echoed
+    assert subscriber.is_subscribed(feed)
+    subscription = subscriber.get_subscription(feed)
+    assert subscription.topic == 'http://example.org/feed'
+    assert subscription.lease_seconds == 3600
+    assert subscription.renew_handle is not None
+
+    await hub.publish(pushed_document, secret)
+    for _ in range(50):
+        if len(events) == 1 + delivered:
+            break
+
+        await asyncio.sleep(0.02)
+
+    assert [event.entry.id for event in events] == ['1', '2'][:1 + delivered]
+    if delivered:
+        # Pushed content only adds to the set of seen entries
+        assert feed._seen_entry_ids == {'1', '2'}
+
+
+@pytest.mark.asyncio
+async def test_renewal_failure(hub, subscriber, feed):
+    hub.lease_seconds = '1'
+    await feed.process_document(feed_document.format(hub_port=hub.port))
+    await asyncio.wait_for(hub.verified.wait(), 5)
+    assert subscriber.is_subscribed(feed)
+
+    # The renewal fails, so the subscription is dropped when the lease expires
+    hub.failing = True
+    await asyncio.sleep(0.5)
+    assert subscriber.is_subscribed(feed)
+    await asyncio.sleep(0.7)
+    assert not subscriber.is_subscribed(feed)
+    assert subscriber.get_subscription(feed) is None
+
+
+@pytest.mark.asyncio
+async def test_verification_unknown_token(subscriber):
+    url = '%s/%s' % (subscriber.callback_url, 'foo')
+    params = {'hub.mode': 'subscribe', 'hub.topic': 'http://example.org/feed',
+              'hub.challenge': 'xyz'}
+    async with ClientSession() as session:
+        async with session.get(url, params=params) as resp:
+            assert resp.status == 404
@@ -0,0 +1,129 @@
+import asyncio
+import logging
+
+import pytest
+from aiohttp import web
+from asphalt.core import Context
+
+from asphalt.feedreader import FeedReaderComponent, FeedReader
+from asphalt.feedreader.api import FeedStateStore
+from asphalt.feedreader.dedup import DuplicateIndex
+from asphalt.feedreader.metadata import FeedEntry
+from asphalt.feedreader.readers.rss import RSSFeedReader
+from asphalt.feedreader.workers import WorkerPool
+
+
+async def rss_handler(request):
+    return web.Response(body='<rss version="2.0"><channel><title>Feed %s</title>'
+                             '<item><guid>%s-1</guid><title>Entry</title></item>'
+                             '</channel></rss>' % (request.match_info['name'],
+                                                   request.match_info['name']),
+                        content_type='application/rss+xml')
+
+
+@pytest.fixture
+def context(event_loop):
+    ctx = Context()
+    yield ctx
+    event_loop.run_until_complete(ctx.close())
+
+
+@pytest.fixture
+def webapp(event_loop, unused_tcp_port):
+    app = web.Application(loop=event_loop)
+    app.router.add_get('/{name}', rss_handler)
+    handler = app.make_handler(loop=event_loop)
+    server = event_loop.run_until_complete(
+        event_loop.create_server(handler, host='127.0.0.1', port=unused_tcp_port))
+    yield 'http://127.0.0.1:%d' % unused_tcp_port
+    server.close()
+    event_loop.run_until_complete(server.wait_closed())
+    event_loop.run_until_complete(handler.shutdown(1))
+
+
+@pytest.mark.asyncio
+async def test_worker_processes(context, webapp, memory_store):
+    context.add_resource(memory_store, types=[FeedStateStore])
+    component = FeedReaderComponent(workers=2, reader='rss', store='default', interval=60, feeds={
+        name: {'url': '{}/{}'.format(webapp, name)} for name in ('foo', 'bar', 'baz')
+    })
+    await component.start(context)
+
+    entries = asyncio.Queue()
+    metadata = []
+    for name in ('foo', 'bar', 'baz'):
+        feed = context.require_resource(FeedReader, name)
+        feed.entry_discovered.connect(lambda event: entries.put_nowait(event.entry.id))
+        feed.metadata_changed.connect(metadata.append)
+
+    entry_ids = set()
+    for _ in range(3):
+        entry_ids.add(await asyncio.wait_for(entries.get(), 30))
+
+    await asyncio.sleep(0.1)
+    assert entry_ids == {'foo-1', 'bar-1', 'baz-1'}
+    assert len(metadata) == 3
+    assert context.require_resource(FeedReader, 'foo').metadata.title == 'Feed foo'
+    assert memory_store.states['{}/foo'.format(webapp)]['seen_entry_ids'] == ['foo-1']
+
+
+class RecordingPipeline:
+    def __init__(self):
+        self.batches = []
+
+    async def process(self, entries, base_url):
+        self.batches.append(list(entries))
+        return entries
+
+
+@pytest.mark.asyncio
+async def test_handle_messages(memory_store):
+    dedup_index = DuplicateIndex()
+    reader = RSSFeedReader(url='http://example.org/rss', store=memory_store,
+                           dedup_index=dedup_index, interval=None)
+    events = []
+    reader.entry_discovered.connect(events.append)
+    reader.pipeline = RecordingPipeline()
+    pool = WorkerPool(1)
+    pool.add_feed(reader, {'url': reader.url, 'store': 'default'})
+    entry = FeedEntry('1', title='Foo', link='http://example.org/foo')
+    entry2 = FeedEntry('3', title='Bar', link='http://example.org/bar')
+    await pool.handle_message('entries', 0,
+                              [entry, FeedEntry('2', link='http://example.org/foo'), entry2])
+    await pool.handle_message('metadata', 0, {'title': 'Example'})
+    await pool.handle_message('state', 0, {'version': 1, 'seen_entry_ids': ['1', '2']})
+    await asyncio.sleep(0)
+
+    # The second entry is suppressed by the duplicate index in the parent process, and the rest
+    # are run through the pipeline as one batch
+    assert [event.entry for event in events] == [entry, entry2]
+    assert reader.pipeline.batches == [[entry, entry2]]
+    assert reader.metadata.title == 'Example'
+    assert memory_store.states[reader.url]['seen_entry_ids'] == ['1', '2']
+
+
+def test_add_feed_strips_parent_options(caplog):
+    pool = WorkerPool(2)
+    reader = RSSFeedReader(url='http://example.org/rss', interval=None)
+    pool.add_feed(reader, {'url': reader.url, 'reader': 'rss', 'store': 'default',
+                           'client_session': 'default', 'coalescer': 'default',
+                           'websub': 'default', 'resolver': None})
+    assert pool._feeds == [(reader, {'url': reader.url})]
+    assert caplog.record_tuples == [
+        ('asphalt.feedreader.workers', logging.WARNING,
+         'Ignoring options not supported in worker mode: coalescer, websub '
+         '(url=http://example.org/rss)')]
+
+
+def test_initial_state_onboarding():
+    # A feed without saved state is left for the worker to onboard
+    reader = RSSFeedReader(url='http://example.org/rss', interval=None, onboarding='none')
+    assert WorkerPool._initial_state(reader) is None
+
+    reader.__setstate__({'version': 1, 'seen_entry_ids': ['1']})
+    state = WorkerPool._initial_state(reader)
+    assert state['seen_entry_ids'] == ['1']
+
+
+def test_invalid_worker_count():
+    pytest.raises(ValueError, WorkerPool, 0)